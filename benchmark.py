@@ -0,0 +1,68 @@
+import argparse
+import sys
+from tqdm import *
+from pagereplacement.benchmark import Benchmark
+from pagereplacement.cli import COLD_START_BUDGET
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the page replacement algorithms.")
+    parser.add_argument("--algorithms", nargs="+", default=["FIFO", "Optimal", "ESC", "LFU_DA"])
+    parser.add_argument("--workloads", nargs="+", default=["random", "locality", "hybrid"])
+    parser.add_argument("--lengths", nargs="+", type=int, default=[10000, 120000])
+    parser.add_argument("--frames", nargs="+", type=int, default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--numpy", action="store_true", help="generate the reference strings with NumPy")
+    parser.add_argument(
+        "--no-generation", action="store_true", help="skip timing the reference string generation"
+    )
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="a previous report to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as a regression")
+    parser.add_argument("--cold-start", action="store_true", help="only measure the cold start of the CLI")
+    args = parser.parse_args()
+
+    if args.cold_start:
+        seconds = Benchmark.cold_start()
+        tqdm.write(f"Cold start: {seconds:.3f}s (budget {COLD_START_BUDGET}s)")
+        sys.exit(0 if seconds <= COLD_START_BUDGET else 1)
+
+    report = Benchmark(
+        algorithms=args.algorithms,
+        workloads=args.workloads,
+        lengths=args.lengths,
+        frame_counts=args.frames,
+        repeat=args.repeat,
+        measure_memory=not args.no_memory,
+        use_numpy=args.numpy,
+        time_generation=not args.no_generation,
+    ).run()
+    Benchmark.save(report, args.output)
+
+    tqdm.write(f"{'algorithm':<10}{'workload':<10}{'length':>10}{'frames':>8}{'refs/s':>12}{'peak MB':>10}")
+    for result in report["results"]:
+        peak = result.get("peak_bytes")
+        tqdm.write(
+            f"{result['algorithm']:<10}{result['workload']:<10}{result['length']:>10}{result['frames']:>8}"
+            f"{result['refs_per_sec'] or 0:>12,.0f}{'' if peak is None else f'{peak / 1e6:.2f}':>10}"
+        )
+    if "generation" in report:
+        tqdm.write(f"{'generator':<10}{'workload':<10}{'length':>10}{'refs/s':>20}")
+        for timing in report["generation"]:
+            tqdm.write(
+                f"{'numpy' if timing['use_numpy'] else 'random':<10}{timing['workload']:<10}"
+                f"{timing['length']:>10}{timing['refs_per_sec'] or 0:>20,.0f}"
+            )
+    tqdm.write(f"Benchmark saved to {args.output}")
+
+    if args.compare:
+        comparison = Benchmark.compare(Benchmark.load(args.compare), report, args.threshold)
+        regressions = [row for row in comparison if row["regression"]]
+        for row in comparison:
+            tqdm.write(
+                f"{row['algorithm']:<10}{row['workload']:<10}{row['length']:>10}{row['frames']:>8}"
+                f"{row['ratio']:>8.2f}x{'  REGRESSION' if row['regression'] else ''}"
+            )
+        if regressions:
+            sys.exit(1)
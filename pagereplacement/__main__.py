@@ -0,0 +1,3 @@
+from pagereplacement.cli import main
+
+main()
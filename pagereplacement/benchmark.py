@@ -0,0 +1,255 @@
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from tqdm import *
+from pagereplacement.reference_str import ReferenceStr
+from pagereplacement.experiment import load_algorithm
+
+
+class Benchmark:
+    """Benchmark the page replacement algorithms.
+
+    Times `compute()` for each algorithm, workload, trace length and frame count, and reports
+    the references per second and the peak memory allocated during `compute()`. Also times the
+    generation of each reference string, by `random` and by NumPy when it is installed.
+    """
+
+    def __init__(
+        self,
+        algorithms=("FIFO", "Optimal", "ESC", "LFU_DA"),
+        workloads=("random", "locality", "hybrid"),
+        lengths=(10000, 120000),
+        frame_counts=(10, 100, 1000),
+        repeat=3,
+        measure_memory=True,
+        use_numpy=False,
+        time_generation=True,
+    ):
+        """Constructor for Benchmark.
+
+        Args:
+            algorithms (iterable, optional): Algorithm names (see experiment.load_algorithm).
+            workloads (iterable, optional): Reference string types.
+            lengths (iterable, optional): Reference string lengths.
+            frame_counts (iterable, optional): Numbers of frames.
+            repeat (int, optional): Number of timed runs, the fastest is kept. Defaults to 3.
+            measure_memory (bool, optional): Measure the peak memory in an extra run with tracemalloc,
+                which is too slow to be timed. Defaults to True.
+            use_numpy (bool, optional): Generate the reference strings with NumPy. Defaults to False.
+            time_generation (bool, optional): Time the reference string generation with and without
+                NumPy. Defaults to True.
+        """
+        self.algorithms = list(algorithms)
+        self.workloads = list(workloads)
+        self.lengths = list(lengths)
+        self.frame_counts = list(frame_counts)
+        self.repeat = repeat
+        self.measure_memory = measure_memory
+        self.use_numpy = use_numpy
+        self.time_generation = time_generation
+
+    def run(self):
+        """Run the benchmark.
+
+        Returns:
+            dict: The environment ("meta"), a list of measurements ("results"), and a list of reference
+                string generation timings ("generation") if time_generation.
+        """
+        generation = self.generation() if self.time_generation else None
+        results = []
+        cases = [
+            (length, workload)
+            for length in self.lengths
+            for workload in self.workloads
+        ]
+        progress = tqdm(
+            total=len(cases) * len(self.algorithms) * len(self.frame_counts)
+        )
+        for length, workload in cases:
+            rs = ReferenceStr(length=length, use_numpy=self.use_numpy)
+            rs.generate_reference_str(workload)
+            trace = rs.get_trace()
+            for name in self.algorithms:
+                evaluator = load_algorithm(name)(trace, max_page_num=rs.max)
+                for num_of_frames in self.frame_counts:
+                    seconds = min(
+                        self.time_compute(evaluator, num_of_frames)
+                        for _ in range(self.repeat)
+                    )
+                    result = {
+                        "algorithm": name,
+                        "workload": workload,
+                        "length": length,
+                        "frames": num_of_frames,
+                        "seconds": seconds,
+                        "refs_per_sec": length / seconds if seconds else None,
+                    }
+                    if self.measure_memory:
+                        result["peak_bytes"] = self.peak_memory(evaluator, num_of_frames)
+                    results.append(result)
+                    progress.update()
+        progress.close()
+
+        report = {
+            "meta": {
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "implementation": platform.python_implementation(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "repeat": self.repeat,
+            },
+            "results": results,
+        }
+        if generation is not None:
+            report["generation"] = generation
+        return report
+
+    def generation(self):
+        """Time the generation of the reference string of each workload and length, with and without NumPy.
+
+        NumPy is skipped if it is not installed.
+
+        Returns:
+            list: The workload, length, generator, seconds and references per second of each timing.
+        """
+        generators = [False]
+        if importlib.util.find_spec("numpy") is not None:
+            generators.append(True)
+        timings = []
+        for length in self.lengths:
+            for workload in self.workloads:
+                for use_numpy in generators:
+                    seconds = min(
+                        self.time_generate(workload, length, use_numpy)
+                        for _ in range(self.repeat)
+                    )
+                    timings.append(
+                        {
+                            "workload": workload,
+                            "length": length,
+                            "use_numpy": use_numpy,
+                            "seconds": seconds,
+                            "refs_per_sec": length / seconds if seconds else None,
+                        }
+                    )
+        return timings
+
+    @staticmethod
+    def time_generate(workload, length, use_numpy):
+        start = time.perf_counter()
+        rs = ReferenceStr(length=length, use_numpy=use_numpy)
+        rs.generate_reference_str(workload)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def time_compute(evaluator, num_of_frames):
+        start = time.perf_counter()
+        evaluator.compute(num_of_frames=num_of_frames)
+        return time.perf_counter() - start
+
+    @staticmethod
+    def peak_memory(evaluator, num_of_frames):
+        tracemalloc.start()
+        try:
+            evaluator.compute(num_of_frames=num_of_frames)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    @staticmethod
+    def cold_start(repeat=5):
+        """Measure the cold start of the command line interface.
+
+        Times `python3 -m pagereplacement simulate` of FIFO with one frame count on a tiny trace,
+        so the time is dominated by starting the interpreter and importing the modules.
+
+        Args:
+            repeat (int, optional): Number of runs, the fastest is kept. Defaults to 5.
+
+        Returns:
+            float: The seconds from starting the interpreter to its exit.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cold_start.trace")
+            rs = ReferenceStr(length=1000)
+            rs.generate_reference_str("random")
+            rs.save(path)
+            command = [sys.executable, "-m", "pagereplacement", "simulate", path, "-a", "FIFO", "--frames", "10"]
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+                seconds = time.perf_counter() - start
+                best = seconds if best is None else min(best, seconds)
+        return best
+
+    @staticmethod
+    def save(report, path):
+        """Save a benchmark report to a JSON file.
+
+        Args:
+            report (dict): The report returned by `run`.
+            path (str): The path of the JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    @staticmethod
+    def load(path):
+        """Load a benchmark report from a JSON file.
+
+        Args:
+            path (str): The path of the JSON file.
+
+        Returns:
+            dict: The report.
+        """
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def compare(baseline, current, threshold=0.1):
+        """Compare two benchmark reports.
+
+        Args:
+            baseline (dict): The reference report.
+            current (dict): The new report.
+            threshold (float, optional): The slowdown above which a measurement is a regression. Defaults to 0.1.
+
+        Returns:
+            list: For each measurement in both reports, a dictionary with the case, the references per second
+            of both reports, their ratio, and whether it is a regression.
+        """
+
+        def key(result):
+            return (result["algorithm"], result["workload"], result["length"], result["frames"])
+
+        baseline_results = {key(result): result for result in baseline["results"]}
+        comparison = []
+        for result in current["results"]:
+            before = baseline_results.get(key(result))
+            if before is None or not before["refs_per_sec"] or not result["refs_per_sec"]:
+                continue
+            ratio = result["refs_per_sec"] / before["refs_per_sec"]
+            comparison.append(
+                {
+                    "algorithm": result["algorithm"],
+                    "workload": result["workload"],
+                    "length": result["length"],
+                    "frames": result["frames"],
+                    "baseline_refs_per_sec": before["refs_per_sec"],
+                    "refs_per_sec": result["refs_per_sec"],
+                    "ratio": ratio,
+                    "regression": ratio < 1 - threshold,
+                }
+            )
+        return comparison
@@ -0,0 +1,485 @@
+"""Command line interface.
+
+    python3 -m pagereplacement generate random.trace --type random
+    python3 -m pagereplacement simulate random.trace -a FIFO -a Optimal -o random.json
+    python3 -m pagereplacement export random.json -o random.csv
+    python3 -m pagereplacement plot random.json --title "Random Reference String"
+    python3 -m pagereplacement simulate random.trace -a FIFO --results results.csv
+    python3 -m pagereplacement simulate random.trace -a ESC --flush-interval 1000 --dirty-high 0.2
+    python3 -m pagereplacement export results.csv --workload random -o random.csv
+    python3 -m pagereplacement analyze random.trace -o random_lru.json --plot results/figure
+    python3 -m pagereplacement analyze huge.trace --sample-rate 0.001 --numpy
+    python3 -m pagereplacement multiprogram a.trace b.trace c.trace -a LRU --frames 300 --allocator pff
+
+Each subcommand imports what it needs when it runs: `simulate` does not import pandas, matplotlib
+or tqdm, only `export` imports pandas and only `plot` imports matplotlib.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# The cold start of `simulate` on a tiny trace must stay under this budget in seconds (see Benchmark.cold_start).
+COLD_START_BUDGET = 0.5
+
+
+def generate(args):
+    """Generate a reference string and save it to a trace file."""
+    from .reference_str import ReferenceStr
+
+    rs = ReferenceStr(
+        min=args.min,
+        max=args.max,
+        length=args.length,
+        random_seed=args.seed,
+        use_numpy=args.numpy,
+    )
+    rs.generate_reference_str(
+        args.type,
+        locality_range_min=args.locality_range_min,
+        locality_range_max=args.locality_range_max,
+    )
+    rs.save(args.output)
+    print(f"Trace saved to {args.output}")
+
+
+def frame_counts(args):
+    """Get the frame counts of the arguments, a list or a range."""
+    if args.frames:
+        return args.frames
+    return list(range(args.min_frames, args.max_frames + 1, args.interval))
+
+
+def simulate(args):
+    """Simulate algorithms on a trace file and print or save the results."""
+    from .experiment import load_algorithm
+    from .result_cache import ResultCache
+    from .result_writer import ResultWriter
+    from .simulator import Simulator
+    from .trace import Trace
+
+    trace = Trace.load(args.trace)
+    simulator = Simulator(trace)
+    counts = frame_counts(args)
+    cache = ResultCache(args.cache) if args.cache else None
+    workload = args.workload or os.path.splitext(os.path.basename(args.trace))[0]
+    flusher = None
+    if args.flush_interval:
+        from .flusher import Flusher
+
+        flusher = Flusher(
+            interval=args.flush_interval,
+            batch_size=args.flush_batch,
+            high_watermark=args.dirty_high,
+            low_watermark=args.dirty_low,
+        )
+    writer = None
+    if args.results:
+        writer = ResultWriter(args.results, args.results_format, write_back=flusher is not None)
+    results = dict()
+    for name in args.algorithm:
+        callback = None
+        if writer is not None:
+
+            def callback(num_of_frames, result, name=name):
+                writer.write(workload, name, num_of_frames, result)
+
+        results[name] = simulator.compute(
+            load_algorithm(name),
+            counts,
+            max_page_num=args.max_page_num or trace.max_page_num,
+            single_pass=args.single_pass,
+            executor=args.executor,
+            max_workers=args.workers,
+            progress=False,
+            cache=cache,
+            callback=callback,
+            flusher=flusher,
+        )
+    if writer is not None:
+        writer.close()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"trace": args.trace, "frame_counts": counts, "results": results},
+                f,
+                indent=2,
+            )
+        print(f"Results saved to {args.output}")
+        return
+
+    header = f"{'algorithm':<10}{'frames':>8}{'page faults':>14}{'interrupts':>14}{'disk writes':>14}"
+    if flusher is not None:
+        header += f"{'stall writes':>14}{'background':>12}{'I/O ops':>10}"
+    print(header)
+    for name, rows in results.items():
+        for num_of_frames, row in zip(counts, rows):
+            line = (
+                f"{name:<10}{num_of_frames:>8}{row['page_faults']:>14}"
+                f"{row['interrupts']:>14}{row['disk_writes']:>14}"
+            )
+            if flusher is not None:
+                line += (
+                    f"{row['stall_writes']:>14}{row['background_writes']:>12}"
+                    f"{row['io_operations']:>10}"
+                )
+            print(line)
+
+
+def analyze(args):
+    """Compute the LRU reuse distances of a trace file and the results of every number of frames.
+
+    With --sample-rate, the results are estimated from a sample of the pages (see SampledReuseDistance).
+    """
+    from .trace import Trace
+
+    trace = Trace.load(args.trace)
+    max_page_num = args.max_page_num or trace.max_page_num
+    if args.sample_rate:
+        from .shards import SampledReuseDistance, validate
+
+        options = {
+            "rate": args.sample_rate,
+            "max_samples": args.max_samples or None,
+            "use_numpy": args.numpy,
+            "adjust": args.adjust,
+        }
+        analyzer = SampledReuseDistance(trace, max_page_num=max_page_num, **options).analyze()
+        saved = {
+            "sampling_rate": analyzer.sampling_rate,
+            "sampled_pages": len(analyzer.sample.stack.last),
+        }
+    else:
+        from .reuse_distance import ReuseDistance
+
+        analyzer = ReuseDistance(trace, max_page_num=max_page_num).analyze()
+        saved = {
+            "cold_misses": analyzer.cold_misses,
+            "histogram": analyzer.histogram,
+            "write_histogram": analyzer.write_histogram,
+        }
+    curve = analyzer.curve()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"trace": args.trace, **saved, "curve": curve}, f, indent=2)
+        print(f"Reuse distances saved to {args.output}")
+    if args.plot:
+        name = os.path.splitext(os.path.basename(args.trace))[0]
+        os.makedirs(args.plot, exist_ok=True)
+        analyzer.plot(args.title or name, args.plot, name)
+        print(f"Figures saved to {args.plot}")
+
+    print(
+        f"{'frames':>8}{'page faults':>14}{'interrupts':>14}{'disk writes':>14}"
+        f"{'miss ratio':>12}{'error':>10}"
+    )
+    for num_of_frames in frame_counts(args):
+        if 1 <= num_of_frames <= len(curve):
+            row = curve[num_of_frames - 1]
+            print(
+                f"{num_of_frames:>8}{row['page_faults']:>14}"
+                f"{row['interrupts']:>14}{row['disk_writes']:>14}"
+                f"{row['miss_ratio']:>12.4f}{row.get('error', 0.0):>10.4f}"
+            )
+
+    if args.sample_rate and args.validate:
+        report = validate(trace, frame_counts(args), max_page_num=max_page_num, **options)
+        print(
+            f"Against exact LRU runs: mean absolute error {report['mean_absolute_error']:.4f}, "
+            f"max {report['max_absolute_error']:.4f}, "
+            f"{report['within_bound']:.0%} of the frame counts within the error bound"
+        )
+
+
+def multiprogram(args):
+    """Simulate processes sharing the frames of one memory and print or save the results."""
+    from .experiment import load_algorithm
+    from .multiprogramming import (
+        MultiprogrammingSimulator,
+        PageFaultFrequencyAllocator,
+        WorkingSetAllocator,
+    )
+
+    allocator = args.allocator
+    if allocator == "working-set":
+        allocator = WorkingSetAllocator(window=args.window)
+    elif allocator == "pff":
+        allocator = PageFaultFrequencyAllocator(*args.pff_bounds)
+    simulator = MultiprogrammingSimulator(args.traces, weights=args.weights)
+    results = simulator.run(
+        load_algorithm(args.algorithm),
+        args.frames,
+        scope=args.scope,
+        allocator=allocator,
+        scheduler=args.scheduler,
+        quantum=args.quantum,
+        rebalance_interval=args.rebalance_interval,
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"algorithm": args.algorithm, **results}, f, indent=2)
+        print(f"Results saved to {args.output}")
+        return
+
+    print(
+        f"{'process':<24}{'references':>12}{'frames':>8}{'page faults':>14}"
+        f"{'interrupts':>14}{'disk writes':>14}"
+    )
+    for row in results["processes"] + [{"name": "total", "frames": args.frames, **results["total"]}]:
+        print(
+            f"{row['name']:<24}{row['references']:>12}{row['frames']:>8}{row['page_faults']:>14}"
+            f"{row['interrupts']:>14}{row['disk_writes']:>14}"
+        )
+
+
+def load_results(path, workload=None):
+    """Load the results saved by `simulate` as one DataFrame per algorithm.
+
+    Args:
+        path (str): The JSON file, or the long-format results of --results.
+        workload (str, optional): The workload of long-format results. Defaults to the only one.
+
+    Raises:
+        ValueError: The long-format results hold several workloads and none is given.
+
+    Returns:
+        tuple: The algorithm names and the DataFrames.
+    """
+    if not path.endswith(".json"):
+        from .result_writer import read_results, wide_results
+
+        rows = read_results(path)
+        if workload is None:
+            workloads = sorted({row["workload"] for row in rows})
+            if len(workloads) != 1:
+                raise ValueError(f"Choose a workload with --workload: {', '.join(workloads)}")
+            workload = workloads[0]
+        return wide_results(rows, workload)
+
+    import pandas as pd
+
+    from .flusher import COLUMNS as FLUSHER_COLUMNS
+
+    with open(path) as f:
+        saved = json.load(f)
+    names = list(saved["results"])
+    frames = []
+    for rows in saved["results"].values():
+        data = {
+            "Frame Count": saved["frame_counts"],
+            "Page Faults": [row["page_faults"] for row in rows],
+            "Interrupts": [row["interrupts"] for row in rows],
+            "Disk Writes": [row["disk_writes"] for row in rows],
+        }
+        for key, column in FLUSHER_COLUMNS.items():
+            if all(key in row for row in rows):
+                data[column] = [row[key] for row in rows]
+        frames.append(pd.DataFrame.from_dict(data).set_index("Frame Count"))
+    return names, frames
+
+
+def export(args):
+    """Export the results saved by `simulate` to a CSV file, in the format of main.py."""
+    from .to_csv import ToCSV
+
+    names, frames = load_results(args.results, args.workload)
+    path, filename = os.path.split(os.path.abspath(args.output))
+    os.makedirs(path, exist_ok=True)
+    ToCSV(frames).write(col_name=names, path=path, filename=filename)
+
+
+def plot(args):
+    """Plot the results saved by `simulate`."""
+    from .plot import Plotter
+
+    names, frames = load_results(args.results, args.workload)
+    name = args.name or os.path.splitext(os.path.basename(args.results))[0]
+    os.makedirs(args.output_dir, exist_ok=True)
+    Plotter(frames).plot(
+        title=args.title or name,
+        algorithm_name=names,
+        path=args.output_dir,
+        filenames=[
+            f"{name}_page_faults.png",
+            f"{name}_interrupts.png",
+            f"{name}_disk_writes.png",
+        ],
+    )
+    print(f"Figures saved to {args.output_dir}")
+
+
+def build_parser():
+    """Build the argument parser.
+
+    Returns:
+        ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="pagereplacement", description="Page replacement algorithms."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_generate = subparsers.add_parser("generate", help="generate a trace file")
+    parser_generate.add_argument("output", help="the trace file")
+    parser_generate.add_argument(
+        "--type", choices=["random", "locality", "hybrid"], default="random"
+    )
+    parser_generate.add_argument("--length", type=int, default=120000)
+    parser_generate.add_argument("--min", type=int, default=1, help="minimum page number")
+    parser_generate.add_argument("--max", type=int, default=1200, help="maximum page number")
+    parser_generate.add_argument("--seed", type=int, default=133040007)
+    parser_generate.add_argument("--locality-range-min", type=int, default=25)
+    parser_generate.add_argument("--locality-range-max", type=int, default=50)
+    parser_generate.add_argument("--numpy", action="store_true", help="generate with NumPy")
+    parser_generate.set_defaults(func=generate)
+
+    parser_simulate = subparsers.add_parser("simulate", help="simulate algorithms on a trace file")
+    parser_simulate.add_argument("trace", help="the trace file")
+    parser_simulate.add_argument(
+        "-a",
+        "--algorithm",
+        action="append",
+        required=True,
+        help="an algorithm name or dotted path, can be repeated",
+    )
+    parser_simulate.add_argument("--frames", type=int, nargs="+", help="the frame counts")
+    parser_simulate.add_argument("--min-frames", type=int, default=10)
+    parser_simulate.add_argument("--max-frames", type=int, default=100)
+    parser_simulate.add_argument("--interval", type=int, default=10)
+    parser_simulate.add_argument(
+        "--max-page-num", type=int, help="defaults to the maximum page number of the trace"
+    )
+    parser_simulate.add_argument("--single-pass", action="store_true")
+    parser_simulate.add_argument(
+        "--executor", choices=["serial", "thread", "process"], default="serial"
+    )
+    parser_simulate.add_argument("--workers", type=int)
+    parser_simulate.add_argument("--cache", help="the result cache folder")
+    parser_simulate.add_argument("-o", "--output", help="save the results to a JSON file")
+    parser_simulate.add_argument(
+        "--results", help="append each result to a long-format file as soon as it is computed"
+    )
+    parser_simulate.add_argument(
+        "--results-format",
+        choices=["csv", "binary", "parquet", "columnar"],
+        default="csv",
+    )
+    parser_simulate.add_argument(
+        "--workload", help="the workload name of the results, defaults to the trace name"
+    )
+    parser_simulate.add_argument(
+        "--flush-interval",
+        type=int,
+        help="clean dirty pages with a write-back daemon waking up every this many references",
+    )
+    parser_simulate.add_argument(
+        "--flush-batch", type=int, default=32, help="the most pages per write I/O of the daemon"
+    )
+    parser_simulate.add_argument(
+        "--dirty-high", type=float, default=0.2, help="the dirty fraction of frames that wakes the daemon"
+    )
+    parser_simulate.add_argument(
+        "--dirty-low", type=float, default=0.1, help="the dirty fraction of frames the daemon writes down to"
+    )
+    parser_simulate.set_defaults(func=simulate)
+
+    parser_analyze = subparsers.add_parser(
+        "analyze", help="compute the LRU reuse distances and results of every number of frames"
+    )
+    parser_analyze.add_argument("trace", help="the trace file")
+    parser_analyze.add_argument(
+        "--max-page-num", type=int, help="the largest number of frames, defaults to the maximum page number of the trace"
+    )
+    parser_analyze.add_argument("--frames", type=int, nargs="+", help="the frame counts to print")
+    parser_analyze.add_argument("--min-frames", type=int, default=10)
+    parser_analyze.add_argument("--max-frames", type=int, default=100)
+    parser_analyze.add_argument("--interval", type=int, default=10)
+    parser_analyze.add_argument("-o", "--output", help="save the histograms and the curve to a JSON file")
+    parser_analyze.add_argument("--plot", help="the folder of the miss-ratio curve figures")
+    parser_analyze.add_argument("--title")
+    parser_analyze.add_argument(
+        "--sample-rate", type=float, help="estimate from a sample of the pages (SHARDS), e.g. 0.01"
+    )
+    parser_analyze.add_argument(
+        "--max-samples", type=int, default=8192, help="the most sampled pages kept, 0 for no limit"
+    )
+    parser_analyze.add_argument("--numpy", action="store_true", help="filter the sample with NumPy")
+    parser_analyze.add_argument(
+        "--adjust",
+        action="store_true",
+        help="take the ratios over the expected sampled references (SHARDS-adj)",
+    )
+    parser_analyze.add_argument(
+        "--validate", action="store_true", help="compare the sampled results with exact LRU runs"
+    )
+    parser_analyze.set_defaults(func=analyze)
+
+    parser_multiprogram = subparsers.add_parser(
+        "multiprogram", help="simulate processes sharing the frames of one memory"
+    )
+    parser_multiprogram.add_argument("traces", nargs="+", help="the trace file of each process")
+    parser_multiprogram.add_argument(
+        "-a", "--algorithm", required=True, help="an algorithm name or dotted path"
+    )
+    parser_multiprogram.add_argument(
+        "--frames", type=int, required=True, help="the frames of the whole memory"
+    )
+    parser_multiprogram.add_argument("--scope", choices=["local", "global"], default="local")
+    parser_multiprogram.add_argument(
+        "--allocator", choices=["equal", "working-set", "pff"], default="equal"
+    )
+    parser_multiprogram.add_argument(
+        "--scheduler", choices=["round-robin", "weighted"], default="round-robin"
+    )
+    parser_multiprogram.add_argument("--quantum", type=int, default=100)
+    parser_multiprogram.add_argument(
+        "--weights", type=float, nargs="+", help="the scheduling weight of each process"
+    )
+    parser_multiprogram.add_argument("--rebalance-interval", type=int, default=50000)
+    parser_multiprogram.add_argument(
+        "--window", type=int, default=1000, help="the working set window in references"
+    )
+    parser_multiprogram.add_argument(
+        "--pff-bounds",
+        type=float,
+        nargs=2,
+        default=[0.01, 0.05],
+        metavar=("LOWER", "UPPER"),
+        help="the page-fault frequency bounds in faults per reference",
+    )
+    parser_multiprogram.add_argument("-o", "--output", help="save the results to a JSON file")
+    parser_multiprogram.set_defaults(func=multiprogram)
+
+    parser_export = subparsers.add_parser("export", help="export simulation results to CSV")
+    parser_export.add_argument("results", help="the JSON file or the long-format results")
+    parser_export.add_argument("--workload", help="the workload of long-format results")
+    parser_export.add_argument("-o", "--output", required=True, help="the CSV file")
+    parser_export.set_defaults(func=export)
+
+    parser_plot = subparsers.add_parser("plot", help="plot simulation results")
+    parser_plot.add_argument("results", help="the JSON file or the long-format results")
+    parser_plot.add_argument("--workload", help="the workload of long-format results")
+    parser_plot.add_argument("--title")
+    parser_plot.add_argument("--name", help="the prefix of the figure files")
+    parser_plot.add_argument("--output-dir", default=os.path.join("results", "figure"))
+    parser_plot.set_defaults(func=plot)
+
+    return parser
+
+
+def main(argv=None):
+    """Run the command line interface.
+
+    Args:
+        argv (list, optional): The arguments. Defaults to sys.argv[1:].
+    """
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,334 @@
+import hashlib
+import importlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from pagereplacement.flusher import Flusher
+from pagereplacement.reference_str import ReferenceStr
+from pagereplacement.simulator import Simulator
+from pagereplacement.result_cache import ResultCache
+from pagereplacement.result_writer import ResultWriter, remove_results
+from pagereplacement.trace import Trace
+from pagereplacement.page_replacement_algorithm.fifo import FIFO
+from pagereplacement.page_replacement_algorithm.optimal import Optimal
+from pagereplacement.page_replacement_algorithm.esc import ESC
+from pagereplacement.page_replacement_algorithm.lfu_da import LFU_DA
+from pagereplacement.page_replacement_algorithm.lru import LRU
+from pagereplacement.page_replacement_algorithm.arc import ARC
+from pagereplacement.page_replacement_algorithm.two_q import TwoQ
+from pagereplacement.page_replacement_algorithm.clock_pro import ClockPro
+
+# Algorithms that can be referred to by name in an experiment config.
+ALGORITHMS = {
+    "FIFO": FIFO,
+    "Optimal": Optimal,
+    "ESC": ESC,
+    "LFU_DA": LFU_DA,
+    "LRU": LRU,
+    "ARC": ARC,
+    "2Q": TwoQ,
+    "CLOCK-Pro": ClockPro,
+}
+
+# Relative cost of one reference, used to schedule the slowest jobs first.
+DEFAULT_WEIGHTS = {
+    "Optimal": 4,
+    "LFU_DA": 3,
+    "CLOCK-Pro": 3,
+    "ESC": 2,
+    "ARC": 2,
+    "2Q": 2,
+    "LRU": 1,
+    "FIFO": 1,
+}
+
+# The traces generated by each worker process, keyed by workload name.
+_traces = dict()
+
+
+def load_algorithm(name):
+    """Get a page replacement algorithm class by name.
+
+    Args:
+        name (str): A name in ALGORITHMS, or a dotted path such as "package.module.Class".
+
+    Raises:
+        ValueError: Unknown algorithm.
+
+    Returns:
+        class: The page replacement algorithm class.
+    """
+    if name in ALGORITHMS:
+        return ALGORITHMS[name]
+    module_name, _, class_name = name.rpartition(".")
+    if not module_name:
+        raise ValueError(f"Unknown algorithm: {name}")
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def _get_trace(job):
+    """Generate the trace of a job, or load it from the trace folder if it was saved by a previous run.
+
+    Args:
+        job (dict): The job description built by ExperimentRunner.jobs.
+
+    Returns:
+        Trace: The trace.
+    """
+    workload = job["workload"]
+    generator = {
+        "type": workload["type"],
+        "locality_range_min": workload.get("locality_range_min", 25),
+        "locality_range_max": workload.get("locality_range_max", 50),
+        **job["trace"],
+    }
+    path = None
+    if job.get("trace_folder"):
+        # The file name identifies everything the trace is generated from.
+        key = hashlib.sha1(json.dumps(generator, sort_keys=True).encode()).hexdigest()
+        path = os.path.join(job["trace_folder"], f"{workload['name']}-{key[:12]}.trace")
+        if os.path.exists(path):
+            return Trace.load(path)
+
+    rs = ReferenceStr(**job["trace"])
+    rs.generate_reference_str(
+        workload["type"],
+        locality_range_min=generator["locality_range_min"],
+        locality_range_max=generator["locality_range_max"],
+    )
+    if path is None:
+        return rs.get_trace()
+    # Write to a temporary file first, another worker may be saving the same trace.
+    temporary_path = f"{path}.{os.getpid()}"
+    rs.save(temporary_path)
+    os.replace(temporary_path, path)
+    return Trace.load(path)
+
+
+def _run_job(job):
+    """Run one algorithm on one workload, in a worker process.
+
+    Args:
+        job (dict): The job description built by ExperimentRunner.jobs.
+
+    Returns:
+        tuple: The workload name, the algorithm name and the result DataFrame.
+    """
+    workload = job["workload"]
+    if workload["name"] not in _traces:
+        _traces[workload["name"]] = _get_trace(job)
+
+    frames = job["frames"]
+    cache = None
+    if job.get("cache_folder"):
+        cache = ResultCache(job["cache_folder"], **job.get("cache_options", {}))
+    flusher = None
+    if job.get("flusher") is not None:
+        flusher = Flusher(**job["flusher"])
+    writer = None
+    callback = None
+    if job.get("results_path"):
+        # Append each frame count to the long-format results as soon as it is computed.
+        writer = ResultWriter(
+            job["results_path"],
+            job.get("results_format", "csv"),
+            write_back=flusher is not None,
+        )
+
+        def callback(num_of_frames, result):
+            writer.write(workload["name"], job["algorithm"]["name"], num_of_frames, result)
+
+    result = Simulator(_traces[workload["name"]]).run(
+        load_algorithm(job["algorithm"]["name"]),
+        max_frame_count=frames["max"],
+        interval=frames["interval"],
+        max_page_num=job["max_page_num"],
+        min_frame_count=frames["min"],
+        progress=False,
+        cache=cache,
+        callback=callback,
+        flusher=flusher,
+    )
+    if writer is not None:
+        writer.close()
+    return workload["name"], job["algorithm"]["name"], result
+
+
+class ExperimentRunner:
+    """Run a grid of workloads x algorithms described by a config.
+
+    The config is a dictionary (usually loaded from a JSON file) such as:
+
+        {
+            "output": {"csv": "results/csv", "figure": "results/figure", "trace": "results/trace"},
+            "trace": {"length": 120000, "random_seed": 133040007},
+            "frames": {"min": 10, "max": 100, "interval": 10},
+            "max_page_num": 1200,
+            "workloads": [{"name": "random", "type": "random", "title": "Random Reference String"}],
+            "algorithms": [{"name": "FIFO"}, {"name": "Optimal", "weight": 4}]
+        }
+
+    "trace" holds the ReferenceStr arguments, and "trace" and "frames" can be overridden per workload.
+    If "output" has a "trace" folder, the generated traces are saved there and reused by later runs.
+    If "output" has a "cache" folder, the results of each frame count are cached there (see ResultCache),
+    so later runs only compute what changed. "cache_max_bytes" limits the size of the cache.
+    If "output" has a "results" path, every (workload, algorithm, frame count) row is appended there as
+    soon as it is computed (see ResultWriter), in the "results_format" format ("csv" by default), so a
+    crashed run keeps what it computed. The wide CSV files of each workload are still written. The
+    results of a previous run at that path are removed first; any other file or folder there is an error.
+    A "flusher" holds the Flusher arguments: every job is then simulated with the write-back daemon, and
+    the wide CSV files and the long-format results get the flusher results too.
+    """
+
+    def __init__(self, config):
+        """Constructor for ExperimentRunner.
+
+        Args:
+            config (dict): The experiment config.
+        """
+        self.config = config
+
+    @classmethod
+    def from_file(cls, path):
+        """Load the experiment config from a JSON file.
+
+        Args:
+            path (str): The path of the config file.
+
+        Returns:
+            ExperimentRunner: The experiment runner.
+        """
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def jobs(self):
+        """Expand the config into jobs, the slowest first.
+
+        Returns:
+            list: A list of job descriptions.
+        """
+        jobs = []
+        output = self.config.get("output", {})
+        for workload in self.config["workloads"]:
+            workload = {"type": workload["name"], **workload}
+            trace = {**self.config.get("trace", {}), **workload.get("trace", {})}
+            frames = {
+                "min": 10,
+                "max": 100,
+                "interval": 10,
+                **self.config.get("frames", {}),
+                **workload.get("frames", {}),
+            }
+            for algorithm in self.config["algorithms"]:
+                frame_count = len(range(frames["min"], frames["max"] + 1, frames["interval"]))
+                weight = algorithm.get(
+                    "weight", DEFAULT_WEIGHTS.get(algorithm["name"], 1)
+                )
+                jobs.append(
+                    {
+                        "workload": workload,
+                        "algorithm": algorithm,
+                        "trace": trace,
+                        "frames": frames,
+                        "max_page_num": self.config.get("max_page_num", 1200),
+                        "trace_folder": output.get("trace"),
+                        "cache_folder": output.get("cache"),
+                        "cache_options": (
+                            {"max_bytes": output["cache_max_bytes"]}
+                            if "cache_max_bytes" in output
+                            else {}
+                        ),
+                        "results_path": output.get("results"),
+                        "results_format": output.get("results_format", "csv"),
+                        "flusher": self.config.get("flusher"),
+                        "cost": weight * trace.get("length", 120000) * frame_count,
+                    }
+                )
+        jobs.sort(key=lambda job: job["cost"], reverse=True)
+        return jobs
+
+    def run(self, max_workers=None):
+        """Run every job in a process pool and save the results of each workload as soon as it is complete.
+
+        Args:
+            max_workers (int, optional): Number of processes. Defaults to the number of CPUs.
+
+        Raises:
+            ValueError: The "results" path holds something else than the results of ResultWriter.
+        """
+        from tqdm import tqdm
+
+        output = self.config.get("output", {})
+        csv_folder = output.get("csv", os.path.join("results", "csv"))
+        img_folder = output.get("figure", os.path.join("results", "figure"))
+        os.makedirs(csv_folder, exist_ok=True)
+        os.makedirs(img_folder, exist_ok=True)
+        if output.get("trace"):
+            os.makedirs(output["trace"], exist_ok=True)
+        if output.get("results"):
+            # The workers append to the long-format results, start from scratch. Only results written
+            # by ResultWriter are removed, anything else at that path raises.
+            remove_results(output["results"])
+
+        algorithm_names = [algorithm["name"] for algorithm in self.config["algorithms"]]
+        workloads = {workload["name"]: workload for workload in self.config["workloads"]}
+        results = {name: dict() for name in workloads}
+
+        jobs = self.jobs()
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_run_job, job) for job in jobs]
+            figures = []
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                workload_name, algorithm_name, result = future.result()
+                tqdm.write(f"Finished {algorithm_name} on {workload_name}.")
+                results[workload_name][algorithm_name] = result
+                if len(results[workload_name]) == len(algorithm_names):
+                    figures += self.save(
+                        workloads[workload_name],
+                        [results[workload_name][name] for name in algorithm_names],
+                        algorithm_names,
+                        csv_folder,
+                        img_folder,
+                        executor=pool,
+                    )
+            # Wait for the figures rendered by the workers.
+            for figure in figures:
+                figure.result()
+
+    def save(
+        self, workload, results, algorithm_names, csv_folder, img_folder, executor=None
+    ):
+        """Save the results of a workload to a CSV file and plot them.
+
+        Args:
+            workload (dict): The workload description.
+            results (list): The result DataFrames, in the order of algorithm_names.
+            algorithm_names (list): The algorithm names.
+            csv_folder (str): The folder of the CSV files.
+            img_folder (str): The folder of the figures.
+            executor (Executor, optional): Render the figures in this executor. Defaults to None.
+
+        Returns:
+            list: The futures of the figures if an executor is given, otherwise an empty list.
+        """
+        from pagereplacement.to_csv import ToCSV
+        from pagereplacement.plot import Plotter
+
+        name = workload["name"]
+        ToCSV(results).write(
+            col_name=algorithm_names,
+            path=csv_folder,
+            filename=f"{name}.csv",
+        )
+        return Plotter(results).plot(
+            title=workload.get("title", name),
+            algorithm_name=algorithm_names,
+            path=img_folder,
+            filenames=[
+                f"{name}_page_faults.png",
+                f"{name}_interrupts.png",
+                f"{name}_disk_writes.png",
+            ],
+            executor=executor,
+        )
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+from .page_replacement_algorithm.instrumentation import Instrumentation
+
+# The results added by the flusher, and their columns in the DataFrames of Simulator.run.
+COLUMNS = {
+    "stall_writes": "Stall Writes",
+    "background_writes": "Background Writes",
+    "background_io": "Background I/O",
+    "io_operations": "I/O Operations",
+}
+
+
+class Flusher:
+    """Write-back daemon model.
+
+    Without a flusher, every algorithm writes a dirty victim to disk when it is evicted: the page fault
+    stalls on the write. A flusher cleans dirty pages ahead of time instead, like the background
+    writeback of a kernel. It wakes up every `interval` references, and when more than `high_watermark`
+    of the frames hold dirty pages, it writes the pages dirtied first until only `low_watermark` of the
+    frames are dirty, `batch_size` pages per I/O operation. A page written by the flusher is clean until
+    it is referenced with its dirty bit set again, so its eviction costs no write.
+
+    The flusher works with any algorithm: it follows the events of the simulation through an
+    Instrumentation, keeps its own record of the dirty pages in memory (the dirty bit of a page is the
+    dirty bit of its last reference, as in the algorithms), and charges the writes itself. It does not
+    change the victims: an algorithm that prefers clean pages (ESC) or ages dirty pages differently
+    (LFU_DA) still sees the dirty bits of the references.
+
+    Results, besides the page faults:
+    - stall_writes: The dirty victims written while a page fault waits, one I/O operation each.
+    - background_writes: The pages written by the flusher.
+    - background_io: The I/O operations of the flusher, one per batch.
+    - io_operations: All the write I/O operations, stall_writes + background_io.
+    - disk_writes: All the pages written, stall_writes + background_writes.
+    - interrupts: The interrupts of the algorithm, with one per write I/O operation instead of one
+      per written page.
+    """
+
+    def __init__(self, interval=1000, batch_size=32, high_watermark=0.2, low_watermark=0.1):
+        """Constructor for Flusher.
+
+        Args:
+            interval (int, optional): The number of references between two wake-ups. Defaults to 1000.
+            batch_size (int, optional): The most pages written per I/O operation. Defaults to 32.
+            high_watermark (float, optional): The fraction of dirty frames over which the flusher writes.
+                Defaults to 0.2.
+            low_watermark (float, optional): The fraction of dirty frames the flusher writes down to.
+                Defaults to 0.1.
+
+        Raises:
+            ValueError: The watermarks are not 0 <= low_watermark <= high_watermark.
+        """
+        if not 0 <= low_watermark <= high_watermark:
+            raise ValueError("The watermarks must be 0 <= low_watermark <= high_watermark.")
+        self.interval = interval
+        self.batch_size = batch_size
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+
+    def parameters(self):
+        """Get the parameters that the results depend on.
+
+        Returns:
+            dict: The parameters (JSON serializable).
+        """
+        return {
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "high_watermark": self.high_watermark,
+            "low_watermark": self.low_watermark,
+        }
+
+    def compute(self, algorithm, num_of_frames):
+        """Simulate the reference string of an algorithm with the flusher.
+
+        Args:
+            algorithm (PageReplacementAlgorithm): The algorithm, holding the reference string.
+            num_of_frames (int): The number of frames in memory.
+
+        Returns:
+            dict: The page faults, interrupts, disk writes, stall writes, background writes, background
+                I/O operations and I/O operations.
+        """
+        high = int(num_of_frames * self.high_watermark)
+        low = int(num_of_frames * self.low_watermark)
+        batch_size = self.batch_size
+        # The dirty pages in memory, from the first dirtied.
+        dirty = OrderedDict()
+        stall_writes = 0
+        background_writes = 0
+        background_io = 0
+        # The dirty bits of the references being simulated, from the index start.
+        bits = b""
+        start = 0
+
+        def reference(index, page_num):
+            if bits[index - start]:
+                if page_num not in dirty:
+                    dirty[page_num] = None
+            else:
+                dirty.pop(page_num, None)
+
+        def eviction(index, page_num):
+            nonlocal stall_writes
+            if page_num in dirty:
+                del dirty[page_num]
+                stall_writes += 1
+
+        instrumentation = Instrumentation()
+        instrumentation.on("hit", reference)
+        instrumentation.on("fault", reference)
+        instrumentation.on("eviction", eviction)
+        attached = algorithm.instrumentation
+        algorithm.instrument(instrumentation)
+        try:
+            algorithm.start(num_of_frames)
+            length = len(algorithm.reference_str)
+            for start in range(0, length, self.interval):
+                stop = min(start + self.interval, length)
+                bits = algorithm.dirty_bits[start:stop]
+                algorithm.feed_range(start, stop)
+                # Wake up, and write the oldest dirty pages down to the low watermark.
+                if len(dirty) > high:
+                    pages = len(dirty) - low
+                    for _ in range(pages):
+                        dirty.popitem(last=False)
+                    background_writes += pages
+                    background_io += -(-pages // batch_size)
+            results = algorithm.finish()
+        finally:
+            algorithm.instrument(attached)
+
+        return {
+            "page_faults": results["page_faults"],
+            "interrupts": results["interrupts"]
+            - results["disk_writes"]
+            + stall_writes
+            + background_io,
+            "disk_writes": stall_writes + background_writes,
+            "stall_writes": stall_writes,
+            "background_writes": background_writes,
+            "background_io": background_io,
+            "io_operations": stall_writes + background_io,
+        }
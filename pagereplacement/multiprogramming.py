@@ -0,0 +1,460 @@
+import os
+from array import array
+
+from .trace import Trace
+
+
+def _apportion(amounts, total):
+    """Divide frames in proportion to some amounts, at least one each (largest remainder method).
+
+    Args:
+        amounts (list): The non-negative amounts.
+        total (int): The number of frames, at least len(amounts).
+
+    Returns:
+        list: The number of frames of each amount, summing to total.
+    """
+    spare = total - len(amounts)
+    weight = sum(amounts)
+    if not weight:
+        amounts = [1] * len(amounts)
+        weight = len(amounts)
+    shares = [amount * spare / weight for amount in amounts]
+    frames = [1 + int(share) for share in shares]
+    # Hand the frames left by the rounding to the largest fractional parts.
+    left = total - sum(frames)
+    for i in sorted(range(len(shares)), key=lambda i: int(shares[i]) - shares[i])[:left]:
+        frames[i] += 1
+    return frames
+
+
+def _fit(desired, total):
+    """Grant the desired numbers of frames if they fit, otherwise shrink them in proportion.
+
+    Args:
+        desired (list): The desired number of frames of each process, at least 1.
+        total (int): The number of frames, at least len(desired).
+
+    Returns:
+        list: The number of frames of each process.
+    """
+    if sum(desired) <= total:
+        return desired
+    # Everyone keeps one frame, the rest is shared in proportion to the frames desired beyond it.
+    return _apportion([frames - 1 for frames in desired], total)
+
+
+def round_robin(processes, quantum):
+    """Run the processes in turn, each for a quantum of references, until every reference string ends.
+
+    Args:
+        processes (list): The processes.
+        quantum (int): The number of references of a quantum.
+
+    Yields:
+        tuple: The process, and the start and stop of the references it runs.
+    """
+    return _rotate(processes, [quantum] * len(processes))
+
+
+def weighted_round_robin(processes, quantum):
+    """Run the processes in turn, each for a quantum of references scaled by its weight.
+
+    Args:
+        processes (list): The processes.
+        quantum (int): The number of references of a quantum of weight 1.
+
+    Yields:
+        tuple: The process, and the start and stop of the references it runs.
+    """
+    return _rotate(
+        processes, [max(1, round(quantum * process.weight)) for process in processes]
+    )
+
+
+def _rotate(processes, quanta):
+    positions = [0] * len(processes)
+    running = [i for i, process in enumerate(processes) if len(process.trace)]
+    while running:
+        still_running = []
+        for i in running:
+            length = len(processes[i].trace)
+            start = positions[i]
+            stop = positions[i] = min(start + quanta[i], length)
+            yield processes[i], start, stop
+            if stop < length:
+                still_running.append(i)
+        running = still_running
+
+
+# Schedulers that can be referred to by name.
+SCHEDULERS = {
+    "round-robin": round_robin,
+    "weighted": weighted_round_robin,
+}
+
+
+class EqualAllocator:
+    """Equal Allocator.
+
+    Splits the frames equally between the processes once, the partitions never change.
+    """
+
+    # Whether the allocation changes at run time.
+    dynamic = False
+
+    def allocate(self, processes, total_frames):
+        """Allocate the frames to the running processes.
+
+        Args:
+            processes (list): The running processes.
+            total_frames (int): The number of frames in memory.
+
+        Returns:
+            list: The number of frames of each process.
+        """
+        return _apportion([1] * len(processes), total_frames)
+
+
+class WorkingSetAllocator:
+    """Working Set Allocator.
+
+    The working set of a process is the set of distinct pages of its last `window` references, in the
+    virtual time of the process (Denning). Each process is granted as many frames as its working set;
+    when the working sets do not fit in memory, the partitions shrink in proportion to them. Only the
+    processes that ran since the last allocation measure their working set again.
+    """
+
+    dynamic = True
+
+    def __init__(self, window=1000):
+        """Constructor for WorkingSetAllocator.
+
+        Args:
+            window (int, optional): The number of references of the working set window. Defaults to 1000.
+        """
+        self.window = window
+        # Process -> (position, working set size).
+        self.sizes = dict()
+
+    def working_set_size(self, process):
+        """Get the number of distinct pages of the last references of a process.
+
+        Args:
+            process (Process): The process.
+
+        Returns:
+            int: The size of the working set.
+        """
+        measured = self.sizes.get(process)
+        if measured is None or measured[0] != process.position:
+            position = process.position
+            pages = process.trace.reference_str[max(0, position - self.window) : position]
+            measured = self.sizes[process] = (position, len(set(pages)))
+        return measured[1]
+
+    def allocate(self, processes, total_frames):
+        """Allocate the frames to the running processes.
+
+        Args:
+            processes (list): The running processes.
+            total_frames (int): The number of frames in memory.
+
+        Returns:
+            list: The number of frames of each process.
+        """
+        if not any(process.position for process in processes):
+            return EqualAllocator().allocate(processes, total_frames)
+        return _fit(
+            [max(1, self.working_set_size(process)) for process in processes],
+            total_frames,
+        )
+
+
+class PageFaultFrequencyAllocator:
+    """Page-Fault Frequency Allocator.
+
+    Measures the fault rate of each process (page faults per reference) since the last allocation. A
+    process faulting more often than `upper` is granted more frames, one faulting less often than
+    `lower` gives some back, and the others keep theirs. The frames given back stay free until a process
+    asks for them; when the requests do not fit in memory, the partitions shrink in proportion to them.
+    """
+
+    dynamic = True
+
+    def __init__(self, lower=0.01, upper=0.05, step=0.25):
+        """Constructor for PageFaultFrequencyAllocator.
+
+        Args:
+            lower (float, optional): The fault rate under which a process gives frames back. Defaults to 0.01.
+            upper (float, optional): The fault rate over which a process is granted frames. Defaults to 0.05.
+            step (float, optional): The fraction of its frames a process gains or loses. Defaults to 0.25.
+        """
+        self.lower = lower
+        self.upper = upper
+        self.step = step
+        # Process -> (references, page faults) at the last allocation.
+        self.last = dict()
+
+    def allocate(self, processes, total_frames):
+        """Allocate the frames to the running processes.
+
+        Args:
+            processes (list): The running processes.
+            total_frames (int): The number of frames in memory.
+
+        Returns:
+            list: The number of frames of each process.
+        """
+        if not any(process.frames for process in processes):
+            frames = EqualAllocator().allocate(processes, total_frames)
+            for process in processes:
+                self.last[process] = (process.position, process.page_faults)
+            return frames
+
+        desired = []
+        for process in processes:
+            frames = process.frames
+            position, page_faults = self.last.get(process, (0, 0))
+            references = process.position - position
+            if references:
+                rate = (process.page_faults - page_faults) / references
+                change = max(1, int(frames * self.step))
+                if rate > self.upper:
+                    frames += change
+                elif rate < self.lower:
+                    frames = max(1, frames - change)
+            self.last[process] = (process.position, process.page_faults)
+            desired.append(frames)
+        return _fit(desired, total_frames)
+
+
+# Allocators that can be referred to by name.
+ALLOCATORS = {
+    "equal": EqualAllocator,
+    "working-set": WorkingSetAllocator,
+    "pff": PageFaultFrequencyAllocator,
+}
+
+
+class Process:
+    """A simulated process: its reference string, scheduling weight, frames and results."""
+
+    def __init__(self, name, trace, weight=1):
+        self.name = name
+        self.trace = trace
+        self.weight = weight
+        # The number of references run so far.
+        self.position = 0
+        # The frames of the partition of the process, 0 with global replacement.
+        self.frames = 0
+        self.page_faults = 0
+        self.interrupts = 0
+        self.disk_writes = 0
+
+    def charge(self, before, after):
+        """Add the results of a policy between two points to the process.
+
+        Args:
+            before (dict): The results of the policy before.
+            after (dict): The results of the policy after.
+        """
+        self.page_faults += after["page_faults"] - before["page_faults"]
+        self.interrupts += after["interrupts"] - before["interrupts"]
+        self.disk_writes += after["disk_writes"] - before["disk_writes"]
+
+    def get_results(self):
+        """Get the results.
+
+        Returns:
+            dict: The name, references, frames, page faults, interrupts, and disk writes of the process.
+        """
+        return {
+            "name": self.name,
+            "references": self.position,
+            "frames": self.frames,
+            "page_faults": self.page_faults,
+            "interrupts": self.interrupts,
+            "disk_writes": self.disk_writes,
+        }
+
+
+class MultiprogrammingSimulator:
+    """Simulator of several processes sharing the frames of one memory.
+
+    The reference strings of the processes are interleaved by a scheduler, quantum by quantum. With
+    global replacement, a single policy replaces any page of any process: the page numbers of each
+    process are moved to their own range, and the interleaved reference string is simulated at once.
+    With local replacement, each process has a partition of the frames replaced by its own instance of
+    the policy, and an allocator may move frames between the partitions at run time (the policy evicts
+    the pages of a shrinking partition, see PageReplacementAlgorithm.resize).
+
+    Any page replacement algorithm class is a policy. The faults, interrupts and disk writes of a
+    quantum are charged to the process that runs it; with global replacement this includes the disk
+    writes of the pages of other processes it evicts.
+    """
+
+    def __init__(self, traces, names=None, weights=None):
+        """Constructor for MultiprogrammingSimulator.
+
+        Args:
+            traces (list): The reference strings of the processes, as Traces or paths of trace files.
+            names (list, optional): The names of the processes. Defaults to the paths, or the indexes.
+            weights (list, optional): The scheduling weights of the processes. Defaults to 1 each.
+        """
+        self.traces = [
+            Trace.load(trace) if isinstance(trace, (str, os.PathLike)) else trace
+            for trace in traces
+        ]
+        if names is None:
+            names = [
+                os.fspath(trace) if isinstance(trace, (str, os.PathLike)) else str(i)
+                for i, trace in enumerate(traces)
+            ]
+        self.names = names
+        self.weights = weights if weights is not None else [1] * len(self.traces)
+
+    def run(
+        self,
+        algorithm,
+        num_of_frames,
+        scope="local",
+        allocator="equal",
+        scheduler="round-robin",
+        quantum=100,
+        rebalance_interval=50000,
+    ):
+        """Run the processes with a page replacement algorithm.
+
+        Args:
+            algorithm (class): The page replacement algorithm class, the policy of every partition.
+            num_of_frames (int): The number of frames in memory.
+            scope (str, optional): "local" or "global" replacement. Defaults to "local".
+            allocator (str or object, optional): With local replacement, a name in ALLOCATORS or an
+                allocator such as WorkingSetAllocator(window=2000). Defaults to "equal".
+            scheduler (str or callable, optional): A name in SCHEDULERS or a generator function like
+                round_robin. Defaults to "round-robin".
+            quantum (int, optional): The number of references of a quantum. Defaults to 100.
+            rebalance_interval (int, optional): The number of references between two allocations of a
+                dynamic allocator. Defaults to 50000.
+
+        Raises:
+            ValueError: Unknown scope, allocator or scheduler, or fewer frames than processes with local
+                replacement.
+
+        Returns:
+            dict: The results of each process ("processes") and their sum ("total").
+        """
+        if isinstance(scheduler, str):
+            if scheduler not in SCHEDULERS:
+                raise ValueError(f"Unknown scheduler: {scheduler}")
+            scheduler = SCHEDULERS[scheduler]
+        if isinstance(allocator, str):
+            if allocator not in ALLOCATORS:
+                raise ValueError(f"Unknown allocator: {allocator}")
+            allocator = ALLOCATORS[allocator]()
+        processes = [
+            Process(name, trace, weight)
+            for name, trace, weight in zip(self.names, self.traces, self.weights)
+        ]
+        schedule = scheduler(processes, quantum)
+
+        if scope == "global":
+            if allocator.dynamic:
+                raise ValueError("Allocators only apply to local replacement.")
+            self._run_global(algorithm, num_of_frames, processes, schedule)
+        elif scope == "local":
+            if num_of_frames < len(processes):
+                raise ValueError("Local replacement needs at least one frame per process.")
+            self._run_local(
+                algorithm, num_of_frames, processes, schedule, allocator, rebalance_interval
+            )
+        else:
+            raise ValueError(f"Unknown scope: {scope}")
+
+        results = [process.get_results() for process in processes]
+        return {
+            "processes": results,
+            "total": {
+                key: sum(result[key] for result in results)
+                for key in ("references", "page_faults", "interrupts", "disk_writes")
+            },
+        }
+
+    def _run_global(self, algorithm, num_of_frames, processes, schedule):
+        # Move the pages of each process to their own range.
+        offsets = []
+        num_of_pages = 0
+        for process in processes:
+            offsets.append(num_of_pages)
+            num_of_pages += process.trace.max_page_num + 1
+        offset_of = dict(zip(processes, offsets))
+
+        # Interleave the reference strings once, so that even Optimal sees the future of every process.
+        pages = array("H" if num_of_pages <= 0x10000 else "I")
+        dirty_bits = bytearray()
+        quanta = []
+        for process, start, stop in schedule:
+            offset = offset_of[process]
+            reference_str = process.trace.reference_str[start:stop]
+            pages.extend([page_num + offset for page_num in reference_str] if offset else reference_str)
+            dirty_bits += process.trace.dirty_bits[start:stop]
+            quanta.append((process, stop - start))
+        trace = Trace.from_buffers(
+            pages, Trace.pack(dirty_bits), len(pages), max_page_num=max(num_of_pages - 1, 0)
+        )
+        del dirty_bits
+
+        policy = algorithm(reference_str=trace, max_page_num=trace.max_page_num)
+        policy.start(num_of_frames)
+        before = policy.get_results()
+        position = 0
+        for process, length in quanta:
+            after = policy.feed_range(position, position + length)
+            position += length
+            process.position += length
+            process.charge(before, after)
+            before = after
+        if quanta:
+            quanta[-1][0].charge(before, policy.finish())
+
+    def _run_local(self, algorithm, num_of_frames, processes, schedule, allocator, rebalance_interval):
+        policies = dict()
+        for process, frames in zip(processes, allocator.allocate(processes, num_of_frames)):
+            policy = policies[process] = algorithm(
+                reference_str=process.trace, max_page_num=process.trace.max_page_num
+            )
+            policy.start(frames)
+            process.frames = frames
+
+        clock = 0
+        next_rebalance = rebalance_interval
+        for process, start, stop in schedule:
+            policy = policies[process]
+            before = policy.get_results()
+            process.charge(before, policy.feed_range(start, stop))
+            process.position = stop
+            clock += stop - start
+
+            if allocator.dynamic and clock >= next_rebalance:
+                next_rebalance = clock + rebalance_interval
+                # The frames of the processes that have ended go back to the others.
+                running = [process for process in processes if process.position < len(process.trace)]
+                if running:
+                    self._reallocate(running, allocator.allocate(running, num_of_frames), policies)
+
+        for process in processes:
+            policy = policies[process]
+            process.charge(policy.get_results(), policy.finish())
+
+    @staticmethod
+    def _reallocate(processes, allocation, policies):
+        # Shrink the partitions first, so the memory never holds more pages than frames.
+        for process, frames in sorted(
+            zip(processes, allocation), key=lambda item: item[1] - item[0].frames
+        ):
+            if frames != process.frames:
+                policy = policies[process]
+                before = policy.get_results()
+                process.charge(before, policy.resize(frames))
+                process.frames = frames
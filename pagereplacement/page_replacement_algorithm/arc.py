@@ -0,0 +1,243 @@
+import time
+from collections import OrderedDict
+
+from .page_replacement_algorithm import PageReplacementAlgorithm
+
+
+class ARCDirectory:
+    """Cache directory of ARC.
+
+    Four LRU lists, each an OrderedDict from the least to the most recently used page:
+    - t1: Pages in memory referenced once recently (page number -> dirty bit).
+    - t2: Pages in memory referenced at least twice recently (page number -> dirty bit).
+    - b1: Ghosts of the pages evicted from t1 (page numbers only).
+    - b2: Ghosts of the pages evicted from t2 (page numbers only).
+
+    `target` is the adaptive target size of t1. Every operation is O(1).
+    """
+
+    def __init__(self, num_of_frames):
+        self.num_of_frames = num_of_frames
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+        self.target = 0
+
+    def replace(self, in_b2):
+        """Evict the LRU page of t1 or t2, according to the target size of t1, and remember it as a ghost.
+
+        Args:
+            in_b2 (bool): Whether the referenced page is a ghost of b2.
+
+        Returns:
+            tuple: The evicted page number and its dirty bit.
+        """
+        t1 = self.t1
+        if t1 and (len(t1) > self.target or (in_b2 and len(t1) == self.target)):
+            page_num, dirty_bit = t1.popitem(last=False)
+            self.b1[page_num] = None
+        else:
+            page_num, dirty_bit = self.t2.popitem(last=False)
+            self.b2[page_num] = None
+        return page_num, dirty_bit
+
+    def resize(self, num_of_frames):
+        """Change the number of frames, evicting pages as replace would and forgetting the oldest ghosts.
+
+        ARC only keeps ghosts while the memory is full, so a larger memory forgets them all.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            list: The evicted page numbers and their dirty bits.
+        """
+        c = self.num_of_frames = num_of_frames
+        t1, t2, b1, b2 = self.t1, self.t2, self.b1, self.b2
+        self.target = min(self.target, c)
+        if len(t1) + len(t2) < c:
+            b1.clear()
+            b2.clear()
+            return []
+        evicted = [self.replace(False) for _ in range(len(t1) + len(t2) - c)]
+        # Keep the bounds of the directory: |t1| + |b1| <= c and the four lists <= 2c.
+        while len(t1) + len(b1) > c:
+            b1.popitem(last=False)
+        while len(t1) + len(t2) + len(b1) + len(b2) > 2 * c:
+            b2.popitem(last=False)
+        return evicted
+
+    def miss(self, page_num, dirty_bit):
+        """Load a page that is not in memory, evicting a page if the memory is full.
+
+        Args:
+            page_num (int): The referenced page number.
+            dirty_bit (int): The dirty bit of the reference.
+
+        Returns:
+            tuple: The evicted page number and its dirty bit, or None if no page is evicted.
+        """
+        c = self.num_of_frames
+        t1, t2, b1, b2 = self.t1, self.t2, self.b1, self.b2
+        victim = None
+        if page_num in b1:
+            # A recency ghost is referenced again, favour recency.
+            self.target = min(c, self.target + max(len(b2) // len(b1), 1))
+            victim = self.replace(False)
+            del b1[page_num]
+            t2[page_num] = dirty_bit
+            return victim
+        if page_num in b2:
+            # A frequency ghost is referenced again, favour frequency.
+            self.target = max(0, self.target - max(len(b1) // len(b2), 1))
+            victim = self.replace(True)
+            del b2[page_num]
+            t2[page_num] = dirty_bit
+            return victim
+
+        recency = len(t1) + len(b1)
+        if recency == c:
+            if len(t1) < c:
+                b1.popitem(last=False)
+                victim = self.replace(False)
+            else:
+                # b1 is empty, discard the LRU page of t1 without a ghost.
+                victim = t1.popitem(last=False)
+        elif recency + len(t2) + len(b2) >= c:
+            if recency + len(t2) + len(b2) == 2 * c:
+                b2.popitem(last=False)
+            victim = self.replace(False)
+        t1[page_num] = dirty_bit
+        return victim
+
+
+class ARC(PageReplacementAlgorithm):
+    """Adaptive Replacement Cache.
+
+    ARC (Megiddo and Modha) splits the memory between the pages referenced once recently (t1) and
+    the pages referenced at least twice recently (t2), both LRU. It also remembers as many recently
+    evicted pages (ghosts), and moves the target size of t1 towards the list whose ghosts are
+    referenced again, so it adapts between recency and frequency, and a scan only flushes t1.
+    """
+
+    checkpoint_attributes = ("directory",)
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
+        """Constructor for ARC.
+
+        Args:
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+        """
+        super().__init__(reference_str, dirty_bits, max_page_num)
+
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.directory = ARCDirectory(num_of_frames)
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        return self.write_back(self.directory.resize(num_of_frames))
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        directory = self.directory
+        t1 = directory.t1
+        t2 = directory.t2
+
+        # Simulate the process of page replacement.
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
+            if ref_page_num in t2:
+                # Update the dirty bit and make the page the most recently used.
+                t2[ref_page_num] = dirty_bit
+                t2.move_to_end(ref_page_num)
+            elif ref_page_num in t1:
+                # A second reference moves the page to the frequency list.
+                del t1[ref_page_num]
+                t2[ref_page_num] = dirty_bit
+            else:
+                # The page is not in memory, page fault occurs.
+                self.page_faults += 1
+                self.interrupts += 1
+                victim = directory.miss(ref_page_num, dirty_bit)
+                # If the replaced page is dirty, write it to disk.
+                if victim is not None and victim[1]:
+                    self.disk_writes += 1
+                    self.interrupts += 1
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        directory = self.directory
+        t1 = directory.t1
+        t2 = directory.t2
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if ref_page_num in t2:
+                emit("hit", index, ref_page_num)
+                t2[ref_page_num] = dirty_bit
+                t2.move_to_end(ref_page_num)
+            elif ref_page_num in t1:
+                emit("hit", index, ref_page_num)
+                del t1[ref_page_num]
+                t2[ref_page_num] = dirty_bit
+            else:
+                fault_start = clock()
+                emit("fault", index, ref_page_num)
+                self.page_faults += 1
+                self.interrupts += 1
+                victim_start = clock()
+                victim = directory.miss(ref_page_num, dirty_bit)
+                if victim is not None:
+                    instrumentation.add_time("victim", clock() - victim_start)
+                    emit("eviction", index, victim[0])
+                    if victim[1]:
+                        emit("write_back", index, victim[0])
+                        self.disk_writes += 1
+                        self.interrupts += 1
+                instrumentation.add_time("fault", clock() - fault_start)
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
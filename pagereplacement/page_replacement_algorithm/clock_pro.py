@@ -0,0 +1,332 @@
+import time
+
+from .page_replacement_algorithm import PageReplacementAlgorithm
+
+# The status of a page in the clock.
+HOT = 1
+COLD = 2
+# A cold page that has left memory, still in its test period.
+TEST = 3
+
+
+class ClockProRing:
+    """The clock of CLOCK-Pro.
+
+    A circular doubly linked list of the resident pages and of at most as many non-resident test pages,
+    kept as next/prev dictionaries keyed by page number, so a page is inserted, moved to the head or
+    removed in O(1). New pages are inserted at the head, just behind hand_hot. Three hands move around
+    the clock in the same direction:
+    - hand_cold: Finds the cold page to replace. A referenced cold page is promoted to hot if it is in
+      its test period, and starts a test period otherwise.
+    - hand_hot: Demotes the hot pages not referenced since its last pass, to keep the hot pages within
+      their share of the memory, and ends the test periods of the cold pages it passes.
+    - hand_test: Ends the test periods of the cold pages it passes, to keep at most as many non-resident
+      test pages as frames.
+
+    A hand passes each page at most once per revolution and a revolution is paid for by the references
+    that set the reference bits and by the faults, so the work per reference is O(1) amortized.
+
+    `cold_target` is the adaptive number of frames for cold pages: it grows when a page is referenced
+    again during its test period, and shrinks when a test period ends without a reference.
+    """
+
+    def __init__(self, num_of_frames):
+        self.num_of_frames = num_of_frames
+        self.cold_target = num_of_frames
+        self.next = dict()
+        self.prev = dict()
+        self.status = dict()
+        # Resident page -> reference bit.
+        self.referenced = dict()
+        # Resident page -> dirty bit.
+        self.dirty = dict()
+        # Resident cold pages in their test period.
+        self.testing = set()
+        self.hand_hot = None
+        self.hand_cold = None
+        self.hand_test = None
+        self.count_hot = 0
+        self.count_cold = 0
+        self.count_test = 0
+        # The pages evicted by the current miss, with their dirty bits.
+        self.evicted = []
+
+    def _insert(self, page_num):
+        hand = self.hand_hot
+        if hand is None:
+            self.next[page_num] = self.prev[page_num] = page_num
+            self.hand_hot = self.hand_cold = self.hand_test = page_num
+            return
+        before = self.prev[hand]
+        self.next[before] = page_num
+        self.prev[page_num] = before
+        self.next[page_num] = hand
+        self.prev[hand] = page_num
+
+    def _remove(self, page_num):
+        after = self.next.pop(page_num)
+        before = self.prev.pop(page_num)
+        if after == page_num:
+            self.hand_hot = self.hand_cold = self.hand_test = None
+            return
+        self.next[before] = after
+        self.prev[after] = before
+        # The hands on the removed page move on to the next one.
+        if self.hand_hot == page_num:
+            self.hand_hot = after
+        if self.hand_cold == page_num:
+            self.hand_cold = after
+        if self.hand_test == page_num:
+            self.hand_test = after
+
+    def _end_test(self, page_num):
+        # The test period of a cold page ends without a reference: fewer frames for cold pages.
+        if self.status[page_num] == TEST:
+            self._remove(page_num)
+            del self.status[page_num]
+            self.count_test -= 1
+        else:
+            self.testing.remove(page_num)
+        if self.cold_target > 1:
+            self.cold_target -= 1
+
+    def miss(self, page_num, dirty_bit):
+        """Load a page that is not in memory, evicting a page if the memory is full.
+
+        Args:
+            page_num (int): The referenced page number.
+            dirty_bit (int): The dirty bit of the reference.
+
+        Returns:
+            list: The evicted page numbers and their dirty bits.
+        """
+        self.evicted = []
+        promote = self.status.get(page_num) == TEST
+        if promote:
+            # Referenced again during its test period: more frames for cold pages, and the page is hot.
+            if self.cold_target < self.num_of_frames:
+                self.cold_target += 1
+            self._remove(page_num)
+            del self.status[page_num]
+            self.count_test -= 1
+        if self.count_hot + self.count_cold >= self.num_of_frames:
+            self._run_hand_cold()
+        self._insert(page_num)
+        self.referenced[page_num] = 0
+        self.dirty[page_num] = dirty_bit
+        if promote:
+            self.status[page_num] = HOT
+            self.count_hot += 1
+            self._run_hand_hot()
+        else:
+            self.status[page_num] = COLD
+            self.testing.add(page_num)
+            self.count_cold += 1
+        return self.evicted
+
+    def resize(self, num_of_frames):
+        """Change the number of frames, replacing cold pages as a miss would.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            list: The evicted page numbers and their dirty bits.
+        """
+        self.evicted = []
+        self.num_of_frames = num_of_frames
+        self.cold_target = min(self.cold_target, num_of_frames)
+        # Demote hot pages first, so there is always a cold page for hand_cold.
+        self._run_hand_hot()
+        while self.count_hot + self.count_cold > num_of_frames:
+            self._run_hand_cold()
+        self._run_hand_test()
+        return self.evicted
+
+    def _run_hand_cold(self):
+        # Move until a cold page is replaced.
+        status = self.status
+        referenced = self.referenced
+        while True:
+            page_num = self.hand_cold
+            if status[page_num] != COLD:
+                self.hand_cold = self.next[page_num]
+                continue
+            if not referenced[page_num]:
+                break
+            # Move the referenced page to the head of the list.
+            referenced[page_num] = 0
+            self._remove(page_num)
+            self._insert(page_num)
+            if page_num in self.testing:
+                self.testing.remove(page_num)
+                status[page_num] = HOT
+                self.count_cold -= 1
+                self.count_hot += 1
+                self._run_hand_hot()
+            else:
+                self.testing.add(page_num)
+
+        # Replace the page. In its test period, it stays in the clock as a non-resident page.
+        self.hand_cold = self.next[page_num]
+        self.count_cold -= 1
+        del referenced[page_num]
+        self.evicted.append((page_num, self.dirty.pop(page_num)))
+        if page_num in self.testing:
+            self.testing.remove(page_num)
+            status[page_num] = TEST
+            self.count_test += 1
+            self._run_hand_test()
+        else:
+            self._remove(page_num)
+            del status[page_num]
+
+    def _run_hand_hot(self):
+        # Move until the hot pages fit in their share of the memory.
+        status = self.status
+        while self.count_hot > self.num_of_frames - self.cold_target:
+            page_num = self.hand_hot
+            self.hand_hot = self.next[page_num]
+            if status[page_num] == HOT:
+                if self.referenced[page_num]:
+                    self.referenced[page_num] = 0
+                else:
+                    status[page_num] = COLD
+                    self.count_hot -= 1
+                    self.count_cold += 1
+            elif status[page_num] == TEST or page_num in self.testing:
+                self._end_test(page_num)
+
+    def _run_hand_test(self):
+        # Move until there are at most as many non-resident pages as frames.
+        status = self.status
+        while self.count_test > self.num_of_frames:
+            page_num = self.hand_test
+            self.hand_test = self.next[page_num]
+            if status[page_num] == TEST or page_num in self.testing:
+                self._end_test(page_num)
+
+
+class ClockPro(PageReplacementAlgorithm):
+    """CLOCK-Pro Page Replacement Algorithm.
+
+    CLOCK-Pro (Jiang, Chen and Zhang) approximates LIRS with a clock. The resident pages are hot
+    (small reuse distance) or cold, and a cold page is only promoted to hot if it is referenced again
+    soon enough, within its test period, which lasts after the page has left memory. So the pages of
+    a scan stay cold and are replaced first, and the split between hot and cold frames adapts to the
+    workload.
+    """
+
+    checkpoint_attributes = ("ring",)
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
+        """Constructor for ClockPro.
+
+        Args:
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+        """
+        super().__init__(reference_str, dirty_bits, max_page_num)
+
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.ring = ClockProRing(num_of_frames)
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        return self.write_back(self.ring.resize(num_of_frames))
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        ring = self.ring
+        referenced = ring.referenced
+        dirty = ring.dirty
+
+        # Simulate the process of page replacement.
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
+            if ref_page_num in dirty:
+                # Set the reference bit and update the dirty bit.
+                referenced[ref_page_num] = 1
+                dirty[ref_page_num] = dirty_bit
+                continue
+            # The page is not in memory, page fault occurs.
+            self.page_faults += 1
+            self.interrupts += 1
+            for _, is_dirty in ring.miss(ref_page_num, dirty_bit):
+                # If the replaced page is dirty, write it to disk.
+                if is_dirty:
+                    self.disk_writes += 1
+                    self.interrupts += 1
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        ring = self.ring
+        referenced = ring.referenced
+        dirty = ring.dirty
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if ref_page_num in dirty:
+                emit("hit", index, ref_page_num)
+                referenced[ref_page_num] = 1
+                dirty[ref_page_num] = dirty_bit
+                continue
+            fault_start = clock()
+            emit("fault", index, ref_page_num)
+            self.page_faults += 1
+            self.interrupts += 1
+            victim_start = clock()
+            evicted = ring.miss(ref_page_num, dirty_bit)
+            if evicted:
+                instrumentation.add_time("victim", clock() - victim_start)
+            for victim_page_num, is_dirty in evicted:
+                emit("eviction", index, victim_page_num)
+                if is_dirty:
+                    emit("write_back", index, victim_page_num)
+                    self.disk_writes += 1
+                    self.interrupts += 1
+            instrumentation.add_time("fault", clock() - fault_start)
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
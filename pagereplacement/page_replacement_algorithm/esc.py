@@ -1,27 +1,112 @@
+import heapq
+import time
+from collections import deque
+
 from .page_replacement_algorithm import PageReplacementAlgorithm
 
 
 class CircularQueue:
-    """Circular Queue for ESC.(Not a true circular queue structure.)"""
+    """Circular Queue for ESC.
+
+    A clock over a fixed number of frames. The reference and dirty bits are kept in bytearrays
+    indexed by frame, and a page -> frame map replaces the linear membership test.
+
+    The scan order is the order in which the resident pages were loaded. A reference bit is only
+    set when a page is loaded and only cleared by a step (2) sweep, so the frames whose reference
+    bit is set form a queue in load order: the front of that queue is the hand of the sweep.
+    Frames whose reference bit is clear are kept in one min-heap per dirty bit keyed by load order,
+    so the first (0,0) or (0,1) frame is found without rescanning the buffer from the head.
+    """
 
     def __init__(self, size):
         self.max_size = size
-        self.queue = []
-        self.ref_dirty_pair = dict()
+        self.pages = [0] * size
+        self.ref_bits = bytearray(size)
+        self.dirty_bits = bytearray(size)
+        self.load_order = [-1] * size
+        self.frame_of = dict()
+        self.free_frames = list(range(size - 1, -1, -1))
+        self.loaded = 0
+        # Frames with the reference bit set, in load order.
+        self.referenced = deque()
+        # Frames with the reference bit clear, one heap per dirty bit (stale entries are skipped).
+        self.unreferenced = ([], [])
+
+    def __contains__(self, page_num):
+        return page_num in self.frame_of
 
     def is_full(self):
-        return len(self.queue) == self.max_size
+        return len(self.frame_of) == self.max_size
 
     def push(self, page_num, dirty_bit):
-        self.queue.append(page_num)
-        self.ref_dirty_pair[page_num] = {"ref_bit": 1, "dirty_bit": dirty_bit}
+        frame = self.free_frames.pop()
+        self.pages[frame] = page_num
+        self.ref_bits[frame] = 1
+        self.dirty_bits[frame] = dirty_bit
+        self.load_order[frame] = self.loaded
+        self.loaded += 1
+        self.frame_of[page_num] = frame
+        self.referenced.append(frame)
 
     def pop(self, page_num):
-        is_dirty = True if self.ref_dirty_pair[page_num]["dirty_bit"] == 1 else False
-        del self.ref_dirty_pair[page_num]
-        self.queue.pop(self.queue.index(page_num))
+        frame = self.frame_of.pop(page_num)
+        is_dirty = True if self.dirty_bits[frame] == 1 else False
+        self.load_order[frame] = -1
+        self.free_frames.append(frame)
         return is_dirty
 
+    def set_dirty(self, page_num, dirty_bit):
+        frame = self.frame_of[page_num]
+        if self.dirty_bits[frame] != dirty_bit:
+            self.dirty_bits[frame] = dirty_bit
+            if not self.ref_bits[frame]:
+                self._push_unreferenced(frame)
+
+    def resize(self, size):
+        # Frames beyond the new size stay allocated, only the number of resident pages is bounded.
+        allocated = len(self.pages)
+        if size > allocated:
+            extra = size - allocated
+            self.pages.extend([0] * extra)
+            self.ref_bits.extend(bytes(extra))
+            self.dirty_bits.extend(bytes(extra))
+            self.load_order.extend([-1] * extra)
+            self.free_frames[:0] = range(size - 1, allocated - 1, -1)
+        self.max_size = size
+
+    def clear_ref_bit(self, frame):
+        self.ref_bits[frame] = 0
+        self._push_unreferenced(frame)
+
+    def first_unreferenced(self, dirty_bit):
+        """Return the first frame in load order whose (reference bit, dirty bit) is (0, dirty_bit)."""
+        heap = self.unreferenced[dirty_bit]
+        while heap:
+            order, frame = heap[0]
+            if (
+                self.load_order[frame] == order
+                and not self.ref_bits[frame]
+                and self.dirty_bits[frame] == dirty_bit
+            ):
+                return frame
+            heapq.heappop(heap)
+        return None
+
+    def _push_unreferenced(self, frame):
+        heapq.heappush(
+            self.unreferenced[self.dirty_bits[frame]], (self.load_order[frame], frame)
+        )
+        # Drop the stale entries once they outnumber the frames.
+        if len(self.unreferenced[0]) + len(self.unreferenced[1]) > 4 * self.max_size + 64:
+            self.unreferenced = ([], [])
+            for frame in self.frame_of.values():
+                if not self.ref_bits[frame]:
+                    self.unreferenced[self.dirty_bits[frame]].append(
+                        (self.load_order[frame], frame)
+                    )
+            heapq.heapify(self.unreferenced[0])
+            heapq.heapify(self.unreferenced[1])
+
 
 class ESC(PageReplacementAlgorithm):
     """Enhanced Second Chance Algorithm.
@@ -39,12 +124,15 @@ class ESC(PageReplacementAlgorithm):
     (3) If step 2 faild, all reference bits will now be zero and repetition of step (1) and (2) will find a frame for replacement.
     """
 
-    def __init__(self, reference_str, dirty_bits, max_page_num=1200):
+    lockstep = True
+    checkpoint_attributes = ("cqueue",)
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
         """Constructor for ESC.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
             max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
         """
         super().__init__(reference_str, dirty_bits, max_page_num)
@@ -61,37 +149,70 @@ class ESC(PageReplacementAlgorithm):
         while True:
             interrupt_cost = 0
             # Step (1) Cycle through the buffer looking for (0,0). If one is found, use that page.
-            for page_num in cqueue.queue:
-                ref_dirty_pair = cqueue.ref_dirty_pair[page_num]
-                if ref_dirty_pair["ref_bit"] == 0 and ref_dirty_pair["dirty_bit"] == 0:
-                    victim_page = page_num
-                    return victim_page, interrupt_cost
+            frame = cqueue.first_unreferenced(0)
+            if frame is not None:
+                victim_page = cqueue.pages[frame]
+                return victim_page, interrupt_cost
 
             # Step (2) Cycle through the buffer looking for (0,1). Set the reference bit to 0 for all pages bypassed.
-            for page_num in cqueue.queue:
-                ref_dirty_pair = cqueue.ref_dirty_pair[page_num]
-                if ref_dirty_pair["ref_bit"] == 0 and ref_dirty_pair["dirty_bit"] == 1:
-                    victim_page = page_num
-                    return victim_page, interrupt_cost
-                else:
-                    cqueue.ref_dirty_pair[page_num]["ref_bit"] = 0
-                    interrupt_cost += 1
+            # As there is no (0,0), every page before the first (0,1) has its reference bit set.
+            frame = cqueue.first_unreferenced(1)
+            order = cqueue.load_order[frame] if frame is not None else cqueue.loaded
+            referenced = cqueue.referenced
+            while referenced and cqueue.load_order[referenced[0]] < order:
+                cqueue.clear_ref_bit(referenced.popleft())
+                interrupt_cost += 1
+            if frame is not None:
+                victim_page = cqueue.pages[frame]
+                return victim_page, interrupt_cost
 
-    def compute(self, num_of_frames):
-        """Compute the number of page faults, interrupts, and disk writes.
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
 
         Args:
             num_of_frames (int): The number of frames in memory.
         """
         super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.cqueue = CircularQueue(size=num_of_frames)
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, evicting pages as a page fault would.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        cqueue = self.cqueue
+        evicted = []
+        while len(cqueue.frame_of) > num_of_frames:
+            victim_page_num, interrupt_cost = self.find_page_to_replace(cqueue)
+            self.interrupts += interrupt_cost
+            evicted.append((victim_page_num, cqueue.pop(victim_page_num)))
+        cqueue.resize(num_of_frames)
+        return self.write_back(evicted)
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
 
-        cqueue = CircularQueue(size=num_of_frames)
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        cqueue = self.cqueue
+        frame_of = cqueue.frame_of
 
         # Simulate the process of page replacement.
-        for index, ref_page_num in enumerate(self.reference_str):
-            dirty_bit = self.dirty_bits[index]
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
             # If the page is not in memory, page fault occurs.
-            if ref_page_num not in cqueue.queue:
+            if ref_page_num not in frame_of:
                 self.page_faults += 1
                 self.interrupts += 1
                 # If the memory is full, replace the page.
@@ -106,6 +227,163 @@ class ESC(PageReplacementAlgorithm):
                 # Add the new page to memory.
                 cqueue.push(ref_page_num, dirty_bit)
             else:
-                # Update the reference bit.
-                if dirty_bit != cqueue.ref_dirty_pair[ref_page_num]["dirty_bit"]:
-                    cqueue.ref_dirty_pair[ref_page_num]["dirty_bit"] = dirty_bit
+                # Update the dirty bit.
+                cqueue.set_dirty(ref_page_num, dirty_bit)
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def compute_lockstep(self, frame_counts):
+        """Compute the results for several numbers of frames in a single walk of the reference string.
+
+        The residency of each page in every memory is a bit mask, so a page found in every memory costs
+        a single test. The dirty bit of a page in memory is always the dirty bit of its last reference,
+        so the memories holding the page are only visited when that dirty bit changes.
+
+        Args:
+            frame_counts (list): The distinct numbers of frames in memory, in increasing order.
+
+        Returns:
+            dict: The number of frames -> a dictionary containing the page faults, interrupts, and disk writes.
+        """
+        reference_str = self.reference_str
+        num_of_pages = max(self.max_page_num, max(reference_str, default=0)) + 1
+        # resident[page] has bit i set when the page is in memory i.
+        resident = [0] * num_of_pages
+        last_dirty = bytearray(num_of_pages)
+        everywhere = (1 << len(frame_counts)) - 1
+        cqueues = [CircularQueue(size=num_of_frames) for num_of_frames in frame_counts]
+        states = [
+            (
+                cqueue,
+                cqueue.frame_of,
+                cqueue.pages,
+                cqueue.ref_bits,
+                cqueue.dirty_bits,
+                cqueue.load_order,
+                cqueue.referenced,
+            )
+            for cqueue in cqueues
+        ]
+        page_faults = [0] * len(frame_counts)
+        interrupts = [0] * len(frame_counts)
+        disk_writes = [0] * len(frame_counts)
+        heappop = heapq.heappop
+
+        for ref_page_num, dirty_bit in zip(reference_str, self.dirty_bits):
+            mask = resident[ref_page_num]
+            # Update the dirty bit in every memory that holds the page.
+            if dirty_bit != last_dirty[ref_page_num]:
+                last_dirty[ref_page_num] = dirty_bit
+                while mask:
+                    bit = mask & -mask
+                    mask ^= bit
+                    cqueue, frame_of, _, ref_bits, dirty_bits, _, _ = states[bit.bit_length() - 1]
+                    frame = frame_of[ref_page_num]
+                    dirty_bits[frame] = dirty_bit
+                    if not ref_bits[frame]:
+                        cqueue._push_unreferenced(frame)
+                mask = resident[ref_page_num]
+            missing = everywhere ^ mask
+            # The page faults in every memory that misses the page.
+            while missing:
+                bit = missing & -missing
+                missing ^= bit
+                i = bit.bit_length() - 1
+                cqueue, frame_of, pages, ref_bits, dirty_bits, load_order, referenced = states[i]
+                page_faults[i] += 1
+                interrupts[i] += 1
+                if len(frame_of) < cqueue.max_size:
+                    cqueue.push(ref_page_num, dirty_bit)
+                    continue
+
+                # Step (1) inlined: the first (0,0) frame is at the top of its heap.
+                heap = cqueue.unreferenced[0]
+                while heap:
+                    order, frame = heap[0]
+                    if load_order[frame] == order and not ref_bits[frame] and not dirty_bits[frame]:
+                        victim_page_num = pages[frame]
+                        break
+                    heappop(heap)
+                else:
+                    victim_page_num, interrupt_cost = self.find_page_to_replace(cqueue)
+                    interrupts[i] += interrupt_cost
+                resident[victim_page_num] ^= bit
+                # Load the page into the frame of the victim, as pop and push would.
+                frame = frame_of.pop(victim_page_num)
+                if dirty_bits[frame]:
+                    disk_writes[i] += 1
+                    interrupts[i] += 1
+                pages[frame] = ref_page_num
+                ref_bits[frame] = 1
+                dirty_bits[frame] = dirty_bit
+                load_order[frame] = cqueue.loaded
+                cqueue.loaded += 1
+                frame_of[ref_page_num] = frame
+                referenced.append(frame)
+            resident[ref_page_num] = everywhere
+
+        return {
+            num_of_frames: {
+                "page_faults": page_faults[i],
+                "interrupts": interrupts[i],
+                "disk_writes": disk_writes[i],
+            }
+            for i, num_of_frames in enumerate(frame_counts)
+        }
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        cqueue = self.cqueue
+        frame_of = cqueue.frame_of
+        index = self.position
+
+        # Report the pages bypassed by the step (2) sweep.
+        def clear_ref_bit(frame):
+            emit("bypass", index, cqueue.pages[frame])
+            CircularQueue.clear_ref_bit(cqueue, frame)
+
+        cqueue.clear_ref_bit = clear_ref_bit
+        try:
+            for index, (ref_page_num, dirty_bit) in enumerate(
+                zip(reference_str, dirty_bits), self.position
+            ):
+                if ref_page_num not in frame_of:
+                    fault_start = clock()
+                    emit("fault", index, ref_page_num)
+                    self.page_faults += 1
+                    self.interrupts += 1
+                    if cqueue.is_full():
+                        victim_start = clock()
+                        victim_page_num, interrupt_cost = self.find_page_to_replace(cqueue)
+                        instrumentation.add_time("victim", clock() - victim_start)
+                        emit("eviction", index, victim_page_num)
+                        self.interrupts += interrupt_cost
+                        is_dirty = cqueue.pop(victim_page_num)
+                        if is_dirty:
+                            emit("write_back", index, victim_page_num)
+                            self.disk_writes += 1
+                            self.interrupts += 1
+                    cqueue.push(ref_page_num, dirty_bit)
+                    instrumentation.add_time("fault", clock() - fault_start)
+                else:
+                    emit("hit", index, ref_page_num)
+                    cqueue.set_dirty(ref_page_num, dirty_bit)
+        finally:
+            del cqueue.clear_ref_bit
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
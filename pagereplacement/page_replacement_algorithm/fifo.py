@@ -1,31 +1,62 @@
+import time
+
 from .page_replacement_algorithm import PageReplacementAlgorithm
 
 
 class Queue:
     """First In First Out Queue.
 
-    A simple queue that supports FIFO operations.
+    A fixed-capacity ring buffer that supports FIFO operations.
+    Residency and dirty bits are kept in bytearrays indexed by page number,
+    so membership tests, pushes and pops are all O(1).
     """
 
-    def __init__(self, max_size):
-        self.items = []
+    def __init__(self, max_size, max_page_num):
+        self.items = [0] * max_size
         self.max_size = max_size
-        self.dirty = dict()
+        self.head = 0
+        self.count = 0
+        self.resident = bytearray(max_page_num + 1)
+        self.dirty = bytearray(max_page_num + 1)
+
+    def reserve(self, max_page_num):
+        """Make room for the page numbers up to max_page_num."""
+        if max_page_num >= len(self.resident):
+            self.resident.extend(bytes(max_page_num + 1 - len(self.resident)))
+            self.dirty.extend(bytes(max_page_num + 1 - len(self.dirty)))
+
+    def __contains__(self, item):
+        return self.resident[item] == 1
 
     def is_full(self):
-        return len(self.items) == self.max_size
+        return self.count == self.max_size
 
     def push(self, item, dirty_bit):
-        self.items.append(item)
+        self.items[(self.head + self.count) % self.max_size] = item
+        self.count += 1
+        self.resident[item] = 1
         self.dirty[item] = dirty_bit
 
     def pop(self):
-        is_dirty = True if self.dirty[self.items[0]] == 1 else False
-        del self.dirty[self.items[0]]
-        return self.items.pop(0), is_dirty
+        item = self.items[self.head]
+        self.head = (self.head + 1) % self.max_size
+        self.count -= 1
+        self.resident[item] = 0
+        is_dirty = True if self.dirty[item] == 1 else False
+        return item, is_dirty
 
     def size(self):
-        return len(self.items)
+        return self.count
+
+    def resize(self, max_size):
+        # Evict the oldest pages that no longer fit, then lay the queue out from the start of a new buffer.
+        evicted = [self.pop() for _ in range(self.count - max_size)]
+        self.items = [
+            self.items[(self.head + i) % self.max_size] for i in range(self.count)
+        ] + [0] * (max_size - self.count)
+        self.max_size = max_size
+        self.head = 0
+        return evicted
 
 
 class FIFO(PageReplacementAlgorithm):
@@ -34,31 +65,60 @@ class FIFO(PageReplacementAlgorithm):
     FIFO is a simple page replacement algorithm that replaces the oldest page in memory.
     """
 
-    def __init__(self, reference_str, dirty_bits, max_page_num=1200):
+    lockstep = True
+    checkpoint_attributes = ("queue",)
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
         """Constructor for FIFO.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
             max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
         """
         super().__init__(reference_str, dirty_bits, max_page_num)
 
-    def compute(self, num_of_frames):
-        """Compute the number of page faults, interrupts, and disk writes.
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
 
         Args:
             num_of_frames (int): The number of frames in memory.
         """
         super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.queue = Queue(max_size=num_of_frames, max_page_num=self.max_page_num)
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, evicting the oldest pages.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
 
-        queue = Queue(max_size=num_of_frames)
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        return self.write_back(self.queue.resize(num_of_frames))
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        queue = self.queue
+        queue.reserve(max(reference_str, default=0))
+        resident = queue.resident
 
         # Simulate the process of page replacement.
-        for index, ref_page_num in enumerate(self.reference_str):
-            dirty_bit = self.dirty_bits[index]
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
             # If the page is not in memory, page fault occurs.
-            if ref_page_num not in queue.items:
+            if not resident[ref_page_num]:
                 self.page_faults += 1
                 self.interrupts += 1
                 # If the memory is full, replace the oldest page.
@@ -72,5 +132,110 @@ class FIFO(PageReplacementAlgorithm):
                 queue.push(ref_page_num, dirty_bit)
             else:
                 # Update the dirty bit of the page.
-                if dirty_bit != queue.dirty[ref_page_num]:
-                    queue.dirty[ref_page_num] = dirty_bit
+                queue.dirty[ref_page_num] = dirty_bit
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def compute_lockstep(self, frame_counts):
+        """Compute the results for several numbers of frames in a single walk of the reference string.
+
+        The memories are kept as plain ring buffers, and the residency of each page in every memory is
+        a bit mask, so a page found in every memory costs a single test. The dirty bit of a page in
+        memory is always the dirty bit of its last reference, so it is shared by all the memories.
+
+        Args:
+            frame_counts (list): The distinct numbers of frames in memory, in increasing order.
+
+        Returns:
+            dict: The number of frames -> a dictionary containing the page faults, interrupts, and disk writes.
+        """
+        reference_str = self.reference_str
+        num_of_pages = max(self.max_page_num, max(reference_str, default=0)) + 1
+        # resident[page] has bit i set when the page is in memory i.
+        resident = [0] * num_of_pages
+        last_dirty = bytearray(num_of_pages)
+        everywhere = (1 << len(frame_counts)) - 1
+        items = [[0] * num_of_frames for num_of_frames in frame_counts]
+        heads = [0] * len(frame_counts)
+        counts = [0] * len(frame_counts)
+        page_faults = [0] * len(frame_counts)
+        disk_writes = [0] * len(frame_counts)
+
+        for ref_page_num, dirty_bit in zip(reference_str, self.dirty_bits):
+            missing = everywhere ^ resident[ref_page_num]
+            # The page faults in every memory that misses the page.
+            while missing:
+                bit = missing & -missing
+                missing ^= bit
+                i = bit.bit_length() - 1
+                page_faults[i] += 1
+                queue = items[i]
+                if counts[i] == frame_counts[i]:
+                    # Replace the oldest page.
+                    head = heads[i]
+                    victim_page_num = queue[head]
+                    resident[victim_page_num] ^= bit
+                    if last_dirty[victim_page_num]:
+                        disk_writes[i] += 1
+                    queue[head] = ref_page_num
+                    heads[i] = (head + 1) % counts[i]
+                else:
+                    queue[counts[i]] = ref_page_num
+                    counts[i] += 1
+            resident[ref_page_num] = everywhere
+            last_dirty[ref_page_num] = dirty_bit
+
+        return {
+            num_of_frames: {
+                "page_faults": page_faults[i],
+                "interrupts": page_faults[i] + disk_writes[i],
+                "disk_writes": disk_writes[i],
+            }
+            for i, num_of_frames in enumerate(frame_counts)
+        }
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        queue = self.queue
+        queue.reserve(max(reference_str, default=0))
+        resident = queue.resident
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if not resident[ref_page_num]:
+                fault_start = clock()
+                emit("fault", index, ref_page_num)
+                self.page_faults += 1
+                self.interrupts += 1
+                if queue.is_full():
+                    victim_start = clock()
+                    victim_page_num, is_dirty = queue.pop()
+                    instrumentation.add_time("victim", clock() - victim_start)
+                    emit("eviction", index, victim_page_num)
+                    if is_dirty:
+                        emit("write_back", index, victim_page_num)
+                        self.disk_writes += 1
+                        self.interrupts += 1
+                queue.push(ref_page_num, dirty_bit)
+                instrumentation.add_time("fault", clock() - fault_start)
+            else:
+                emit("hit", index, ref_page_num)
+                queue.dirty[ref_page_num] = dirty_bit
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """Instrumentation.
+
+    Counts the events of a simulation, calls the callbacks registered for them, and accumulates
+    the time spent in each phase.
+
+    Events:
+    - hit: The referenced page is in memory.
+    - fault: The referenced page is not in memory.
+    - eviction: A page is replaced.
+    - write_back: A replaced page is dirty and written to disk.
+    - timer_interrupt: A timer interrupt ages the counters (LFU_DA).
+    - bypass: A page is bypassed by the second chance sweep, its reference bit is cleared (ESC).
+
+    Phases:
+    - fault: Handling a page fault, including the victim search.
+    - victim: Finding the page to replace.
+    - aging: Aging the counters (LFU_DA).
+    - total: The whole simulation.
+
+    An algorithm only pays for the instrumentation once it is attached with `instrument`,
+    which selects an instrumented variant of the simulation loop.
+    """
+
+    EVENTS = ("hit", "fault", "eviction", "write_back", "timer_interrupt", "bypass")
+    PHASES = ("fault", "victim", "aging", "total")
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.EVENTS, 0)
+        self.timers = dict.fromkeys(self.PHASES, 0.0)
+        self.callbacks = {event: [] for event in self.EVENTS}
+
+    def on(self, event, callback):
+        """Register a callback for an event.
+
+        Args:
+            event (str): The event name, one of EVENTS.
+            callback (callable): Called with the index of the reference and the page number
+                (None for a timer interrupt).
+
+        Raises:
+            ValueError: If the event is unknown.
+        """
+        if event not in self.callbacks:
+            raise ValueError(f"Unknown event: {event}")
+        self.callbacks[event].append(callback)
+
+    def emit(self, event, index, page_num=None):
+        """Record an event.
+
+        Args:
+            event (str): The event name.
+            index (int): The index of the reference.
+            page_num (int, optional): The page number concerned.
+        """
+        self.counters[event] += 1
+        for callback in self.callbacks[event]:
+            callback(index, page_num)
+
+    def add_time(self, phase, seconds):
+        self.timers[phase] += seconds
+
+    @contextmanager
+    def phase(self, phase):
+        """Time a phase.
+
+        Args:
+            phase (str): The phase name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[phase] += time.perf_counter() - start
+
+    def reset(self):
+        """Reset the counters and timers, keeping the callbacks."""
+        self.counters = dict.fromkeys(self.EVENTS, 0)
+        self.timers = dict.fromkeys(self.PHASES, 0.0)
+
+    def report(self):
+        """Get the counters and timers.
+
+        Returns:
+            dict: The number of each event ("events") and the seconds spent in each phase ("phases").
+        """
+        return {"events": dict(self.counters), "phases": dict(self.timers)}
@@ -1,31 +1,127 @@
+import heapq
+import time
+
 from .page_replacement_algorithm import PageReplacementAlgorithm
 
 
 class Counter:
     """Counter.
 
-    A counter that supports increment and decrement operations.
+    A counter that supports increment and lazy dirty-aware aging.
+
+    Aging is recorded as a global epoch instead of walking every counter. Each counter remembers
+    the epoch it was last brought up to date, and the pending shifts are applied when the page
+    is touched or compared. Pages whose counter has aged to zero are kept in a heap keyed by
+    load order, the others in a heap keyed by (counter, load order) that is rebuilt at most once
+    per epoch, so the victim is the same as `min` over the counters in load order.
     """
 
     def __init__(self):
         self.counter = dict()
+        self.stamp = dict()
+        self.dirty = dict()
+        self.load_order = dict()
+        self.loaded = 0
+        self.epoch = 0
+        # Pages with a non-zero counter.
+        self.active = set()
+        # Epoch -> pages whose counter reaches zero at that epoch.
+        self.expiry = dict()
+        self.zero_heap = []
+        self.active_heap = []
+        self.active_heap_epoch = -1
+
+    def value(self, page_num):
+        shift = (self.epoch - self.stamp[page_num]) * (1 if self.dirty[page_num] else 2)
+        return self.counter[page_num] >> shift
+
+    def add(self, page_num, dirty_bit):
+        self.counter[page_num] = 0
+        self.stamp[page_num] = self.epoch
+        self.dirty[page_num] = dirty_bit
+        self.load_order[page_num] = self.loaded
+        self.loaded += 1
+        self.increment(page_num)
+
+    def remove(self, page_num):
+        del self.counter[page_num]
+        del self.stamp[page_num]
+        del self.dirty[page_num]
+        del self.load_order[page_num]
+        self.active.discard(page_num)
+
+    def set_dirty(self, page_num, dirty_bit):
+        # Apply the pending aging with the old dirty bit first.
+        self.counter[page_num] = self.value(page_num)
+        self.stamp[page_num] = self.epoch
+        self.dirty[page_num] = dirty_bit
 
     def increment(self, page_num):
-        if self.counter.get(page_num, 0):
-            self.counter[page_num] += 1
-        else:
-            self.counter[page_num] = 1
+        count = self.value(page_num) + 1
+        self.counter[page_num] = count
+        self.stamp[page_num] = self.epoch
+        self.active.add(page_num)
+        # Schedule the epoch at which the counter will have aged to zero.
+        shift = 1 if self.dirty[page_num] else 2
+        expiry = self.epoch + -(-count.bit_length() // shift)
+        self.expiry.setdefault(expiry, []).append(page_num)
+        if self.active_heap_epoch == self.epoch:
+            heapq.heappush(
+                self.active_heap, (count, self.load_order[page_num], page_num)
+            )
 
-    def decrement(self, page_num, dirty_bit):
-        # If the page is dirty, shift the counter to the right by 1 bit.
-        if dirty_bit:
-            self.counter[page_num] //= 2
-        # Otherwise, shift the counter to the right by 2 bits.
+    def touch(self, page_num, dirty_bit):
+        # Same as set_dirty (if the dirty bit changes) followed by increment, in one step.
+        epoch = self.epoch
+        dirty = self.dirty[page_num]
+        count = (
+            self.counter[page_num] >> (epoch - self.stamp[page_num]) * (1 if dirty else 2)
+        ) + 1
+        self.counter[page_num] = count
+        self.stamp[page_num] = epoch
+        if dirty_bit != dirty:
+            self.dirty[page_num] = dirty_bit
+        self.active.add(page_num)
+        shift = 1 if dirty_bit else 2
+        expiry = epoch + -(-count.bit_length() // shift)
+        expiries = self.expiry.get(expiry)
+        if expiries is None:
+            self.expiry[expiry] = [page_num]
         else:
-            self.counter[page_num] //= 4
+            expiries.append(page_num)
+        if self.active_heap_epoch == epoch:
+            heapq.heappush(
+                self.active_heap, (count, self.load_order[page_num], page_num)
+            )
+
+    def decrement(self):
+        # Age every counter by one step.
+        self.epoch += 1
+        for page_num in self.expiry.pop(self.epoch, ()):
+            if page_num in self.active and self.value(page_num) == 0:
+                self.active.remove(page_num)
+                heapq.heappush(self.zero_heap, (self.load_order[page_num], page_num))
 
     def get_min(self):
-        return min(self.counter, key=self.counter.get)
+        # A counter of zero is the minimum, take the earliest loaded one.
+        while self.zero_heap:
+            order, page_num = self.zero_heap[0]
+            if self.load_order.get(page_num) == order and page_num not in self.active:
+                return page_num
+            heapq.heappop(self.zero_heap)
+
+        if self.active_heap_epoch != self.epoch:
+            self.active_heap = [
+                (self.value(page_num), self.load_order[page_num], page_num)
+                for page_num in self.active
+            ]
+            heapq.heapify(self.active_heap)
+            self.active_heap_epoch = self.epoch
+        while True:
+            count, order, page_num = self.active_heap[0]
+            if self.load_order.get(page_num) == order and self.value(page_num) == count:
+                return page_num
+            heapq.heappop(self.active_heap)
 
 
 class MainMemory:
@@ -37,28 +133,25 @@ class MainMemory:
     def __init__(self, num_of_frames):
         self.frames = set()
         self.num_of_frames = num_of_frames
-        self.dirty = dict()
         self.counter = Counter()
+        self.dirty = self.counter.dirty
 
     def is_full(self):
         return len(self.frames) == self.num_of_frames
 
     def swap_in(self, page_num, dirty_bit):
         self.frames.add(page_num)
-        self.dirty[page_num] = dirty_bit
-        self.counter.increment(page_num)
+        self.counter.add(page_num, dirty_bit)
 
     def swap_out(self, page_num):
         is_dirty = True if self.dirty[page_num] == 1 else False
-        del self.dirty[page_num]
         self.frames.remove(page_num)
-        del self.counter.counter[page_num]
+        self.counter.remove(page_num)
         return is_dirty
 
     def decrease_count(self):
         # Decrease the counter for each page according to the dirty bit.
-        for page_num in self.counter.counter:
-            self.counter.decrement(page_num=page_num, dirty_bit=self.dirty[page_num])
+        self.counter.decrement()
 
 
 class LFU_DA(PageReplacementAlgorithm):
@@ -71,15 +164,30 @@ class LFU_DA(PageReplacementAlgorithm):
     Otherwise, the counter is shifted to the right by 2 bits.
     """
 
-    def __init__(self, reference_str, dirty_bits, max_page_num=1200):
+    lockstep = True
+    checkpoint_attributes = ("memory",)
+
+    def __init__(
+        self, reference_str, dirty_bits=None, max_page_num=1200, aging_interval=100
+    ):
         """Constructor for LFU_DA.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
             max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+            aging_interval (int, optional): The number of references between two agings. Defaults to 100.
         """
         super().__init__(reference_str, dirty_bits, max_page_num)
+        self.aging_interval = aging_interval
+
+    def parameters(self):
+        """Get the parameters, besides the number of frames, that the results depend on.
+
+        Returns:
+            dict: The parameters (JSON serializable).
+        """
+        return {"aging_interval": self.aging_interval}
 
     def find_page_to_replace(self, counter):
         """Find the page to replace.
@@ -92,19 +200,52 @@ class LFU_DA(PageReplacementAlgorithm):
         """
         return counter.get_min()
 
-    def compute(self, num_of_frames):
-        """Compute the number of page faults, interrupts, and disk writes.
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
 
         Args:
             num_of_frames (int): The number of frames in memory.
         """
         super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.memory = MainMemory(num_of_frames)
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, evicting the least frequently used pages.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        memory = self.memory
+        memory.num_of_frames = num_of_frames
+        evicted = []
+        while len(memory.frames) > num_of_frames:
+            victim_page_num = self.find_page_to_replace(memory.counter)
+            evicted.append((victim_page_num, memory.swap_out(victim_page_num)))
+        return self.write_back(evicted)
 
-        memory = MainMemory(num_of_frames)
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        memory = self.memory
+        aging_interval = self.aging_interval
 
         # Simulate the process of page replacement.
-        for index, ref_page_num in enumerate(self.reference_str):
-            dirty_bit = self.dirty_bits[index]
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
             # If the page is not in memory, page fault occurs.
             if ref_page_num not in memory.frames:
                 self.page_faults += 1
@@ -120,15 +261,133 @@ class LFU_DA(PageReplacementAlgorithm):
                 # Add the new page to memory.
                 memory.swap_in(ref_page_num, dirty_bit)
             else:
-                # Update the dirty bit.
-                if dirty_bit != memory.dirty[ref_page_num]:
-                    memory.dirty[ref_page_num] = dirty_bit
-                # Increment the counter for the page.
-                memory.counter.increment(ref_page_num)
+                # Update the dirty bit and increment the counter for the page.
+                memory.counter.touch(ref_page_num, dirty_bit)
 
             # Aging the counter.
-            if index % 100 == 0:
+            if index % aging_interval == 0:
                 # Timmer interrupt.
                 self.interrupts += 1
                 # Decrease the counter for each page.
                 memory.decrease_count()
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def compute_lockstep(self, frame_counts):
+        """Compute the results for several numbers of frames in a single walk of the reference string.
+
+        The residency of each page in every memory is a bit mask, so the memories that hit and the
+        memories that fault are found with a single lookup. The dirty bit of a page in memory is always
+        the dirty bit of its last reference, so it is compared once for all the memories.
+
+        Args:
+            frame_counts (list): The distinct numbers of frames in memory, in increasing order.
+
+        Returns:
+            dict: The number of frames -> a dictionary containing the page faults, interrupts, and disk writes.
+        """
+        reference_str = self.reference_str
+        num_of_pages = max(self.max_page_num, max(reference_str, default=0)) + 1
+        # resident[page] has bit i set when the page is in memory i.
+        resident = [0] * num_of_pages
+        everywhere = (1 << len(frame_counts)) - 1
+        memories = [MainMemory(num_of_frames) for num_of_frames in frame_counts]
+        counters = [memory.counter for memory in memories]
+        page_faults = [0] * len(frame_counts)
+        disk_writes = [0] * len(frame_counts)
+        aging_interval = self.aging_interval
+        agings = 0
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, self.dirty_bits)
+        ):
+            mask = resident[ref_page_num]
+            # Update the dirty bit and increment the counter in every memory that holds the page.
+            hits = mask
+            while hits:
+                bit = hits & -hits
+                hits ^= bit
+                counters[bit.bit_length() - 1].touch(ref_page_num, dirty_bit)
+            # The page faults in every memory that misses the page.
+            missing = everywhere ^ mask
+            while missing:
+                bit = missing & -missing
+                missing ^= bit
+                i = bit.bit_length() - 1
+                memory = memories[i]
+                page_faults[i] += 1
+                if memory.is_full():
+                    victim_page_num = self.find_page_to_replace(memory.counter)
+                    resident[victim_page_num] ^= bit
+                    if memory.swap_out(victim_page_num):
+                        disk_writes[i] += 1
+                memory.swap_in(ref_page_num, dirty_bit)
+            resident[ref_page_num] = everywhere
+
+            # Aging the counters of every memory.
+            if index % aging_interval == 0:
+                agings += 1
+                for counter in counters:
+                    counter.decrement()
+
+        return {
+            num_of_frames: {
+                "page_faults": page_faults[i],
+                "interrupts": page_faults[i] + disk_writes[i] + agings,
+                "disk_writes": disk_writes[i],
+            }
+            for i, num_of_frames in enumerate(frame_counts)
+        }
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        memory = self.memory
+        aging_interval = self.aging_interval
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if ref_page_num not in memory.frames:
+                fault_start = clock()
+                emit("fault", index, ref_page_num)
+                self.page_faults += 1
+                self.interrupts += 1
+                if memory.is_full():
+                    victim_start = clock()
+                    victim_page_num = self.find_page_to_replace(memory.counter)
+                    instrumentation.add_time("victim", clock() - victim_start)
+                    emit("eviction", index, victim_page_num)
+                    is_dirty = memory.swap_out(victim_page_num)
+                    if is_dirty:
+                        emit("write_back", index, victim_page_num)
+                        self.disk_writes += 1
+                        self.interrupts += 1
+                memory.swap_in(ref_page_num, dirty_bit)
+                instrumentation.add_time("fault", clock() - fault_start)
+            else:
+                emit("hit", index, ref_page_num)
+                memory.counter.touch(ref_page_num, dirty_bit)
+
+            if index % aging_interval == 0:
+                aging_start = clock()
+                emit("timer_interrupt", index)
+                self.interrupts += 1
+                memory.decrease_count()
+                instrumentation.add_time("aging", clock() - aging_start)
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
@@ -0,0 +1,134 @@
+import time
+from collections import OrderedDict
+
+from .page_replacement_algorithm import PageReplacementAlgorithm
+
+
+class LRU(PageReplacementAlgorithm):
+    """Least Recently Used Page Replacement Algorithm.
+
+    LRU replaces the page that has not been referenced for the longest time.
+    The memory is an OrderedDict of page number -> dirty bit in recency order (a hash table over a
+    doubly linked list), so a hit moves the page to the end and the victim is popped from the front,
+    both in O(1).
+    """
+
+    checkpoint_attributes = ("memory",)
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
+        """Constructor for LRU.
+
+        Args:
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+        """
+        super().__init__(reference_str, dirty_bits, max_page_num)
+
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        super().reset()
+        self.num_of_frames = num_of_frames
+
+        # Page number -> dirty bit, from the least to the most recently used.
+        self.memory = OrderedDict()
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, evicting the least recently used pages.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        memory = self.memory
+        return self.write_back(
+            [memory.popitem(last=False) for _ in range(len(memory) - num_of_frames)]
+        )
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        memory = self.memory
+        move_to_end = memory.move_to_end
+        num_of_frames = self.num_of_frames
+
+        # Simulate the process of page replacement.
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
+            if ref_page_num in memory:
+                # Update the dirty bit and make the page the most recently used.
+                memory[ref_page_num] = dirty_bit
+                move_to_end(ref_page_num)
+                continue
+            # The page is not in memory, page fault occurs.
+            self.page_faults += 1
+            self.interrupts += 1
+            # If the memory is full, replace the least recently used page.
+            if len(memory) == num_of_frames:
+                _, is_dirty = memory.popitem(last=False)
+                # If the page is dirty, write it to disk.
+                if is_dirty:
+                    self.disk_writes += 1
+                    self.interrupts += 1
+            # Add the new page to memory.
+            memory[ref_page_num] = dirty_bit
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        memory = self.memory
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if ref_page_num in memory:
+                emit("hit", index, ref_page_num)
+                memory[ref_page_num] = dirty_bit
+                memory.move_to_end(ref_page_num)
+                continue
+            fault_start = clock()
+            emit("fault", index, ref_page_num)
+            self.page_faults += 1
+            self.interrupts += 1
+            if len(memory) == self.num_of_frames:
+                victim_start = clock()
+                victim_page_num, is_dirty = memory.popitem(last=False)
+                instrumentation.add_time("victim", clock() - victim_start)
+                emit("eviction", index, victim_page_num)
+                if is_dirty:
+                    emit("write_back", index, victim_page_num)
+                    self.disk_writes += 1
+                    self.interrupts += 1
+            memory[ref_page_num] = dirty_bit
+            instrumentation.add_time("fault", clock() - fault_start)
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
@@ -1,99 +1,509 @@
-from .page_replacement_algorithm import PageReplacementAlgorithm
+import heapq
+import time
+from array import array
+from collections import deque
+
+from ..trace import chunks
+from .stack_algorithm import StackAlgorithm
 
 
 class MainMemory:
     """Main Memory.
 
     Main Memory is a set of frames.
+    Each resident page that is referenced again is also kept in a max-heap keyed by the index of its
+    next reference. Heap entries are invalidated lazily: an entry is stale when its page is no longer
+    resident or when the page's next reference has moved on.
+    The resident pages that are not referenced again (their next reference is `never`) are kept apart
+    in `unused`, so whether there are any is known in O(1).
     """
 
-    def __init__(self, num_of_frames):
+    def __init__(self, num_of_frames, never=float("inf")):
         self.frames = set()
         self.num_of_frames = num_of_frames
+        self.never = never
         self.dirty = dict()
+        self.next_use = dict()
+        self.heap = []
+        # The pages not referenced again.
+        self.unused = set()
 
     def is_full(self):
         return len(self.frames) == self.num_of_frames
 
-    def swap_in(self, page_num, dirty_bit):
+    def swap_in(self, page_num, dirty_bit, next_use):
         self.frames.add(page_num)
         self.dirty[page_num] = dirty_bit
+        self.touch(page_num, next_use)
 
     def swap_out(self, page_num):
         is_dirty = True if self.dirty[page_num] == 1 else False
+        if self.next_use.pop(page_num) == self.never:
+            self.unused.remove(page_num)
         del self.dirty[page_num]
         self.frames.remove(page_num)
         return is_dirty
 
+    def touch(self, page_num, next_use):
+        never = self.never
+        if self.next_use.get(page_num) == never:
+            # Streamed with a look-ahead window, the page is referenced again after all.
+            self.unused.discard(page_num)
+        self.next_use[page_num] = next_use
+        if next_use == never:
+            self.unused.add(page_num)
+            return
+        heapq.heappush(self.heap, (-next_use, page_num))
+        # Drop the stale entries once they outnumber the resident pages.
+        if len(self.heap) > 4 * self.num_of_frames + 64:
+            self.heap = [
+                (-use, page) for page, use in self.next_use.items() if use != never
+            ]
+            heapq.heapify(self.heap)
+
+    def farthest(self):
+        # Discard stale entries until the top of the heap is a resident page.
+        while True:
+            neg_use, page_num = self.heap[0]
+            if self.next_use.get(page_num) == -neg_use:
+                return page_num, -neg_use
+            heapq.heappop(self.heap)
 
-class Optimal(PageReplacementAlgorithm):
+
+class Optimal(StackAlgorithm):
     """Optimal Page Replacement Algorithm.
 
     Optimal is a page replacement algorithm that replaces the page that will not be used for the longest period.
+    The next reference of every position is precomputed once per reference string,
+    and the pages in memory that are referenced again are kept in a heap by their next reference.
+
+    When several pages in memory are no longer referenced, the first of them in the order of the set of
+    frames is replaced, as in the first implementation, so the results match it exactly. Each reference
+    costs O(log k) amortized while at most one page in memory is no longer referenced; with u > 1 of them,
+    finding the first one walks the set of frames, about k / (u + 1) pages on average and k at worst.
+
+    Optimal is also a stack algorithm: `compute_stack` keeps the pages ordered by priority (the sooner the next
+    reference, the higher the priority) and produces the results for every number of frames in one pass.
+    The page faults always match `compute`. The disk writes match too, except when several pages in memory
+    are no longer referenced: `compute` then evicts the first of them in the order of the set of frames,
+    while the stack keeps the one that was higher in the stack.
+
+    When the reference string is streamed with `feed`, the future is only known through a look-ahead
+    window: a reference is simulated once the next `window` references have been fed, and a page that is
+    not referenced in the window is treated as no longer referenced. `blind_evictions` counts the
+    evictions decided that way, the results are exact when it is 0, and `window_drift` measures how far
+    the results drift from the full reference string.
     """
 
-    def __init__(self, reference_str, dirty_bits, max_page_num=1200):
+    checkpoint_attributes = (
+        "memory",
+        "never",
+        "blind_evictions",
+        "pending",
+        "last_fed",
+        "fed",
+    )
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200, window=None):
         """Constructor for Optimal.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
             max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+            window (int, optional): The number of look-ahead references when streaming.
+                Defaults to None, which buffers the whole stream until `finish`.
         """
         super().__init__(reference_str, dirty_bits, max_page_num)
+        self.window = window
+        self.next_reference = None
+        self.next_use = dict()
+        self.blind_evictions = 0
+
+    def compute_next_reference(self):
+        """Compute the index of the next reference of the page at each position.
+
+        Returns:
+            array: The index of the next reference, or the length of the reference string if there is none.
+        """
+        never = len(self.reference_str)
+        next_reference = array("I" if never <= 0xFFFFFFFF else "Q", [never]) * never
+        last_seen = dict()
+        for index in range(never - 1, -1, -1):
+            page_num = self.reference_str[index]
+            next_reference[index] = last_seen.get(page_num, never)
+            last_seen[page_num] = index
+        return next_reference
+
+    def update_stack(self, stack, index, page_num):
+        """Move the referenced page to the top of the stack.
+
+        The page at the top is carried down the stack. At each position, the page with the later
+        next reference is carried further and the other one stays, until the carried page takes
+        the former position of the referenced page.
+
+        Args:
+            stack (list): The stack, the top is at position 0.
+            index (int): The current index of the reference string.
+            page_num (int): The referenced page number.
+
+        Returns:
+            int: The depth (1-based) of the page before the reference, or 0 if it was not in the stack.
+        """
+        next_use = self.next_use
+        next_use[page_num] = self.next_reference[index]
+        try:
+            depth = stack.index(page_num) + 1
+        except ValueError:
+            depth = 0
+        if depth == 1:
+            return depth
+        if not stack:
+            stack.append(page_num)
+            return depth
+
+        last = depth - 1 if depth else len(stack)
+        carry = stack[0]
+        stack[0] = page_num
+        # The carried page is evicted from memory with first_size frames and more.
+        first_size = 1
+        for position in range(1, last):
+            page = stack[position]
+            if next_use[page] > next_use[carry]:
+                stack[position] = carry
+                self.record_evictions(first_size, position, carry)
+                carry = page
+                first_size = position + 1
+        self.record_evictions(first_size, last, carry)
+        if depth:
+            stack[last] = carry
+        elif last < self.max_stack_size:
+            stack.append(carry)
+        else:
+            del next_use[carry]
+        return depth
+
+    def compute_stack(self, frame_counts):
+        """Compute the number of page faults, interrupts, and disk writes for every number of frames in one pass.
+
+        Args:
+            frame_counts (iterable): The numbers of frames in memory.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        if self.next_reference is None:
+            self.next_reference = self.compute_next_reference()
+        self.next_use = dict()
+        return super().compute_stack(frame_counts)
 
-    def find_page_to_replace(self, current_index, frames):
+    def find_page_to_replace(self, memory):
         """Find the page to replace.
 
         Args:
-            current_index (int): The current index of the reference string.
-            frames (set): The set of page numbers in memory.
+            memory (object): MainMemory object.
 
         Returns:
             int: The page number to replace.
         """
-        # Get the reference string from the current index.
-        ref_str = self.reference_str[current_index + 1 :]
-        # Record each page_num in memory and the time it is next referenced.
-        next_reference_time = dict()
-        # Find the page to replace.
-        for page_num in frames:
-            if page_num not in ref_str:
-                # Return the page_num that are no longer referenced.
-                return page_num
-            else:
-                next_reference_time[page_num] = ref_str.index(page_num)
+        unused = memory.unused
+        if len(unused) == 1:
+            return next(iter(unused))
+        if unused:
+            # Several pages are no longer referenced,
+            # return the first of them in the order of the set of frames.
+            for page_num in memory.frames:
+                if page_num in unused:
+                    return page_num
         # Or return the page_num that will not be used for the longest period.
-        return max(next_reference_time, key=lambda key: next_reference_time[key])
+        return memory.farthest()[0]
 
-    def compute(self, num_of_frames):
-        """Compute the number of page faults, interrupts, and disk writes.
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
 
         Args:
             num_of_frames (int): The number of frames in memory.
         """
         super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.memory = MainMemory(num_of_frames=num_of_frames)
+        self.never = float("inf")
+        self.blind_evictions = 0
+        # The references fed but not simulated yet: [page_num, dirty_bit, next reference, index].
+        self.pending = deque()
+        # The last reference fed for each page.
+        self.last_fed = dict()
+        self.fed = 0
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, evicting the pages referenced last.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        memory = self.memory
+        memory.num_of_frames = num_of_frames
+        evicted = []
+        while len(memory.frames) > num_of_frames:
+            victim_page_num = self.find_page_to_replace(memory)
+            evicted.append((victim_page_num, memory.swap_out(victim_page_num)))
+        return self.write_back(evicted)
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, as far as the look-ahead window allows.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        window = self.window if self.window is not None else float("inf")
+        self.simulate(self.look_ahead(reference_str, dirty_bits, window), blind=True)
+        return self.get_results()
+
+    def finish(self):
+        """Simulate the references left in the look-ahead window.
+
+        Returns:
+            dict: The final results.
+        """
+        self.simulate(self.look_ahead((), (), 0), blind=False)
+        return self.get_results()
+
+    def look_ahead(self, reference_str, dirty_bits, window):
+        """Feed references into the look-ahead window.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+            window (int): The number of references to keep in the window.
+
+        Yields:
+            tuple: The page number, dirty bit and next reference of each reference ready to be simulated.
+        """
+        pending = self.pending
+        last_fed = self.last_fed
+        memory = self.memory
+        for page_num, dirty_bit in zip(reference_str, dirty_bits):
+            index = self.fed
+            self.fed += 1
+            previous = last_fed.get(page_num)
+            if previous is not None:
+                previous[2] = index
+                # The page was simulated as no longer referenced, it now comes into the window.
+                if previous[3] < self.position and page_num in memory.frames:
+                    memory.touch(page_num, index)
+            last_fed[page_num] = entry = [page_num, dirty_bit, None, index]
+            pending.append(entry)
+            while len(pending) > window:
+                yield self.pop_pending()
+        while len(pending) > window:
+            yield self.pop_pending()
+
+    def pop_pending(self):
+        page_num, dirty_bit, next_use, index = self.pending.popleft()
+        self.position = index + 1
+        return page_num, dirty_bit, self.never if next_use is None else next_use
 
-        memory = MainMemory(num_of_frames=num_of_frames)
+    def simulate(self, references, blind=False):
+        """Simulate references whose next reference is known.
+
+        Args:
+            references (iterable): The page number, dirty bit and next reference of each reference.
+            blind (bool, optional): Count the evictions of pages not referenced in the look-ahead window.
+        """
+        memory = self.memory
+        never = self.never
 
         # Simulate the process of page replacement.
-        for index, ref_page_num in enumerate(self.reference_str):
-            dirty_bit = self.dirty_bits[index]
+        for ref_page_num, dirty_bit, next_use in references:
             # If the page is not in memory, page fault occurs.
             if ref_page_num not in memory.frames:
                 self.page_faults += 1
                 self.interrupts += 1
                 # If the memory is full, replace the page.
                 if memory.is_full():
-                    victim_page_num = self.find_page_to_replace(index, memory.frames)
+                    victim_page_num = self.find_page_to_replace(memory)
+                    if blind and memory.next_use[victim_page_num] == never:
+                        self.blind_evictions += 1
                     is_dirty = memory.swap_out(victim_page_num)
                     # If the page is dirty, write it to disk.
                     if is_dirty:
                         self.disk_writes += 1
                         self.interrupts += 1
                 # Add the new page to memory.
-                memory.swap_in(ref_page_num, dirty_bit)
+                memory.swap_in(ref_page_num, dirty_bit, next_use)
             else:
                 # Update the dirty bit.
                 if dirty_bit != memory.dirty[ref_page_num]:
                     memory.dirty[ref_page_num] = dirty_bit
+                # Update the next reference of the page.
+                memory.touch(ref_page_num, next_use)
+
+    def simulate_instrumented(self, references, blind=False):
+        """Simulate references whose next reference is known, reporting to the instrumentation.
+
+        Args:
+            references (iterable): The page number, dirty bit and next reference of each reference.
+            blind (bool, optional): Count the evictions of pages not referenced in the look-ahead window.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        memory = self.memory
+        never = self.never
+
+        for index, (ref_page_num, dirty_bit, next_use) in enumerate(
+            references, self.position
+        ):
+            if ref_page_num not in memory.frames:
+                fault_start = clock()
+                emit("fault", index, ref_page_num)
+                self.page_faults += 1
+                self.interrupts += 1
+                if memory.is_full():
+                    victim_start = clock()
+                    victim_page_num = self.find_page_to_replace(memory)
+                    instrumentation.add_time("victim", clock() - victim_start)
+                    emit("eviction", index, victim_page_num)
+                    if blind and memory.next_use[victim_page_num] == never:
+                        self.blind_evictions += 1
+                    is_dirty = memory.swap_out(victim_page_num)
+                    if is_dirty:
+                        emit("write_back", index, victim_page_num)
+                        self.disk_writes += 1
+                        self.interrupts += 1
+                memory.swap_in(ref_page_num, dirty_bit, next_use)
+                instrumentation.add_time("fault", clock() - fault_start)
+            else:
+                emit("hit", index, ref_page_num)
+                if dirty_bit != memory.dirty[ref_page_num]:
+                    memory.dirty[ref_page_num] = dirty_bit
+                memory.touch(ref_page_num, next_use)
+
+        instrumentation.add_time("total", clock() - start)
+
+    def instrument(self, instrumentation):
+        """Attach an instrumentation to the simulation, or detach it.
+
+        Args:
+            instrumentation (Instrumentation): The instrumentation, or None to detach it.
+
+        Returns:
+            Instrumentation: The instrumentation.
+        """
+        # Both `compute` and `feed` go through `simulate`, select its variant instead.
+        self.instrumentation = instrumentation
+        if instrumentation is None:
+            self.__dict__.pop("simulate", None)
+        else:
+            self.simulate = self.simulate_instrumented
+        return instrumentation
+
+    def compute(self, num_of_frames):
+        """Compute the number of page faults, interrupts, and disk writes.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        self.start(num_of_frames)
+
+        if self.next_reference is None:
+            self.next_reference = self.compute_next_reference()
+        self.never = self.memory.never = len(self.reference_str)
+        self.simulate(zip(self.reference_str, self.dirty_bits, self.next_reference))
+
+    def feed_range(self, start, stop):
+        """Simulate the references of the reference string from start to stop.
+
+        Unlike `feed`, the next references are known from the whole reference string, so the results
+        of consecutive ranges are the same as `compute`.
+
+        Args:
+            start (int): The index of the first reference.
+            stop (int): The index after the last reference.
+
+        Returns:
+            dict: The results so far.
+        """
+        if self.next_reference is None:
+            self.next_reference = self.compute_next_reference()
+        self.never = self.memory.never = len(self.reference_str)
+        self.simulate(
+            zip(
+                self.reference_str[start:stop],
+                self.dirty_bits[start:stop],
+                self.next_reference[start:stop],
+            )
+        )
+        self.position = stop
+        return self.get_results()
+
+    def extend(self, path, reference_str, dirty_bits):
+        """Simulate new references after the ones fed up to a checkpoint, and update the checkpoint.
+
+        Only a checkpoint saved after `feed` can be extended: its references are still in the look-ahead
+        window, or were simulated knowing only the window. `feed_range` and `compute_with_checkpoints`
+        simulate their references knowing that the reference string ends where it does, so the pages
+        evicted as no longer referenced may be referenced by the new references.
+
+        Args:
+            path (str): The path of the checkpoint file.
+            reference_str (list): The new page numbers.
+            dirty_bits (list): The new dirty bits.
+
+        Raises:
+            ValueError: The checkpoint was saved after `feed_range`.
+
+        Returns:
+            dict: The results for the extended reference string.
+        """
+        self.load_checkpoint(path)
+        if self.never != float("inf"):
+            raise ValueError(
+                f"{path} was saved after feed_range, its future ends with its reference string."
+            )
+        self.feed(reference_str, dirty_bits)
+        self.save_checkpoint(path)
+        return self.finish()
+
+    def window_drift(self, num_of_frames, window, chunk_size=65536):
+        """Measure how far streaming with a look-ahead window drifts from the full reference string.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+            window (int): The number of look-ahead references.
+            chunk_size (int, optional): The number of references fed at once. Defaults to 65536.
+
+        Returns:
+            dict: The full and windowed results, the relative drift of each result, and the blind evictions.
+        """
+        self.compute(num_of_frames)
+        full = self.get_results()
+
+        full_window, self.window = self.window, window
+        try:
+            for windowed in self.stream(
+                chunks(self.reference_str, self.dirty_bits, chunk_size), num_of_frames
+            ):
+                pass
+        finally:
+            self.window = full_window
+
+        return {
+            "full": full,
+            "windowed": windowed,
+            "drift": {
+                key: (windowed[key] - full[key]) / full[key] if full[key] else 0.0
+                for key in full
+            },
+            "blind_evictions": self.blind_evictions,
+        }
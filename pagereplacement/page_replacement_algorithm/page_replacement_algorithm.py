@@ -1,23 +1,62 @@
+import gzip
+import os
+import pickle
+
+from ..trace import Trace
+
+# The version of the checkpoint files.
+CHECKPOINT_VERSION = 1
+
+
 class PageReplacementAlgorithm:
     """Page Replacement Algorithm.
 
     A base class for page replacement algorithms.
+
+    Subclasses implement `start` and `feed`, so that a reference string can either be computed at once
+    with `compute`, or be streamed chunk by chunk (from a generator, a file or a pipe) with `start`,
+    `feed` and `finish`, keeping only the state of the memory.
+
+    Subclasses may also implement `feed_instrumented`, a variant of `feed` that reports events and
+    phase timings to an Instrumentation. It is selected by `instrument`, so `feed` itself has no checks.
+
+    Subclasses that set `lockstep` implement `compute_lockstep`, which walks the reference string once
+    and advances one memory per number of frames together, and `compute_all` uses it.
+
+    The state of a simulation (the attributes listed in `checkpoint_attributes`, the counters and the
+    position in the reference string) can be saved with `save_checkpoint` and restored with
+    `load_checkpoint`, to resume an interrupted run (`compute_with_checkpoints`) or to extend a
+    simulated reference string with new references (`extend`).
     """
 
-    def __init__(self, reference_str, dirty_bits, max_page_num=1200):
+    # Whether the subclass implements compute_lockstep.
+    lockstep = False
+    # Bump when a change of the implementation changes the results, to invalidate cached results.
+    version = 1
+    # The attributes holding the state of a simulation, set by `start`.
+    checkpoint_attributes = ()
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
         """Constructor.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list or Trace): A list of page numbers, or a Trace holding both the page numbers and dirty bits.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
             max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
         """
+        if isinstance(reference_str, Trace):
+            dirty_bits = reference_str.dirty_bits
+            reference_str = reference_str.reference_str
         self.reference_str = reference_str
         self.dirty_bits = dirty_bits
         self.page_faults = 0
         self.interrupts = 0
         self.disk_writes = 0
         self.max_page_num = max_page_num
+        # The number of references simulated so far.
+        self.position = 0
+        self.num_of_frames = None
+        self.instrumentation = None
 
     def reset(self):
         """Reset the counters.
@@ -25,6 +64,297 @@ class PageReplacementAlgorithm:
         self.page_faults = 0
         self.interrupts = 0
         self.disk_writes = 0
+        self.position = 0
+
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        raise NotImplementedError
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        raise NotImplementedError
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        raise NotImplementedError
+
+    def instrument(self, instrumentation):
+        """Attach an instrumentation to the simulation, or detach it.
+
+        Args:
+            instrumentation (Instrumentation): The instrumentation, or None to detach it.
+
+        Returns:
+            Instrumentation: The instrumentation.
+        """
+        self.instrumentation = instrumentation
+        if instrumentation is None:
+            self.__dict__.pop("feed", None)
+        else:
+            self.feed = self.feed_instrumented
+        return instrumentation
+
+    def finish(self):
+        """Finish the simulation.
+
+        Returns:
+            dict: The final results.
+        """
+        return self.get_results()
+
+    def stream(self, chunks, num_of_frames):
+        """Simulate a reference string given chunk by chunk.
+
+        Args:
+            chunks (iterable): Pairs of page numbers and dirty bits, e.g. Trace.chunks().
+            num_of_frames (int): The number of frames in memory.
+
+        Yields:
+            dict: The results after each chunk, and finally the final results.
+        """
+        self.start(num_of_frames)
+        for reference_str, dirty_bits in chunks:
+            yield self.feed(reference_str, dirty_bits)
+        yield self.finish()
+
+    def feed_range(self, start, stop):
+        """Simulate the references of the reference string from start to stop.
+
+        Args:
+            start (int): The index of the first reference.
+            stop (int): The index after the last reference.
+
+        Returns:
+            dict: The results so far.
+        """
+        return self.feed(self.reference_str[start:stop], self.dirty_bits[start:stop])
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation.
+
+        A larger memory keeps every page. A smaller memory evicts pages the way a page fault would,
+        and the dirty ones are written to disk.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        raise NotImplementedError
+
+    def write_back(self, evicted):
+        """Count the disk writes of evicted pages.
+
+        Args:
+            evicted (list): The evicted page numbers and their dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        for _, is_dirty in evicted:
+            if is_dirty:
+                self.disk_writes += 1
+                self.interrupts += 1
+        return self.get_results()
+
+    def save_checkpoint(self, path):
+        """Save the state of the simulation to a file.
+
+        The file is written to a temporary file first and then renamed, so an interrupted save
+        leaves the previous checkpoint intact.
+
+        Args:
+            path (str): The path of the checkpoint file.
+        """
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "algorithm": f"{type(self).__module__}.{type(self).__qualname__}",
+            "algorithm_version": self.version,
+            "parameters": self.parameters(),
+            "num_of_frames": self.num_of_frames,
+            "position": self.position,
+            "results": self.get_results(),
+            "state": {name: getattr(self, name) for name in self.checkpoint_attributes},
+        }
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(temporary_path, "wb", compresslevel=1) as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+
+    def load_checkpoint(self, path):
+        """Restore the state of a simulation saved by save_checkpoint.
+
+        The simulation then goes on with `feed` from the saved position.
+
+        Args:
+            path (str): The path of the checkpoint file.
+
+        Raises:
+            ValueError: The checkpoint was saved by another algorithm, version or parameters.
+        """
+        with gzip.open(path, "rb") as f:
+            checkpoint = pickle.load(f)
+        algorithm = f"{type(self).__module__}.{type(self).__qualname__}"
+        if (
+            checkpoint["version"] != CHECKPOINT_VERSION
+            or checkpoint["algorithm"] != algorithm
+            or checkpoint["algorithm_version"] != self.version
+            or checkpoint["parameters"] != self.parameters()
+        ):
+            raise ValueError(f"{path} is not a checkpoint of this {type(self).__name__}.")
+
+        self.reset()
+        self.num_of_frames = checkpoint["num_of_frames"]
+        self.position = checkpoint["position"]
+        self.page_faults = checkpoint["results"]["page_faults"]
+        self.interrupts = checkpoint["results"]["interrupts"]
+        self.disk_writes = checkpoint["results"]["disk_writes"]
+        for name, value in checkpoint["state"].items():
+            setattr(self, name, value)
+
+    def compute_with_checkpoints(self, num_of_frames, path, interval=1 << 20):
+        """Compute the results, saving a checkpoint every interval references.
+
+        If the checkpoint file exists, the simulation resumes from it instead of starting over.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+            path (str): The path of the checkpoint file.
+            interval (int, optional): The number of references between two checkpoints. Defaults to 1 << 20.
+
+        Raises:
+            ValueError: The checkpoint is for another number of frames or a longer reference string.
+
+        Returns:
+            dict: A dictionary containing the page faults, interrupts, and disk writes.
+        """
+        length = len(self.reference_str)
+        if os.path.exists(path):
+            self.load_checkpoint(path)
+            if self.num_of_frames != num_of_frames or self.position > length:
+                raise ValueError(f"{path} is a checkpoint of another simulation.")
+        else:
+            self.start(num_of_frames)
+        while self.position < length:
+            self.feed_range(self.position, min(self.position + interval, length))
+            self.save_checkpoint(path)
+        return self.finish()
+
+    def extend(self, path, reference_str, dirty_bits):
+        """Simulate new references after the ones simulated up to a checkpoint, and update the checkpoint.
+
+        Args:
+            path (str): The path of the checkpoint file.
+            reference_str (list): The new page numbers.
+            dirty_bits (list): The new dirty bits.
+
+        Returns:
+            dict: The results for the extended reference string.
+        """
+        self.load_checkpoint(path)
+        self.feed(reference_str, dirty_bits)
+        self.save_checkpoint(path)
+        return self.finish()
+
+    def verify_extend(self, num_of_frames, path, split=None):
+        """Check that extending a checkpoint gives the same results as computing the whole reference string.
+
+        The first `split` references are streamed with `feed` and checkpointed, the checkpoint is extended
+        with the other references, and the results are compared with `compute`.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+            path (str): The path of the checkpoint file.
+            split (int, optional): The number of references before the checkpoint. Defaults to half.
+
+        Returns:
+            dict: The full and extended results, and whether they match.
+        """
+        length = len(self.reference_str)
+        split = length // 2 if split is None else split
+        self.compute(num_of_frames)
+        full = self.get_results()
+        self.start(num_of_frames)
+        self.feed(self.reference_str[:split], self.dirty_bits[:split])
+        self.save_checkpoint(path)
+        extended = self.extend(path, self.reference_str[split:], self.dirty_bits[split:])
+        return {"full": full, "extended": extended, "match": full == extended}
+
+    def compute(self, num_of_frames):
+        """Compute the number of page faults, interrupts, and disk writes.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        self.start(num_of_frames)
+        self.feed(self.reference_str, self.dirty_bits)
+        self.finish()
+
+    def compute_all(self, frame_counts):
+        """Compute the number of page faults, interrupts, and disk writes for several numbers of frames.
+
+        Args:
+            frame_counts (iterable): The numbers of frames in memory.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        frame_counts = list(frame_counts)
+        if self.lockstep and self.instrumentation is None and len(frame_counts) > 1:
+            results = self.compute_lockstep(sorted(set(frame_counts)))
+            self.reset()
+            last = results[frame_counts[-1]]
+            self.page_faults = last["page_faults"]
+            self.interrupts = last["interrupts"]
+            self.disk_writes = last["disk_writes"]
+            self.position = len(self.reference_str)
+            return [dict(results[num_of_frames]) for num_of_frames in frame_counts]
+
+        results = []
+        for num_of_frames in frame_counts:
+            self.compute(num_of_frames=num_of_frames)
+            results.append(self.get_results())
+        return results
+
+    def compute_lockstep(self, frame_counts):
+        """Compute the results for several numbers of frames in a single walk of the reference string.
+
+        Args:
+            frame_counts (list): The distinct numbers of frames in memory, in increasing order.
+
+        Returns:
+            dict: The number of frames -> a dictionary containing the page faults, interrupts, and disk writes.
+        """
+        raise NotImplementedError
+
+    def parameters(self):
+        """Get the parameters, besides the number of frames, that the results depend on.
+
+        Returns:
+            dict: The parameters (JSON serializable).
+        """
+        return {}
 
     def get_results(self):
         """Get the results.
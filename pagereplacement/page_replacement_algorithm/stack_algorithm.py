@@ -0,0 +1,106 @@
+from .page_replacement_algorithm import PageReplacementAlgorithm
+
+
+class StackAlgorithm(PageReplacementAlgorithm):
+    """Stack Algorithm.
+
+    A base class for page replacement algorithms with the inclusion property: the pages in memory
+    with k frames are always a subset of the pages in memory with k + 1 frames. Such an algorithm
+    can be described by a single stack whose top k entries are the pages in memory with k frames
+    (Mattson et al.), so `compute_stack` produces the results for every number of frames in one pass.
+
+    Subclasses implement `update_stack` and report every page that leaves the top of the stack
+    through `record_evictions`.
+    """
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
+        """Constructor.
+
+        Args:
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+        """
+        super().__init__(reference_str, dirty_bits, max_page_num)
+        self.max_stack_size = 0
+        self.last_dirty = dict()
+        self.write_diff = []
+
+    def update_stack(self, stack, index, page_num):
+        """Move the referenced page to the top of the stack.
+
+        Args:
+            stack (list): The stack, the top is at position 0. It holds at most `max_stack_size` pages.
+            index (int): The current index of the reference string.
+            page_num (int): The referenced page number.
+
+        Returns:
+            int: The depth (1-based) of the page before the reference, or 0 if it was not in the stack.
+        """
+        raise NotImplementedError
+
+    def record_evictions(self, first_size, last_size, page_num):
+        """Record that a page is evicted from memory with first_size to last_size frames.
+
+        The dirty bit of the page is the dirty bit of its last reference whatever the number of frames,
+        so a disk write is counted for each of those numbers of frames if the page is dirty.
+
+        Args:
+            first_size (int): The smallest number of frames.
+            last_size (int): The largest number of frames.
+            page_num (int): The evicted page number.
+        """
+        if first_size <= last_size and self.last_dirty[page_num] == 1:
+            self.write_diff[first_size] += 1
+            self.write_diff[last_size + 1] -= 1
+
+    def compute_stack(self, frame_counts):
+        """Compute the number of page faults, interrupts, and disk writes for every number of frames in one pass.
+
+        Args:
+            frame_counts (iterable): The numbers of frames in memory.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        frame_counts = list(frame_counts)
+        self.max_stack_size = max(frame_counts, default=0)
+        self.last_dirty = dict()
+        self.write_diff = [0] * (self.max_stack_size + 2)
+        # hits[d] is the number of references found at depth d of the stack.
+        hits = [0] * (self.max_stack_size + 1)
+
+        stack = []
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(self.reference_str, self.dirty_bits)
+        ):
+            depth = self.update_stack(stack, index, ref_page_num)
+            if depth:
+                hits[depth] += 1
+            self.last_dirty[ref_page_num] = dirty_bit
+        self.finish_stack(stack)
+
+        page_faults = [len(self.reference_str)] * (self.max_stack_size + 1)
+        disk_writes = [0] * (self.max_stack_size + 1)
+        for size in range(1, self.max_stack_size + 1):
+            page_faults[size] = page_faults[size - 1] - hits[size]
+            disk_writes[size] = disk_writes[size - 1] + self.write_diff[size]
+
+        results = []
+        for num_of_frames in frame_counts:
+            results.append(
+                {
+                    "page_faults": page_faults[num_of_frames],
+                    "interrupts": page_faults[num_of_frames] + disk_writes[num_of_frames],
+                    "disk_writes": disk_writes[num_of_frames],
+                }
+            )
+        return results
+
+    def finish_stack(self, stack):
+        """Record the evictions that are only known at the end of the reference string.
+
+        Args:
+            stack (list): The stack at the end of the reference string.
+        """
+        pass
@@ -0,0 +1,231 @@
+import time
+from collections import OrderedDict
+
+from .page_replacement_algorithm import PageReplacementAlgorithm
+
+
+class TwoQueues:
+    """The queues of 2Q.
+
+    Each queue is an OrderedDict from the oldest to the newest page:
+    - a1in: A FIFO of the pages in memory referenced once (page number -> dirty bit).
+    - a1out: A FIFO of the ghosts of the pages evicted from a1in (page numbers only).
+    - am: An LRU list of the pages in memory referenced again after being a ghost (page number -> dirty bit).
+
+    Every operation is O(1).
+    """
+
+    def __init__(self, num_of_frames, in_size, out_size):
+        self.num_of_frames = num_of_frames
+        self.in_size = in_size
+        self.out_size = out_size
+        self.a1in = OrderedDict()
+        self.a1out = OrderedDict()
+        self.am = OrderedDict()
+
+    def reclaim(self):
+        """Free a frame if the memory is full.
+
+        Returns:
+            tuple: The evicted page number and its dirty bit, or None if no page is evicted.
+        """
+        a1in = self.a1in
+        am = self.am
+        if len(a1in) + len(am) < self.num_of_frames:
+            return None
+        if len(a1in) > self.in_size or not am:
+            # The oldest page referenced once leaves memory but is remembered in a1out.
+            page_num, dirty_bit = a1in.popitem(last=False)
+            self.a1out[page_num] = None
+            if len(self.a1out) > self.out_size:
+                self.a1out.popitem(last=False)
+            return page_num, dirty_bit
+        return am.popitem(last=False)
+
+    def resize(self, num_of_frames, in_size, out_size):
+        """Change the number of frames and the sizes of a1in and a1out.
+
+        Returns:
+            list: The evicted page numbers and their dirty bits.
+        """
+        self.num_of_frames = num_of_frames
+        self.in_size = in_size
+        self.out_size = out_size
+        evicted = [self.reclaim() for _ in range(len(self.a1in) + len(self.am) - num_of_frames)]
+        while len(self.a1out) > out_size:
+            self.a1out.popitem(last=False)
+        return evicted
+
+
+class TwoQ(PageReplacementAlgorithm):
+    """2Q Page Replacement Algorithm.
+
+    2Q (Johnson and Shasha) admits a page referenced for the first time into a small FIFO (a1in).
+    Only the pages referenced again after leaving it, while remembered in a1out, enter the main LRU
+    list (am), so the pages referenced once by a scan never push out the frequently used pages.
+    """
+
+    checkpoint_attributes = ("queues",)
+
+    def __init__(
+        self,
+        reference_str,
+        dirty_bits=None,
+        max_page_num=1200,
+        in_fraction=0.25,
+        out_fraction=0.5,
+    ):
+        """Constructor for TwoQ.
+
+        Args:
+            reference_str (list or Trace): A list of page numbers, or a Trace.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+            in_fraction (float, optional): The size of a1in, as a fraction of the frames. Defaults to 0.25.
+            out_fraction (float, optional): The size of a1out, as a fraction of the frames. Defaults to 0.5.
+        """
+        super().__init__(reference_str, dirty_bits, max_page_num)
+        self.in_fraction = in_fraction
+        self.out_fraction = out_fraction
+
+    def parameters(self):
+        """Get the parameters, besides the number of frames, that the results depend on.
+
+        Returns:
+            dict: The parameters (JSON serializable).
+        """
+        return {"in_fraction": self.in_fraction, "out_fraction": self.out_fraction}
+
+    def start(self, num_of_frames):
+        """Start a simulation with an empty memory.
+
+        Args:
+            num_of_frames (int): The number of frames in memory.
+        """
+        super().reset()
+        self.num_of_frames = num_of_frames
+
+        self.queues = TwoQueues(
+            num_of_frames,
+            in_size=max(1, int(num_of_frames * self.in_fraction)),
+            out_size=max(1, int(num_of_frames * self.out_fraction)),
+        )
+
+    def resize(self, num_of_frames):
+        """Change the number of frames in the middle of a simulation, scaling a1in and a1out with it.
+
+        Args:
+            num_of_frames (int): The new number of frames in memory, at least 1.
+
+        Returns:
+            dict: The results so far.
+        """
+        self.num_of_frames = num_of_frames
+        return self.write_back(
+            self.queues.resize(
+                num_of_frames,
+                in_size=max(1, int(num_of_frames * self.in_fraction)),
+                out_size=max(1, int(num_of_frames * self.out_fraction)),
+            )
+        )
+
+    def feed(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        queues = self.queues
+        a1in = queues.a1in
+        a1out = queues.a1out
+        am = queues.am
+
+        # Simulate the process of page replacement.
+        for ref_page_num, dirty_bit in zip(reference_str, dirty_bits):
+            if ref_page_num in am:
+                # Update the dirty bit and make the page the most recently used.
+                am[ref_page_num] = dirty_bit
+                am.move_to_end(ref_page_num)
+            elif ref_page_num in a1in:
+                # Update the dirty bit, a1in is a FIFO.
+                a1in[ref_page_num] = dirty_bit
+            else:
+                # The page is not in memory, page fault occurs.
+                self.page_faults += 1
+                self.interrupts += 1
+                # A page remembered in a1out has been referenced again, it will enter am.
+                again = ref_page_num in a1out
+                if again:
+                    del a1out[ref_page_num]
+                victim = queues.reclaim()
+                # If the replaced page is dirty, write it to disk.
+                if victim is not None and victim[1]:
+                    self.disk_writes += 1
+                    self.interrupts += 1
+                if again:
+                    am[ref_page_num] = dirty_bit
+                else:
+                    a1in[ref_page_num] = dirty_bit
+
+        self.position += len(reference_str)
+        return self.get_results()
+
+    def feed_instrumented(self, reference_str, dirty_bits):
+        """Simulate the next chunk of references, reporting to the instrumentation.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+
+        Returns:
+            dict: The results so far.
+        """
+        instrumentation = self.instrumentation
+        emit = instrumentation.emit
+        clock = time.perf_counter
+        start = clock()
+        queues = self.queues
+        a1in = queues.a1in
+        a1out = queues.a1out
+        am = queues.am
+
+        for index, (ref_page_num, dirty_bit) in enumerate(
+            zip(reference_str, dirty_bits), self.position
+        ):
+            if ref_page_num in am:
+                emit("hit", index, ref_page_num)
+                am[ref_page_num] = dirty_bit
+                am.move_to_end(ref_page_num)
+            elif ref_page_num in a1in:
+                emit("hit", index, ref_page_num)
+                a1in[ref_page_num] = dirty_bit
+            else:
+                fault_start = clock()
+                emit("fault", index, ref_page_num)
+                self.page_faults += 1
+                self.interrupts += 1
+                again = ref_page_num in a1out
+                if again:
+                    del a1out[ref_page_num]
+                victim_start = clock()
+                victim = queues.reclaim()
+                if victim is not None:
+                    instrumentation.add_time("victim", clock() - victim_start)
+                    emit("eviction", index, victim[0])
+                    if victim[1]:
+                        emit("write_back", index, victim[0])
+                        self.disk_writes += 1
+                        self.interrupts += 1
+                if again:
+                    am[ref_page_num] = dirty_bit
+                else:
+                    a1in[ref_page_num] = dirty_bit
+                instrumentation.add_time("fault", clock() - fault_start)
+
+        self.position += len(reference_str)
+        instrumentation.add_time("total", clock() - start)
+        return self.get_results()
@@ -1,81 +1,100 @@
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+# colors, markers and line styles of the algorithms, in order.
+COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]
+MARKERS = ["o", "s", "D", "^", "v"]
+LINE_STYLES = ["-.", "--", "-"]
+
+# The result column and the y label of each figure, in the order of the file names.
+METRICS = [
+    ("Page Faults", "Number of page faults"),
+    ("Interrupts", "Number of interrupts"),
+    ("Disk Writes", "Number of disk writes"),
+]
+
+
+def render(title, ylabel, frame_count, series, filename):
+    """Render one figure to a file.
+
+    The figure is built with the object-oriented API, without pyplot, so it does not depend on
+    an interactive backend and is freed as soon as it is saved.
+
+    Args:
+        title (str): The title of the figure.
+        ylabel (str): The label of the y axis.
+        frame_count (list): The numbers of frames (x axis).
+        series (list): (algorithm name, values) of each line.
+        filename (str): The path of the image file.
+    """
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for index, (algo, values) in enumerate(series):
+        ax.plot(
+            frame_count,
+            values,
+            label=algo,
+            color=COLORS[index % len(COLORS)],
+            marker=MARKERS[index % len(MARKERS)],
+            linestyle=LINE_STYLES[index % len(LINE_STYLES)],
+            alpha=0.8,
+        )
+    ax.set_xlabel("Number of frames", fontsize=14, fontname="Times New Roman")
+    ax.set_ylabel(ylabel, fontsize=14, fontname="Times New Roman")
+    ax.set_title(title, fontsize=32, fontname="Times New Roman", weight="bold")
+    ax.legend()
+    ax.grid(True)
+    fig.savefig(filename)
+    fig.clear()
 
 
 class Plotter:
     def __init__(self, results):
         self.results = results
-        self.data = dict()
-
-    def plot(self, title, algorithm_name, path, filenames):
-        for index, result in enumerate(self.results):
-            self.data[algorithm_name[index]] = dict()
-            self.data[algorithm_name[index]]["frame_count"] = list(result.index)
-            self.data[algorithm_name[index]]["page_faults"] = list(
-                result["Page Faults"]
-            )
-            self.data[algorithm_name[index]]["interrupts"] = list(result["Interrupts"])
-            self.data[algorithm_name[index]]["disk_writes"] = list(
-                result["Disk Writes"]
-            )
-        # print(self.data)
 
-        frame_count = self.data[algorithm_name[0]]["frame_count"]
+    def figures(self, title, algorithm_name, path, filenames):
+        """Describe the figures to render.
 
-        # cmap = plt.get_cmap("tab10")
-        colors = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728"]
-        markers = ["o", "s", "D", "^", "v"]
-        line_styles = ["-.", "--", "-"]
+        Args:
+            title (str): The title of the figures.
+            algorithm_name (list): The algorithm name of each result.
+            path (str): The folder of the figures.
+            filenames (list): The file names of the page faults, interrupts and disk writes figures.
 
-        plt.figure(figsize=(10, 6))
-        for index, algo in enumerate(algorithm_name):
-            plt.plot(
+        Returns:
+            list: The arguments of `render` for each figure.
+        """
+        frame_count = self.results[0].index.tolist()
+        return [
+            (
+                title,
+                ylabel,
                 frame_count,
-                self.data[algo]["page_faults"],
-                label=algo,
-                color=colors[index % len(colors)],
-                marker=markers[index % len(markers)],
-                linestyle=line_styles[index % len(line_styles)],
-                alpha=0.8,
+                [
+                    (algo, result[column].tolist())
+                    for algo, result in zip(algorithm_name, self.results)
+                ],
+                f"{path}/{filename}",
             )
-        plt.xlabel("Number of frames", fontsize=14, fontname="Times New Roman")
-        plt.ylabel("Number of page faults", fontsize=14, fontname="Times New Roman")
-        plt.title(title, fontsize=32, fontname="Times New Roman", weight="bold")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(f"{path}/{filenames[0]}")
+            for (column, ylabel), filename in zip(METRICS, filenames)
+        ]
 
-        plt.figure(figsize=(10, 6))
-        for index, algo in enumerate(algorithm_name):
-            plt.plot(
-                frame_count,
-                self.data[algo]["interrupts"],
-                label=algo,
-                color=colors[index % len(colors)],
-                marker=markers[index % len(markers)],
-                linestyle=line_styles[index % len(line_styles)],
-                alpha=0.8,
-            )
-        plt.xlabel("Number of frames", fontsize=14, fontname="Times New Roman")
-        plt.ylabel("Number of interrupts", fontsize=14, fontname="Times New Roman")
-        plt.title(title, fontsize=32, fontname="Times New Roman", weight="bold")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(f"{path}/{filenames[1]}")
+    def plot(self, title, algorithm_name, path, filenames, executor=None):
+        """Plot the page faults, interrupts and disk writes of each algorithm.
 
-        plt.figure(figsize=(10, 6))
-        for index, algo in enumerate(algorithm_name):
-            plt.plot(
-                frame_count,
-                self.data[algo]["disk_writes"],
-                label=algo,
-                color=colors[index % len(colors)],
-                marker=markers[index % len(markers)],
-                linestyle=line_styles[index % len(line_styles)],
-                alpha=0.8,
-            )
-        plt.xlabel("Number of frames", fontsize=14, fontname="Times New Roman")
-        plt.ylabel("Number of disk writes", fontsize=14, fontname="Times New Roman")
-        plt.title(title, fontsize=32, fontname="Times New Roman", weight="bold")
-        plt.legend()
-        plt.grid(True)
-        plt.savefig(f"{path}/{filenames[2]}")
+        Args:
+            title (str): The title of the figures.
+            algorithm_name (list): The algorithm name of each result.
+            path (str): The folder of the figures.
+            filenames (list): The file names of the page faults, interrupts and disk writes figures.
+            executor (Executor, optional): Render the figures in this executor, e.g. a process pool,
+                instead of rendering them one after the other. Defaults to None.
+
+        Returns:
+            list: The futures of the figures if an executor is given, otherwise an empty list.
+        """
+        figures = self.figures(title, algorithm_name, path, filenames)
+        if executor is not None:
+            return [executor.submit(render, *figure) for figure in figures]
+        for figure in figures:
+            render(*figure)
+        return []
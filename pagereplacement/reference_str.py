@@ -1,10 +1,14 @@
 import random
 
+from .trace import Trace
+
 
 class ReferenceStr:
     """A class to generate reference string and dirty bits."""
 
-    def __init__(self, min=1, max=1200, length=120000, random_seed=133040007):
+    def __init__(
+        self, min=1, max=1200, length=120000, random_seed=133040007, use_numpy=False
+    ):
         """Constructor.
 
         Args:
@@ -12,6 +16,9 @@ class ReferenceStr:
             max (int, optional): Maximum page number. Defaults to 1200.
             length (int, optional): The length of reference string. Defaults to 120000.
             random_seed (int, optional): The random seed for the genertator. Defaults to 133040007.
+            use_numpy (bool, optional): Generate the reference string and dirty bits in bulk with NumPy.
+                It is much faster for long reference strings, but it draws from NumPy's generator, so the
+                reference string differs from the one generated with the same seed by `random`. Defaults to False.
 
         Raises:
             ValueError: The length of the reference string must be greater than 200.
@@ -20,6 +27,9 @@ class ReferenceStr:
         self.max = max
         self.length = length
         self.random_seed = random_seed
+        self.use_numpy = use_numpy
+        self.type = None
+        self.locality_range = None
         self.reference_str = []
         self.dirty_bits = []
 
@@ -33,6 +43,12 @@ class ReferenceStr:
         Generate reference string based on the type.
         And also generate dirty bit for each reference.
         """
+        self.type = type
+        self.locality_range = (locality_range_min, locality_range_max)
+        if self.use_numpy:
+            self.generate_reference_array(type, locality_range_min, locality_range_max)
+            return
+
         random.seed(self.random_seed)
         self.dirty_bits = [random.choice([0, 1]) for _ in range(self.length)]
 
@@ -109,8 +125,111 @@ class ReferenceStr:
             index += 1
         return reference_str
 
+    def generate_reference_array(
+        self, type, locality_range_min=25, locality_range_max=50
+    ):
+        """
+        Generate reference string and dirty bits as NumPy arrays.
+
+        Every procedure call (or random string) is drawn as a segment with its own page range,
+        and all the segments are drawn in a single call, seeded by random_seed.
+        """
+        import numpy as np
+
+        rng = np.random.default_rng(self.random_seed)
+        self.dirty_bits = rng.integers(0, 2, size=self.length, dtype=np.uint8)
+
+        if type == "random":
+            self.reference_str = rng.integers(
+                self.min, self.max + 1, size=self.length, dtype=self.page_dtype()
+            )
+        elif type in ("locality", "hybrid"):
+            # The lengths of the segments, enough of them to cover the reference string.
+            min_length = max(self.length // 200, 1)
+            num_of_segments = self.length // min_length + 1
+            lengths = rng.integers(min_length, self.length // 100 + 1, size=num_of_segments)
+            num_of_segments = int(np.searchsorted(np.cumsum(lengths), self.length)) + 1
+            lengths = lengths[:num_of_segments]
+            lengths[-1] -= lengths.sum() - self.length
+
+            locality_range = rng.integers(
+                locality_range_min, locality_range_max + 1, size=num_of_segments
+            )
+            low = rng.integers(self.min, self.max + 1, size=num_of_segments)
+            high = np.minimum(low + locality_range, self.max)
+            if type == "hybrid":
+                # Even segments are random strings, odd segments are procedure calls.
+                low[::2] = self.min
+                high[::2] = self.max
+
+            self.reference_str = rng.integers(
+                np.repeat(low, lengths), np.repeat(high, lengths) + 1
+            ).astype(self.page_dtype())
+
+    def page_dtype(self):
+        """The smallest unsigned integer type that holds every page number.
+
+        Returns:
+            numpy.dtype: uint16 or uint32.
+        """
+        import numpy as np
+
+        return np.uint16 if self.max <= np.iinfo(np.uint16).max else np.uint32
+
+    def get_trace(self):
+        """Get the reference string and dirty bits as a compact Trace.
+
+        Returns:
+            Trace: The trace. The NumPy arrays are wrapped without copying the page numbers.
+        """
+        if self.use_numpy:
+            import numpy as np
+
+            trace = Trace.from_buffers(
+                self.reference_str,
+                np.packbits(self.dirty_bits, bitorder="little"),
+                length=self.length,
+                max_page_num=self.max,
+            )
+        else:
+            trace = Trace(self.reference_str, self.dirty_bits, max_page_num=self.max)
+        trace.seed = self.random_seed
+        trace.provenance = {
+            "type": self.type,
+            "min": self.min,
+            "max": self.max,
+            "length": self.length,
+            "locality_range": list(self.locality_range) if self.locality_range else None,
+            "use_numpy": self.use_numpy,
+        }
+        return trace
+
+    def save(self, path):
+        """Save the generated reference string and dirty bits to a binary trace file.
+
+        Args:
+            path (str): The path of the trace file.
+        """
+        self.get_trace().save(path)
+
+    @staticmethod
+    def load(path):
+        """Load a binary trace file saved by `save`.
+
+        Args:
+            path (str): The path of the trace file.
+
+        Returns:
+            Trace: The trace, memory-mapped from the file.
+        """
+        return Trace.load(path)
+
     def get_reference_str(self):
+        if self.use_numpy:
+            return self.reference_str.tolist()
         return self.reference_str.copy()
 
     def get_dirty_bits(self):
+        if self.use_numpy:
+            return self.dirty_bits.tolist()
         return self.dirty_bits.copy()
@@ -0,0 +1,207 @@
+import hashlib
+import inspect
+import json
+import os
+
+# The fingerprint of each algorithm class, computed once per process.
+_fingerprints = dict()
+
+# The fraction of max_bytes the eviction shrinks the cache to, so the next evictions are far apart.
+EVICTION_TARGET = 0.9
+
+
+def algorithm_fingerprint(algorithm):
+    """Identify an algorithm class and its implementation.
+
+    The fingerprint covers the class name, its `version` and the source of every module
+    the class and its base classes are defined in, so editing an algorithm invalidates its results.
+
+    Args:
+        algorithm (class): The page replacement algorithm class.
+
+    Returns:
+        str: The fingerprint.
+    """
+    if algorithm not in _fingerprints:
+        digest = hashlib.sha256()
+        digest.update(f"{algorithm.__module__}.{algorithm.__qualname__}".encode())
+        digest.update(str(getattr(algorithm, "version", None)).encode())
+        modules = []
+        for cls in algorithm.__mro__[:-1]:
+            module = inspect.getmodule(cls)
+            if module is not None and module not in modules:
+                modules.append(module)
+        for module in modules:
+            try:
+                digest.update(inspect.getsource(module).encode())
+            except (OSError, TypeError):
+                # No source available (e.g. a frozen build), rely on the version.
+                pass
+        _fingerprints[algorithm] = digest.hexdigest()
+    return _fingerprints[algorithm]
+
+
+class ResultCache:
+    """An on-disk cache of the results of each frame count.
+
+    Each entry is a small JSON file named by the hash of everything the results depend on: the
+    contents of the trace, the algorithm and its implementation, the number of frames and the
+    parameters. An entry is never stale, a change of any of them gives a new name, and the
+    entries that are no longer used are evicted least recently used first once the cache grows
+    over `max_bytes`, down to EVICTION_TARGET of it. Reading an entry updates its modification time,
+    which orders the eviction.
+
+    The folder is only scanned when the cache may be over `max_bytes`: the size found by the last scan
+    is kept in memory and grown by every entry put. Several processes can share a cache: entries are
+    written to a temporary file and renamed, and each process counts the entries it puts since its last
+    scan, so the cache can grow over `max_bytes` by what the other processes put in the meantime.
+    """
+
+    def __init__(self, directory, max_bytes=16 * 1024 * 1024):
+        """Constructor for ResultCache.
+
+        Args:
+            directory (str): The folder of the cache.
+            max_bytes (int, optional): The size above which entries are evicted. Defaults to 16 MiB.
+        """
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+        # The size of the entries at the last scan plus the size of the entries put since, None before
+        # the first scan.
+        self.size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, trace, algorithm, num_of_frames, parameters=None):
+        """Compute the key of an entry.
+
+        Args:
+            trace (Trace): The trace.
+            algorithm (class): The page replacement algorithm class.
+            num_of_frames (int): The number of frames in memory.
+            parameters (dict, optional): The other parameters the results depend on (JSON serializable).
+
+        Returns:
+            str: The key.
+        """
+        identity = {
+            "trace": trace.digest(),
+            "algorithm": algorithm_fingerprint(algorithm),
+            "num_of_frames": num_of_frames,
+            "parameters": parameters or {},
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Get the results of an entry.
+
+        Args:
+            key (str): The key.
+
+        Returns:
+            dict: The page faults, interrupts, and disk writes, or None if the entry is missing.
+        """
+        path = self.path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry["results"]
+
+    def put(self, key, results, description=None):
+        """Store the results of an entry, and evict the least recently used entries if the cache is too large.
+
+        Args:
+            key (str): The key.
+            results (dict): The page faults, interrupts, and disk writes.
+            description (dict, optional): What the entry is about, e.g. the algorithm name, used by `invalidate`.
+        """
+        path = self.path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        data = json.dumps({"description": description or {}, "results": results}).encode()
+        with open(temporary_path, "wb") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+        if self.size is not None:
+            # Replacing an entry counts it twice, which at worst scans the folder earlier.
+            self.size += len(data)
+        if self.size is None or self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """List the entries.
+
+        Returns:
+            list: (modification time, size, path) of each entry, least recently used first.
+        """
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        """Scan the folder, and if the cache is over max_bytes, remove the least recently used entries
+        until it fits in EVICTION_TARGET of max_bytes."""
+        entries = self.entries()
+        size = sum(entry[1] for entry in entries)
+        if size > self.max_bytes:
+            for _, entry_size, path in entries:
+                if size <= self.max_bytes * EVICTION_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                size -= entry_size
+        self.size = size
+
+    def invalidate(self, **description):
+        """Remove the entries whose description matches, or every entry if no description is given.
+
+        Args:
+            **description: The values to match, e.g. algorithm="Optimal".
+
+        Returns:
+            int: The number of entries removed.
+        """
+        removed = 0
+        for _, _, path in self.entries():
+            if description:
+                try:
+                    with open(path) as f:
+                        entry = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if any(
+                    entry["description"].get(name) != value
+                    for name, value in description.items()
+                ):
+                    continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        # Scan again on the next put.
+        self.size = None
+        return removed
+
+    def clear(self):
+        """Remove every entry.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        return self.invalidate()
@@ -0,0 +1,324 @@
+import csv
+import io
+import os
+import struct
+import uuid
+
+from .flusher import COLUMNS as FLUSHER_COLUMNS
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, appends are then not locked.
+    fcntl = None
+
+# The columns of the long format, one row per (workload, algorithm, frame count).
+COLUMNS = ["workload", "algorithm", "frames", "page_faults", "interrupts", "disk_writes"]
+# The columns of the results computed with a Flusher.
+WRITE_BACK_COLUMNS = COLUMNS + list(FLUSHER_COLUMNS)
+
+# The binary format: a magic number, then one record per row made of the length-prefixed
+# workload and algorithm names (UTF-8) followed by the frame count and the three results.
+# With the flusher results, the magic number ends with 2 and the records hold seven results.
+BINARY_MAGIC = b"PRRES\0\0\1"
+WRITE_BACK_MAGIC = b"PRRES\0\0\2"
+NAME_LENGTH = struct.Struct("<H")
+RECORD = struct.Struct("<IQQQ")
+WRITE_BACK_RECORD = struct.Struct("<IQQQQQQQ")
+
+
+def _csv_header(columns):
+    header = io.StringIO()
+    csv.writer(header).writerow(columns)
+    return header.getvalue().encode()
+
+
+def has_parquet():
+    """Check whether Parquet files can be written (pyarrow is installed)."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class ResultWriter:
+    """Append the results to a long-format file as soon as they are computed.
+
+    Formats:
+    - csv: A CSV file with a header and one line per row.
+    - binary: A compact append-only file of binary records.
+    - parquet: A folder of Parquet files, one per flush of each writer (requires pyarrow).
+    - columnar: parquet if pyarrow is installed, binary otherwise.
+
+    Several processes can write to the same CSV or binary file: every row is appended with a single
+    write to a file opened in append mode, under an exclusive lock where the platform supports it,
+    so rows never interleave, and a crash loses at most the row being written. Each Parquet writer
+    writes its own files, as Parquet files cannot be appended to.
+
+    With write_back, the results of a Flusher are written too (WRITE_BACK_COLUMNS). A file holds the
+    columns of the writer that created it, appending the other columns to it raises.
+    """
+
+    def __init__(self, path, format="csv", batch_size=64, write_back=False):
+        """Constructor for ResultWriter.
+
+        Args:
+            path (str): The result file, or the result folder for parquet.
+            format (str, optional): "csv", "binary", "parquet" or "columnar". Defaults to "csv".
+            batch_size (int, optional): The number of rows per Parquet file. Defaults to 64.
+            write_back (bool, optional): Also write the stall writes, background writes, background I/O
+                and I/O operations of the results computed with a Flusher. Defaults to False.
+
+        Raises:
+            ValueError: Unknown format.
+        """
+        if format == "columnar":
+            format = "parquet" if has_parquet() else "binary"
+        if format not in ("csv", "binary", "parquet"):
+            raise ValueError(f"Unknown format: {format}")
+        self.path = str(path)
+        self.format = format
+        self.batch_size = batch_size
+        self.columns = WRITE_BACK_COLUMNS if write_back else COLUMNS
+        if format == "csv":
+            self.header = _csv_header(self.columns)
+        else:
+            self.header = WRITE_BACK_MAGIC if write_back else BINARY_MAGIC
+        self.record = WRITE_BACK_RECORD if write_back else RECORD
+        # Whether the header of the file was checked against the columns of the writer.
+        self.checked = False
+        self.rows = []
+        self.parts = 0
+        if format == "parquet":
+            os.makedirs(self.path, exist_ok=True)
+            self.name = f"part-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        else:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+
+    def write(self, workload, algorithm, num_of_frames, result):
+        """Append one row.
+
+        Args:
+            workload (str): The workload name.
+            algorithm (str): The algorithm name.
+            num_of_frames (int): The number of frames in memory.
+            result (dict): The page faults, interrupts, and disk writes, and the flusher results with
+                write_back.
+
+        Raises:
+            ValueError: The file was created with other columns.
+        """
+        row = [workload, algorithm, num_of_frames, *(result[key] for key in self.columns[3:])]
+        if self.format == "parquet":
+            self.rows.append(row)
+            if len(self.rows) >= self.batch_size:
+                self.flush()
+        elif self.format == "csv":
+            line = io.StringIO()
+            csv.writer(line).writerow(row)
+            self._append(line.getvalue().encode())
+        else:
+            record = b"".join(
+                [
+                    self._name(workload),
+                    self._name(algorithm),
+                    self.record.pack(*row[2:]),
+                ]
+            )
+            self._append(record)
+
+    @staticmethod
+    def _name(name):
+        encoded = name.encode()
+        return NAME_LENGTH.pack(len(encoded)) + encoded
+
+    def _append(self, data):
+        """Append data to the file with a single write, writing the header first if the file is new."""
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size == 0:
+                data = self.header + data
+            elif not self.checked and os.pread(fd, len(self.header), 0) != self.header:
+                raise ValueError(f"{self.path} holds other columns than {self.columns}.")
+            self.checked = True
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def flush(self):
+        """Write the buffered Parquet rows to a new Parquet file."""
+        if not self.rows:
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        columns = list(zip(*self.rows))
+        types = [pa.string(), pa.string(), pa.uint32()] + [pa.uint64()] * (len(self.columns) - 3)
+        table = pa.table(
+            {
+                name: pa.array(values, type)
+                for name, values, type in zip(self.columns, columns, types)
+            }
+        )
+        path = os.path.join(self.path, f"{self.name}-{self.parts}.parquet")
+        # Write under a temporary name, readers only pick up complete files.
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        self.parts += 1
+        self.rows = []
+
+    def close(self):
+        """Flush the buffered rows."""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _is_part(name):
+    """Check whether a file name is one of the Parquet files of a ResultWriter."""
+    return name.startswith("part-") and name.endswith((".parquet", ".parquet.tmp"))
+
+
+def remove_results(path):
+    """Remove a long-format result file or folder, if it was written by ResultWriter.
+
+    A file is removed only if it is empty, or starts with a binary magic number or a CSV header of
+    ResultWriter; a folder only if it holds nothing but the Parquet files of ResultWriter. Nothing is done if
+    the path does not exist.
+
+    Args:
+        path (str): The result file or folder.
+
+    Raises:
+        ValueError: The path is not a result file or folder, it is left untouched.
+    """
+    import shutil
+
+    path = str(path)
+    if os.path.isdir(path):
+        if not all(_is_part(name) for name in os.listdir(path)):
+            raise ValueError(f"{path} is not a result folder, refusing to remove it.")
+        shutil.rmtree(path)
+        return
+    if not os.path.exists(path):
+        return
+    headers = (
+        BINARY_MAGIC,
+        WRITE_BACK_MAGIC,
+        _csv_header(COLUMNS),
+        _csv_header(WRITE_BACK_COLUMNS),
+    )
+    with open(path, "rb") as f:
+        start = f.read(max(map(len, headers)))
+    if start and not start.startswith(headers):
+        raise ValueError(f"{path} is not a result file, refusing to remove it.")
+    os.remove(path)
+
+
+def read_results(path):
+    """Read a long-format result file written by ResultWriter, whatever its format.
+
+    Args:
+        path (str): The result file or folder.
+
+    Raises:
+        ValueError: The file is not a result file.
+
+    Returns:
+        list: A dictionary per row, with the keys of COLUMNS, or WRITE_BACK_COLUMNS for the results
+            written with write_back.
+    """
+    path = str(path)
+    if os.path.isdir(path):
+        import pyarrow.parquet as pq
+
+        rows = []
+        for name in sorted(os.listdir(path)):
+            if _is_part(name) and name.endswith(".parquet"):
+                rows += pq.read_table(os.path.join(path, name)).to_pylist()
+        return rows
+
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith((BINARY_MAGIC, WRITE_BACK_MAGIC)):
+        columns, record = COLUMNS, RECORD
+        if data.startswith(WRITE_BACK_MAGIC):
+            columns, record = WRITE_BACK_COLUMNS, WRITE_BACK_RECORD
+        rows = []
+        offset = len(BINARY_MAGIC)
+        while True:
+            names = []
+            try:
+                for _ in range(2):
+                    (length,) = NAME_LENGTH.unpack_from(data, offset)
+                    offset += NAME_LENGTH.size
+                    if offset + length > len(data):
+                        raise struct.error("truncated name")
+                    names.append(data[offset : offset + length].decode())
+                    offset += length
+                values = record.unpack_from(data, offset)
+            except struct.error:
+                # The end of the file, or a record cut short by a crash.
+                break
+            offset += record.size
+            rows.append(dict(zip(columns, [*names, *values])))
+        return rows
+
+    text = data.decode(errors="replace")
+    if not text.endswith("\n"):
+        # The last line was cut short by a crash.
+        text = text[: text.rfind("\n") + 1]
+    reader = csv.reader(io.StringIO(text))
+    columns = next(reader, None)
+    if columns not in (COLUMNS, WRITE_BACK_COLUMNS):
+        raise ValueError(f"{path} is not a result file.")
+    rows = []
+    for row in reader:
+        rows.append(dict(zip(columns, [row[0], row[1], *map(int, row[2:])])))
+    return rows
+
+
+def wide_results(rows, workload, algorithm_names=None):
+    """Derive the wide view of a workload, one DataFrame per algorithm as returned by Simulator.run.
+
+    If a frame count of an algorithm appears several times, the last row wins. The columns of the flusher
+    results are added when every row of the algorithm has them.
+
+    Args:
+        rows (list): The rows returned by read_results.
+        workload (str): The workload name.
+        algorithm_names (list, optional): The algorithms, in order. Defaults to the order of the rows.
+
+    Returns:
+        tuple: The algorithm names and the DataFrames.
+    """
+    import pandas as pd
+
+    by_algorithm = dict()
+    for row in rows:
+        if row["workload"] == workload:
+            by_algorithm.setdefault(row["algorithm"], dict())[row["frames"]] = row
+    if algorithm_names is None:
+        algorithm_names = list(by_algorithm)
+    frames = []
+    for name in algorithm_names:
+        results = [by_algorithm[name][count] for count in sorted(by_algorithm[name])]
+        data = {
+            "Frame Count": [result["frames"] for result in results],
+            "Page Faults": [result["page_faults"] for result in results],
+            "Interrupts": [result["interrupts"] for result in results],
+            "Disk Writes": [result["disk_writes"] for result in results],
+        }
+        for key, column in FLUSHER_COLUMNS.items():
+            if all(key in result for result in results):
+                data[column] = [result[key] for result in results]
+        frames.append(pd.DataFrame.from_dict(data).set_index("Frame Count"))
+    return algorithm_names, frames
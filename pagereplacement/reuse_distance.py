@@ -0,0 +1,232 @@
+import os
+from array import array
+
+from .trace import Trace
+
+
+class FenwickTree:
+    """Fenwick Tree (binary indexed tree).
+
+    Keeps counts over the positions 0 to size - 1, and adds to a position or sums a prefix in O(log n).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        """Add delta to the count of a position."""
+        tree = self.tree
+        index += 1
+        while index <= self.size:
+            tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        """Sum the counts of the positions before index."""
+        tree = self.tree
+        total = 0
+        while index > 0:
+            total += tree[index]
+            index &= index - 1
+        return total
+
+
+class ReuseDistance:
+    """Reuse Distance Analyzer.
+
+    Computes the LRU stack distance of every reference in O(n log n): the position of the last
+    reference of each page is marked in a Fenwick tree over the reference string, so the number of
+    distinct pages referenced since the last reference of a page is a range count.
+
+    With k frames, LRU hits exactly the references whose stack distance is at most k (LRU is a stack
+    algorithm), so the histogram of the distances gives the page faults of every number of frames at
+    once. A page referenced with its dirty bit set stays dirty until its next reference, and LRU evicts
+    it in between exactly when the stack distance of that next reference (or, if there is none, its
+    depth at the end of the reference string) is larger than k, so the disk writes follow from a second
+    histogram. Both match the LRU algorithm exactly.
+    """
+
+    # The name of the curve in the figures.
+    label = "LRU"
+
+    def __init__(self, reference_str, dirty_bits=None, max_page_num=1200):
+        """Constructor for ReuseDistance.
+
+        Args:
+            reference_str (list, Trace, ReferenceStr or str): A list of page numbers, a Trace, a generated
+                ReferenceStr, or the path of a trace file.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The maximum number of pages. Defaults to 1200.
+        """
+        if isinstance(reference_str, (str, os.PathLike)):
+            reference_str = Trace.load(reference_str)
+        elif hasattr(reference_str, "get_trace"):
+            reference_str = reference_str.get_trace()
+        if isinstance(reference_str, Trace):
+            dirty_bits = reference_str.dirty_bits
+            reference_str = reference_str.reference_str
+        self.reference_str = reference_str
+        self.dirty_bits = dirty_bits
+        self.max_page_num = max_page_num
+        # The stack distance of each reference, 0 for the first reference of a page.
+        self.distances = None
+        # histogram[d] is the number of references with stack distance d.
+        self.histogram = None
+        # write_histogram[d] is the number of dirty references whose page is next found at depth d.
+        self.write_histogram = None
+        self.cold_misses = 0
+
+    def analyze(self):
+        """Compute the stack distance of every reference and the histograms.
+
+        Returns:
+            ReuseDistance: self.
+        """
+        reference_str = self.reference_str
+        dirty_bits = self.dirty_bits
+        length = len(reference_str)
+        tree = FenwickTree(length)
+        fenwick = tree.tree
+        last = dict()
+        distances = array("L", [0]) * length
+        histogram = [0]
+        write_histogram = [0]
+        marked = 0
+
+        # The Fenwick tree operations are inlined, this loop runs once per reference.
+        for index, (ref_page_num, dirty_bit) in enumerate(zip(reference_str, dirty_bits)):
+            previous = last.get(ref_page_num)
+            if previous is not None:
+                # The distinct pages referenced since the previous reference, including this page:
+                # the marks from previous on, i.e. all the marks minus those before previous.
+                total = 0
+                i = previous
+                while i > 0:
+                    total += fenwick[i]
+                    i &= i - 1
+                distance = marked - total
+                distances[index] = distance
+                while len(histogram) <= distance:
+                    histogram.append(0)
+                    write_histogram.append(0)
+                histogram[distance] += 1
+                if dirty_bits[previous]:
+                    write_histogram[distance] += 1
+                # Unmark the previous reference.
+                i = previous + 1
+                while i <= length:
+                    fenwick[i] -= 1
+                    i += i & -i
+            else:
+                marked += 1
+            last[ref_page_num] = index
+            i = index + 1
+            while i <= length:
+                fenwick[i] += 1
+                i += i & -i
+
+        # A dirty page that is not referenced again is written back if it sinks below the last frame.
+        for ref_page_num, index in last.items():
+            if dirty_bits[index]:
+                depth = marked - tree.prefix_sum(index)
+                while len(write_histogram) <= depth:
+                    histogram.append(0)
+                    write_histogram.append(0)
+                write_histogram[depth] += 1
+
+        self.distances = distances
+        self.histogram = histogram
+        self.write_histogram = write_histogram
+        self.cold_misses = marked
+        return self
+
+    def curve(self, max_frame_count=None):
+        """Get the LRU results for every number of frames from 1 to max_frame_count.
+
+        Args:
+            max_frame_count (int, optional): The largest number of frames. Defaults to max_page_num.
+
+        Returns:
+            list: A list of dictionaries containing the number of frames, page faults, interrupts, disk writes,
+                and the miss ratio.
+        """
+        if self.histogram is None:
+            self.analyze()
+        if max_frame_count is None:
+            max_frame_count = self.max_page_num
+        length = len(self.reference_str)
+        page_faults = length
+        disk_writes = sum(self.write_histogram)
+        results = []
+        for num_of_frames in range(1, max_frame_count + 1):
+            if num_of_frames < len(self.histogram):
+                page_faults -= self.histogram[num_of_frames]
+                disk_writes -= self.write_histogram[num_of_frames]
+            results.append(
+                {
+                    "frames": num_of_frames,
+                    "page_faults": page_faults,
+                    "interrupts": page_faults + disk_writes,
+                    "disk_writes": disk_writes,
+                    "miss_ratio": page_faults / length if length else 0.0,
+                }
+            )
+        return results
+
+    def results(self, frame_counts):
+        """Get the LRU results of some numbers of frames, in the format of Simulator.run.
+
+        The DataFrame can be plotted by Plotter next to the results of the simulated algorithms.
+
+        Args:
+            frame_counts (iterable): The numbers of frames in memory.
+
+        Returns:
+            DataFrame: The page faults, interrupts, and disk writes, indexed by the frame count.
+        """
+        import pandas as pd
+
+        frame_counts = list(frame_counts)
+        curve = self.curve(max(frame_counts, default=0))
+        rows = [curve[num_of_frames - 1] for num_of_frames in frame_counts]
+        return pd.DataFrame.from_dict(
+            {
+                "Frame Count": frame_counts,
+                "Page Faults": [row["page_faults"] for row in rows],
+                "Interrupts": [row["interrupts"] for row in rows],
+                "Disk Writes": [row["disk_writes"] for row in rows],
+            }
+        ).set_index("Frame Count")
+
+    def plot(self, title, path, name, max_frame_count=None):
+        """Plot the miss-ratio curve and the disk writes of every number of frames, like Plotter.
+
+        Args:
+            title (str): The title of the figures.
+            path (str): The folder of the figures.
+            name (str): The prefix of the file names.
+            max_frame_count (int, optional): The largest number of frames. Defaults to max_page_num.
+
+        Returns:
+            list: The paths of the figures.
+        """
+        from .plot import render
+
+        curve = self.curve(max_frame_count)
+        frame_count = [row["frames"] for row in curve]
+        figures = [
+            (
+                "Miss ratio",
+                [(self.label, [row["miss_ratio"] for row in curve])],
+                f"{path}/{name}_miss_ratio.png",
+            ),
+            (
+                "Number of disk writes",
+                [(self.label, [row["disk_writes"] for row in curve])],
+                f"{path}/{name}_lru_disk_writes.png",
+            ),
+        ]
+        for ylabel, series, filename in figures:
+            render(title, ylabel, frame_count, series, filename)
+        return [filename for _, _, filename in figures]
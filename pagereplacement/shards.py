@@ -0,0 +1,387 @@
+import heapq
+import math
+from bisect import bisect_left
+
+from .reuse_distance import ReuseDistance
+
+# The sampling thresholds are compared with the lowest bits of the page hashes.
+MODULUS_BITS = 24
+MODULUS = 1 << MODULUS_BITS
+MASK64 = (1 << 64) - 1
+
+
+class SampledStack:
+    """LRU stack of the sampled pages.
+
+    The last reference times of the sampled pages are kept sorted (they are appended in increasing
+    order), so the stack distance of a page is the number of times from its last reference on.
+    """
+
+    def __init__(self):
+        self.times = []
+        self.last = dict()
+        self.dirty = dict()
+
+    def access(self, page_num, time, dirty_bit):
+        """Reference a page.
+
+        Returns:
+            tuple: The stack distance among the sampled pages (0 for the first reference) and the dirty
+                bit of the previous reference.
+        """
+        times = self.times
+        previous = self.last.get(page_num)
+        distance = 0
+        was_dirty = 0
+        if previous is not None:
+            position = bisect_left(times, previous)
+            distance = len(times) - position
+            del times[position]
+            was_dirty = self.dirty[page_num]
+        times.append(time)
+        self.last[page_num] = time
+        self.dirty[page_num] = dirty_bit
+        return distance, was_dirty
+
+    def remove(self, page_num):
+        """Stop sampling a page."""
+        time = self.last.pop(page_num, None)
+        if time is not None:
+            del self.times[bisect_left(self.times, time)]
+            del self.dirty[page_num]
+
+    def depths(self):
+        """Yield the current depth of each dirty page."""
+        times = self.times
+        for page_num, time in self.last.items():
+            if self.dirty[page_num]:
+                yield len(times) - bisect_left(times, time)
+
+
+class SampledHistogram:
+    """The sampled references of a stack and their histograms.
+
+    Each reference is weighted by the inverse of the sampling rate when it is sampled, so the references
+    sampled before and after the threshold is lowered stand for the same number of references.
+    """
+
+    def __init__(self, size):
+        self.stack = SampledStack()
+        self.histogram = [0.0] * (size + 2)
+        self.write_histogram = [0.0] * (size + 2)
+        # The sampled references, and the sampled references that start a dirty interval.
+        self.references = 0.0
+        self.dirty_references = 0.0
+
+
+class SampledReuseDistance(ReuseDistance):
+    """Sampled Reuse Distance Analyzer (SHARDS).
+
+    Estimates the LRU results of every number of frames in constant memory, following SHARDS
+    (Waldspurger et al.): a page is sampled when the lowest bits of its hash are below a threshold, so
+    all the references of a sampled page are kept and the others are skipped, and the stack distances
+    among the sampled pages are scaled by the inverse of the sampling rate. Only the sampled pages are
+    tracked, at most `max_samples` of them: when there are more, the threshold is lowered to drop the
+    pages with the largest hashes, and the references sampled from then on weigh more (fixed-size SHARDS).
+
+    The miss ratio of each number of frames is the share of the sampled references that miss, and the
+    disk writes are estimated the same way as in ReuseDistance. The sampled pages are also split into
+    `groups` independent groups by other bits of their hash, each with its own stack, and the spread of
+    the miss ratios of the groups gives a standard error. As the groups are too small to be trusted when
+    few pages are sampled, the standard error is at least the binomial one over the sampled pages.
+
+    A sampled distance only locates a reference within 1 / rate frames, so below about 1 / rate frames
+    the curve cannot tell the frame counts apart. The reported bound is twice the standard error (about
+    a 95% interval) plus that resolution: the largest change of the miss ratio within 1 / rate frames
+    below or above each frame count. The standard error still assumes many sampled pages, none of which
+    carries a large share of the references: on a skewed trace with few sampled pages, the bound is only
+    meaningful past 1 / rate frames.
+
+    With `adjust`, the ratios are taken over the expected number of sampled references rather than the
+    sampled count (SHARDS-adj), which helps when a few hot pages that happen to be sampled, or not, move
+    the sampled references far from their expected count. It is off by default: on traces without hot
+    pages it turns the noise of the sampled count into a shift of the whole curve.
+
+    With `use_numpy`, each chunk is hashed and filtered with NumPy, so only the sampled references are
+    visited in Python.
+    """
+
+    label = "LRU (sampled)"
+
+    def __init__(
+        self,
+        reference_str=None,
+        dirty_bits=None,
+        max_page_num=1200,
+        rate=0.01,
+        max_samples=8192,
+        groups=8,
+        seed=0,
+        use_numpy=False,
+        adjust=False,
+    ):
+        """Constructor for SampledReuseDistance.
+
+        Args:
+            reference_str (list, Trace, ReferenceStr or str, optional): A list of page numbers, a Trace, a
+                generated ReferenceStr, or the path of a trace file. Not needed to stream it with `feed`.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
+            max_page_num (int, optional): The largest number of frames of the curve. Defaults to 1200.
+            rate (float, optional): The initial sampling rate. Defaults to 0.01.
+            max_samples (int, optional): The maximum number of sampled pages tracked, None for no limit.
+                Defaults to 8192.
+            groups (int, optional): The number of groups of the error bound. Defaults to 8.
+            seed (int, optional): The hash seed. Defaults to 0.
+            use_numpy (bool, optional): Hash and filter the references with NumPy. Defaults to False.
+            adjust (bool, optional): Take the ratios over the expected number of sampled references
+                (SHARDS-adj). Defaults to False.
+        """
+        if reference_str is None:
+            reference_str, dirty_bits = [], []
+        super().__init__(reference_str, dirty_bits, max_page_num)
+        self.rate = rate
+        self.max_samples = max_samples
+        self.groups = groups
+        self.seed = seed
+        self.use_numpy = use_numpy
+        self.adjust = adjust
+        self.start()
+
+    def start(self):
+        """Start an analysis with nothing sampled."""
+        self.threshold = max(1, min(MODULUS, round(self.rate * MODULUS)))
+        self.length = 0
+        self.sample = SampledHistogram(self.max_page_num)
+        self.group_samples = [SampledHistogram(self.max_page_num) for _ in range(self.groups)]
+        # (-hash bits, page number) of every sampled page, the largest hash first.
+        self.heap = []
+
+    @property
+    def sampling_rate(self):
+        """The current sampling rate."""
+        return self.threshold / MODULUS
+
+    def feed(self, reference_str, dirty_bits):
+        """Analyze the next chunk of references.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+        """
+        # Each page number is hashed to 64 bits with a SplitMix64-like finalizer: the lowest MODULUS_BITS
+        # bits decide whether the page is sampled, the bits above pick its group.
+        seed = self.seed
+        if self.use_numpy:
+            import numpy as np
+
+            pages = np.asarray(reference_str, dtype=np.uint64)
+            h = (pages + np.uint64(seed)) * np.uint64(0x9E3779B97F4A7C15)
+            h ^= h >> np.uint64(32)
+            h *= np.uint64(0xD6E8FEB86659FD93)
+            h ^= h >> np.uint64(32)
+            # The threshold only decreases, so the references under it now are a superset.
+            indices = np.flatnonzero((h & np.uint64(MODULUS - 1)) < self.threshold).tolist()
+            hashes = h[indices].tolist()
+            pages = pages[indices].tolist()
+            for index, page_num, hash_value in zip(indices, pages, hashes):
+                if hash_value & (MODULUS - 1) < self.threshold:
+                    self._reference(page_num, self.length + index, dirty_bits[index], hash_value)
+        else:
+            for index, (ref_page_num, dirty_bit) in enumerate(
+                zip(reference_str, dirty_bits), self.length
+            ):
+                h = ((ref_page_num + seed) * 0x9E3779B97F4A7C15) & MASK64
+                h ^= h >> 32
+                h = (h * 0xD6E8FEB86659FD93) & MASK64
+                h ^= h >> 32
+                if h & (MODULUS - 1) < self.threshold:
+                    self._reference(ref_page_num, index, dirty_bit, h)
+        self.length += len(reference_str)
+
+    def _reference(self, page_num, time, dirty_bit, hash_value):
+        """Record a reference of a sampled page."""
+        group = self.group_samples[(hash_value >> MODULUS_BITS) % self.groups]
+        new_page = page_num not in self.sample.stack.last
+        rate = self.sampling_rate
+        weight = 1 / rate
+        for sample, sample_rate in ((self.sample, rate), (group, rate / self.groups)):
+            distance, was_dirty = sample.stack.access(page_num, time, dirty_bit)
+            sample.references += weight
+            if dirty_bit:
+                sample.dirty_references += weight
+            if distance:
+                bucket = self._bucket(distance, sample_rate)
+                sample.histogram[bucket] += weight
+                if was_dirty:
+                    sample.write_histogram[bucket] += weight
+        if new_page:
+            heapq.heappush(self.heap, (-(hash_value & (MODULUS - 1)), page_num, hash_value))
+            if self.max_samples is not None and len(self.sample.stack.last) > self.max_samples:
+                self._lower_threshold()
+
+    def _bucket(self, distance, rate):
+        # The page itself is at depth 1, each other sampled page stands for 1 / rate pages.
+        depth = 1 + (distance - 1) / rate
+        return min(int(depth + 0.5), self.max_page_num + 1)
+
+    def _lower_threshold(self):
+        """Drop the sampled pages with the largest hashes until there are at most max_samples."""
+        heap = self.heap
+        while len(self.sample.stack.last) > self.max_samples:
+            self.threshold = -heap[0][0]
+            while heap and -heap[0][0] >= self.threshold:
+                _, page_num, hash_value = heapq.heappop(heap)
+                self.sample.stack.remove(page_num)
+                self.group_samples[(hash_value >> MODULUS_BITS) % self.groups].stack.remove(page_num)
+
+    def analyze(self):
+        """Stream the reference string given to the constructor through `feed`.
+
+        Returns:
+            SampledReuseDistance: self.
+        """
+        self.start()
+        if self.use_numpy:
+            from .trace import chunks
+
+            for reference_str, dirty_bits in chunks(self.reference_str, self.dirty_bits):
+                self.feed(reference_str, dirty_bits)
+        else:
+            self.feed(self.reference_str, self.dirty_bits)
+        return self
+
+    def _miss_curve(self, sample, rate, max_frame_count, expected):
+        """The miss ratio and the dirty intervals evicted per reference of every number of frames.
+
+        With `adjust`, the ratios are over the `expected` weighted references rather than the sampled
+        ones (SHARDS-adj). The difference is put in the shortest distances, where the references of hot
+        pages are: missing references are added as hits at one frame, and extra ones are taken off the
+        hits from the shortest distance on.
+        """
+        if not self.adjust:
+            expected = sample.references
+        histogram = list(sample.histogram)
+        misses = sample.references
+        if expected >= misses:
+            histogram[1] += expected - misses
+            misses = expected
+        else:
+            for bucket in range(1, len(histogram)):
+                taken = min(misses - expected, histogram[bucket])
+                histogram[bucket] -= taken
+                misses -= taken
+                if misses == expected:
+                    break
+        write_histogram = list(sample.write_histogram)
+        # A dirty page that is not referenced again is written back if it sinks below the last frame.
+        for depth in sample.stack.depths():
+            write_histogram[self._bucket(depth, rate)] += 1 / self.sampling_rate
+        references = expected if sample.references else 0
+        writes = sample.dirty_references
+        curve = []
+        for num_of_frames in range(1, max_frame_count + 1):
+            if num_of_frames <= self.max_page_num:
+                misses -= histogram[num_of_frames]
+                writes -= write_histogram[num_of_frames]
+            if references:
+                curve.append((min(misses / references, 1.0), min(writes / references, 1.0)))
+            else:
+                curve.append((0.0, 0.0))
+        return curve
+
+    def curve(self, max_frame_count=None):
+        """Get the estimated LRU results for every number of frames from 1 to max_frame_count.
+
+        Past max_page_num, the results stay those of max_page_num frames, as in ReuseDistance.
+
+        Args:
+            max_frame_count (int, optional): The largest number of frames. Defaults to max_page_num.
+
+        Returns:
+            list: A list of dictionaries containing the number of frames, the page faults, interrupts,
+                and disk writes, the miss ratio and the error bound of the miss ratio.
+        """
+        if max_frame_count is None:
+            max_frame_count = self.max_page_num
+        rate = self.sampling_rate
+        # A sampled distance only tells the depth of a reference within `step` frames.
+        step = math.ceil(1 / rate)
+        curve = self._miss_curve(self.sample, rate, max_frame_count + step, self.length)
+        group_curves = [
+            self._miss_curve(group, rate / self.groups, max_frame_count, self.length / self.groups)
+            for group in self.group_samples
+            if group.references
+        ]
+        pages = max(len(self.sample.stack.last), 1)
+        results = []
+        for num_of_frames, (miss_ratio, write_ratio) in enumerate(curve[:max_frame_count], 1):
+            variance = miss_ratio * (1 - miss_ratio) / pages
+            if len(group_curves) > 1:
+                ratios = [group_curve[num_of_frames - 1][0] for group_curve in group_curves]
+                mean = sum(ratios) / len(ratios)
+                spread = sum((ratio - mean) ** 2 for ratio in ratios) / (len(ratios) - 1)
+                variance = max(variance, spread / len(ratios))
+            # How much the miss ratio moves within one step below or above.
+            below = curve[num_of_frames - step - 1][0] if num_of_frames > step else 1.0
+            above = curve[num_of_frames + step - 1][0]
+            resolution = max(below - miss_ratio, miss_ratio - above)
+            error = 2 * math.sqrt(variance) + resolution
+            page_faults = round(miss_ratio * self.length)
+            disk_writes = round(write_ratio * self.length)
+            results.append(
+                {
+                    "frames": num_of_frames,
+                    "page_faults": page_faults,
+                    "interrupts": page_faults + disk_writes,
+                    "disk_writes": disk_writes,
+                    "miss_ratio": miss_ratio,
+                    "error": error,
+                }
+            )
+        return results
+
+
+def validate(trace, frame_counts, max_page_num=None, **options):
+    """Compare the sampled miss ratios with exact LRU runs of the simulator.
+
+    Args:
+        trace (Trace): The trace.
+        frame_counts (list): The numbers of frames to compare.
+        max_page_num (int, optional): The maximum page number. Defaults to the one of the trace.
+        **options: Arguments of SampledReuseDistance.
+
+    Raises:
+        ValueError: A number of frames is less than 1.
+
+    Returns:
+        dict: The mean and maximum absolute errors of the miss ratio, the share of the frame counts whose
+            error is within the reported bound, and the sampled and exact rows.
+    """
+    from .page_replacement_algorithm.lru import LRU
+    from .simulator import Simulator
+
+    max_page_num = max_page_num or trace.max_page_num
+    frame_counts = list(frame_counts)
+    if any(num_of_frames < 1 for num_of_frames in frame_counts):
+        raise ValueError("The numbers of frames must be at least 1.")
+    analyzer = SampledReuseDistance(trace, max_page_num=max_page_num, **options).analyze()
+    curve = analyzer.curve(max(frame_counts, default=0))
+    exact = Simulator(trace).compute(
+        LRU, frame_counts, max_page_num=max_page_num, progress=False
+    )
+    errors = []
+    within = 0
+    for num_of_frames, result in zip(frame_counts, exact):
+        row = curve[num_of_frames - 1]
+        error = abs(row["miss_ratio"] - result["page_faults"] / len(trace))
+        errors.append(error)
+        within += error <= row["error"]
+    return {
+        "mean_absolute_error": sum(errors) / len(errors) if errors else 0.0,
+        "max_absolute_error": max(errors, default=0.0),
+        "within_bound": within / len(errors) if errors else 1.0,
+        "sampling_rate": analyzer.sampling_rate,
+        "sampled_pages": len(analyzer.sample.stack.last),
+        "sampled": [curve[num_of_frames - 1] for num_of_frames in frame_counts],
+        "exact": exact,
+    }
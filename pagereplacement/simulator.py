@@ -1,21 +1,118 @@
-import pandas as pd
-from tqdm import *
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+
+from .flusher import COLUMNS as FLUSHER_COLUMNS
+from .page_replacement_algorithm.stack_algorithm import StackAlgorithm
+from .trace import Trace
+
+# The reference string and dirty bits attached from shared memory by each worker process.
+_shared_trace = dict()
+
+
+def _progress(iterable, progress, **kwargs):
+    """Wrap an iterable in a progress bar, importing tqdm only if the bar is shown.
+
+    Args:
+        iterable (iterable): The iterable.
+        progress (bool): Show the progress bar.
+        **kwargs: Arguments of tqdm.
+
+    Returns:
+        iterable: The iterable, wrapped or not.
+    """
+    if not progress:
+        return iterable
+    from tqdm import tqdm
+
+    return tqdm(iterable, **kwargs)
+
+
+def _load_trace(path):
+    """Memory-map the trace file shared by the parent process.
+
+    Args:
+        path (str): The path of the trace file.
+    """
+    _shared_trace["trace"] = Trace.load(path)
+    _shared_trace["evaluators"] = dict()
+
+
+def _attach_trace(pages_name, dirty_name, length, max_page_num):
+    """Attach the trace shared by the parent process.
+
+    Args:
+        pages_name (str): The name of the shared memory block holding the page numbers.
+        dirty_name (str): The name of the shared memory block holding the packed dirty bits.
+        length (int): The length of the reference string.
+        max_page_num (int): The maximum page number of the trace.
+    """
+    pages_shm = SharedMemory(name=pages_name)
+    dirty_shm = SharedMemory(name=dirty_name)
+    # Keep the blocks referenced for the lifetime of the worker.
+    _shared_trace["blocks"] = (pages_shm, dirty_shm)
+    _shared_trace["trace"] = Trace.from_buffers(
+        pages_shm.buf, dirty_shm.buf, length=length, max_page_num=max_page_num
+    )
+    _shared_trace["evaluators"] = dict()
+
+
+def _compute_shared(algorithm, max_page_num, num_of_frames, flusher=None):
+    """Compute the results for one frame count on the shared reference string.
+
+    Args:
+        algorithm (class): The page replacement algorithm class.
+        max_page_num (int): Maximum number of pages.
+        num_of_frames (int): The number of frames in memory.
+        flusher (Flusher, optional): The write-back daemon model. Defaults to None.
+
+    Returns:
+        dict: A dictionary containing the page faults, interrupts, and disk writes.
+    """
+    # Reuse the evaluator so that per-trace precomputation is done once per worker.
+    evaluators = _shared_trace["evaluators"]
+    if (algorithm, max_page_num) not in evaluators:
+        evaluators[(algorithm, max_page_num)] = algorithm(
+            reference_str=_shared_trace["trace"], max_page_num=max_page_num
+        )
+    evaluator = evaluators[(algorithm, max_page_num)]
+    if flusher is not None:
+        return flusher.compute(evaluator, num_of_frames)
+    evaluator.compute(num_of_frames=num_of_frames)
+    return evaluator.get_results()
 
 
 class Simulator:
     """Simulator class to run the page replacement algorithms."""
 
-    def __init__(self, reference_str, dirty_bits):
+    def __init__(self, reference_str, dirty_bits=None):
         """Constructor for Simulator.
 
         Args:
-            reference_str (list): A list of page numbers.
-            dirty_bits (list): A list of dirty bits.
+            reference_str (list, Trace or str): A list of page numbers, a Trace holding both the page numbers
+                and dirty bits, or the path of a trace file, which is memory-mapped.
+            dirty_bits (list, optional): A list of dirty bits. Not needed for a Trace.
         """
+        if isinstance(reference_str, (str, os.PathLike)):
+            reference_str = Trace.load(reference_str)
         self.reference_str = reference_str
         self.dirty_bits = dirty_bits
 
-    def run(self, algorithm, max_frame_count=100, interval=10, max_page_num=1200):
+    def run(
+        self,
+        algorithm,
+        max_frame_count=100,
+        interval=10,
+        max_page_num=1200,
+        min_frame_count=10,
+        single_pass=False,
+        executor="serial",
+        max_workers=None,
+        progress=True,
+        cache=None,
+        callback=None,
+        flusher=None,
+    ):
         """Run the page replacement algorithm.
 
         Args:
@@ -23,39 +120,355 @@ class Simulator:
             max_frame_count (int, optional): Maximum number of frames. Defaults to 100.
             interval (int, optional): Interval between frame counts. Defaults to 10.
             max_page_num (int, optional): Maximum number of pages. Defaults to 1200.
+            min_frame_count (int, optional): Minimum number of frames. Defaults to 10.
+            single_pass (bool, optional): Compute every frame count of a stack algorithm (e.g. Optimal)
+                in a single pass over the reference string. Defaults to False.
+            executor (str, optional): How to spread the frame counts: "serial", "thread" or "process".
+                The serial executor advances every frame count together in one walk of the reference string
+                when the algorithm supports it (FIFO, ESC, LFU_DA). The process pool shares the reference
+                string through shared memory. Defaults to "serial".
+            max_workers (int, optional): Number of workers of the pool. Defaults to the number of CPUs.
+            progress (bool, optional): Show the progress bar. Defaults to True.
+            cache (ResultCache, optional): Reuse the results of the frame counts computed before,
+                and store the others. Defaults to None.
+            callback (callable, optional): Called with the number of frames and the results of each
+                frame count as soon as they are known, e.g. ResultWriter.write. Defaults to None.
+            flusher (Flusher, optional): Clean dirty pages ahead of time with a write-back daemon model, and
+                add the "Stall Writes", "Background Writes", "Background I/O" and "I/O Operations"
+                columns (see flusher.COLUMNS). Every frame count is then simulated on its own
+                (no single pass or lockstep). Defaults to None.
+
+        Raises:
+            ValueError: Unknown executor.
 
         Returns:
             DataFrame: A pandas DataFrame containing the results.
         """
+        import pandas as pd
 
-        evaluator = algorithm(
-            reference_str=self.reference_str,
-            dirty_bits=self.dirty_bits,
+        frame_counts = list(range(min_frame_count, max_frame_count + 1, interval))
+        results = self.compute(
+            algorithm,
+            frame_counts,
             max_page_num=max_page_num,
+            single_pass=single_pass,
+            executor=executor,
+            max_workers=max_workers,
+            progress=progress,
+            cache=cache,
+            callback=callback,
+            flusher=flusher,
         )
 
-        frame_counts = []
-        page_faults = []
-        interrupts = []
-        disk_writes = []
-
-        # Run the algorithm for different frame counts.
-        tqdm.write(f"Running {algorithm.__name__} algorithm...")
-        for frame_count in tqdm(range(10, max_frame_count + 1, interval)):
-            evaluator.compute(num_of_frames=frame_count)
-            # Get the results.
-            result = evaluator.get_results()
-            frame_counts.append(frame_count)
-            page_faults.append(result["page_faults"])
-            interrupts.append(result["interrupts"])
-            disk_writes.append(result["disk_writes"])
-
         data = {
             "Frame Count": frame_counts,
-            "Page Faults": page_faults,
-            "Interrupts": interrupts,
-            "Disk Writes": disk_writes,
+            "Page Faults": [result["page_faults"] for result in results],
+            "Interrupts": [result["interrupts"] for result in results],
+            "Disk Writes": [result["disk_writes"] for result in results],
         }
+        if flusher is not None:
+            for key, column in FLUSHER_COLUMNS.items():
+                data[column] = [result[key] for result in results]
         df = pd.DataFrame.from_dict(data).set_index("Frame Count")
         # print(df)
         return df
+
+    def compute(
+        self,
+        algorithm,
+        frame_counts,
+        max_page_num=1200,
+        single_pass=False,
+        executor="serial",
+        max_workers=None,
+        progress=True,
+        cache=None,
+        callback=None,
+        flusher=None,
+    ):
+        """Compute the results of the page replacement algorithm for several frame counts, without pandas.
+
+        Args:
+            algorithm (class): The page replacement algorithm class.
+            frame_counts (list): The numbers of frames in memory.
+            max_page_num (int, optional): Maximum number of pages. Defaults to 1200.
+            single_pass (bool, optional): See `run`. Defaults to False.
+            executor (str, optional): See `run`. Defaults to "serial".
+            max_workers (int, optional): Number of workers of the pool. Defaults to the number of CPUs.
+            progress (bool, optional): Show the progress bar. Defaults to True.
+            cache (ResultCache, optional): See `run`. Defaults to None.
+            callback (callable, optional): See `run`. Defaults to None.
+            flusher (Flusher, optional): See `run`. Defaults to None.
+
+        Raises:
+            ValueError: Unknown executor.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        evaluator = algorithm(
+            reference_str=self.reference_str,
+            dirty_bits=self.dirty_bits,
+            max_page_num=max_page_num,
+        )
+
+        frame_counts = list(frame_counts)
+        single_pass = single_pass and flusher is None and isinstance(evaluator, StackAlgorithm)
+        if executor not in ("serial", "thread", "process"):
+            raise ValueError(f"Unknown executor: {executor}")
+
+        # Look up the frame counts computed before.
+        cached = dict()
+        if cache is not None:
+            if not isinstance(self.reference_str, Trace):
+                self.reference_str = Trace(self.reference_str, self.dirty_bits)
+                self.dirty_bits = None
+            parameters = {
+                "max_page_num": max_page_num,
+                # The one-pass engine may break ties differently.
+                "single_pass": single_pass,
+                **evaluator.parameters(),
+            }
+            if flusher is not None:
+                parameters["flusher"] = flusher.parameters()
+            keys = {
+                num_of_frames: cache.key(
+                    self.reference_str, algorithm, num_of_frames, parameters
+                )
+                for num_of_frames in frame_counts
+            }
+            for num_of_frames, key in keys.items():
+                result = cache.get(key)
+                if result is not None:
+                    cached[num_of_frames] = result
+                    if callback is not None:
+                        callback(num_of_frames, result)
+        missing = [
+            num_of_frames for num_of_frames in frame_counts if num_of_frames not in cached
+        ]
+
+        # The bar follows the frame counts as they are done: a single pass or a lockstep run completes
+        # all of them at its end.
+        bar = None
+        if progress:
+            from tqdm import tqdm
+
+            tqdm.write(f"Running {algorithm.__name__} algorithm...")
+            if missing:
+                bar = tqdm(total=len(missing))
+
+        def done(num_of_frames, result):
+            # Keep the results of a frame count as soon as they are computed.
+            if bar is not None:
+                bar.update()
+            cached[num_of_frames] = result
+            if cache is not None:
+                cache.put(
+                    keys[num_of_frames],
+                    result,
+                    {"algorithm": algorithm.__name__, "num_of_frames": num_of_frames},
+                )
+            if callback is not None:
+                callback(num_of_frames, result)
+
+        # Run the algorithm for different frame counts.
+        try:
+            if not missing:
+                pass
+            elif single_pass or executor == "serial":
+                if single_pass:
+                    results = evaluator.compute_stack(missing)
+                elif flusher is not None:
+                    results = (
+                        flusher.compute(evaluator, num_of_frames) for num_of_frames in missing
+                    )
+                elif evaluator.lockstep:
+                    results = evaluator.compute_all(missing)
+                else:
+                    # One frame count at a time, so each is done as soon as it is computed.
+                    results = (
+                        evaluator.compute_all([num_of_frames])[0] for num_of_frames in missing
+                    )
+                for num_of_frames, result in zip(missing, results):
+                    done(num_of_frames, result)
+            elif executor == "thread":
+                self.run_threads(
+                    algorithm,
+                    missing,
+                    max_page_num,
+                    max_workers,
+                    progress=False,
+                    callback=done,
+                    flusher=flusher,
+                )
+            else:
+                self.run_processes(
+                    algorithm,
+                    missing,
+                    max_page_num,
+                    max_workers,
+                    progress=False,
+                    callback=done,
+                    flusher=flusher,
+                )
+        finally:
+            if bar is not None:
+                bar.close()
+
+        return [cached[num_of_frames] for num_of_frames in frame_counts]
+
+    def run_threads(
+        self,
+        algorithm,
+        frame_counts,
+        max_page_num,
+        max_workers=None,
+        progress=True,
+        callback=None,
+        flusher=None,
+    ):
+        """Compute the frame counts in a thread pool.
+
+        Args:
+            algorithm (class): The page replacement algorithm class.
+            frame_counts (list): The numbers of frames in memory.
+            max_page_num (int): Maximum number of pages.
+            max_workers (int, optional): Number of threads. Defaults to the number of CPUs.
+            progress (bool, optional): Show the progress bar. Defaults to True.
+            callback (callable, optional): Called with the number of frames and the results
+                of each frame count as soon as it is computed. Defaults to None.
+            flusher (Flusher, optional): The write-back daemon model. Defaults to None.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+
+        def compute(num_of_frames):
+            # Each thread needs its own evaluator, the state of an algorithm is not shared.
+            evaluator = algorithm(
+                reference_str=self.reference_str,
+                dirty_bits=self.dirty_bits,
+                max_page_num=max_page_num,
+            )
+            if flusher is not None:
+                return flusher.compute(evaluator, num_of_frames)
+            evaluator.compute(num_of_frames=num_of_frames)
+            return evaluator.get_results()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(compute, frame_count) for frame_count in frame_counts]
+            frame_count_of = dict(zip(futures, frame_counts))
+            for future in _progress(as_completed(futures), progress, total=len(futures)):
+                if callback is not None:
+                    callback(frame_count_of[future], future.result())
+        return [future.result() for future in futures]
+
+    def run_processes(
+        self,
+        algorithm,
+        frame_counts,
+        max_page_num,
+        max_workers=None,
+        progress=True,
+        callback=None,
+        flusher=None,
+    ):
+        """Compute the frame counts in a process pool.
+
+        The trace is copied once into shared memory,
+        and every worker reads it from there instead of receiving a pickled copy.
+        A trace loaded from a file is memory-mapped by every worker instead.
+
+        Args:
+            algorithm (class): The page replacement algorithm class.
+            frame_counts (list): The numbers of frames in memory.
+            max_page_num (int): Maximum number of pages.
+            max_workers (int, optional): Number of processes. Defaults to the number of CPUs.
+            progress (bool, optional): Show the progress bar. Defaults to True.
+            callback (callable, optional): Called with the number of frames and the results
+                of each frame count as soon as it is computed. Defaults to None.
+            flusher (Flusher, optional): The write-back daemon model. Defaults to None.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        trace = self.reference_str
+        if isinstance(trace, Trace) and trace.path is not None:
+            return self.run_pool(
+                algorithm,
+                frame_counts,
+                max_page_num,
+                max_workers,
+                progress,
+                callback=callback,
+                flusher=flusher,
+                initializer=_load_trace,
+                initargs=(trace.path,),
+            )
+        if not isinstance(trace, Trace):
+            trace = Trace(self.reference_str, self.dirty_bits)
+        pages = trace.pages.cast("B")
+        dirty = trace.packed_dirty_bits
+        pages_shm = SharedMemory(create=True, size=max(pages.nbytes, 4))
+        dirty_shm = SharedMemory(create=True, size=max(dirty.nbytes, 1))
+        try:
+            pages_shm.buf[: pages.nbytes] = pages
+            dirty_shm.buf[: dirty.nbytes] = dirty
+            return self.run_pool(
+                algorithm,
+                frame_counts,
+                max_page_num,
+                max_workers,
+                progress,
+                callback=callback,
+                flusher=flusher,
+                initializer=_attach_trace,
+                initargs=(pages_shm.name, dirty_shm.name, len(trace), trace.max_page_num),
+            )
+        finally:
+            pages_shm.close()
+            pages_shm.unlink()
+            dirty_shm.close()
+            dirty_shm.unlink()
+
+    def run_pool(
+        self,
+        algorithm,
+        frame_counts,
+        max_page_num,
+        max_workers,
+        progress,
+        initializer,
+        initargs,
+        callback=None,
+        flusher=None,
+    ):
+        """Compute the frame counts in a process pool whose workers get the trace from initializer.
+
+        Args:
+            algorithm (class): The page replacement algorithm class.
+            frame_counts (list): The numbers of frames in memory.
+            max_page_num (int): Maximum number of pages.
+            max_workers (int): Number of processes.
+            progress (bool): Show the progress bar.
+            initializer (callable): Sets up the shared trace in each worker.
+            initargs (tuple): Arguments of initializer.
+            callback (callable, optional): Called with the number of frames and the results
+                of each frame count as soon as it is computed. Defaults to None.
+            flusher (Flusher, optional): The write-back daemon model. Defaults to None.
+
+        Returns:
+            list: A list of dictionaries containing the page faults, interrupts, and disk writes.
+        """
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=initializer, initargs=initargs
+        ) as pool:
+            futures = [
+                pool.submit(_compute_shared, algorithm, max_page_num, frame_count, flusher)
+                for frame_count in frame_counts
+            ]
+            frame_count_of = dict(zip(futures, frame_counts))
+            for future in _progress(as_completed(futures), progress, total=len(futures)):
+                if callback is not None:
+                    callback(frame_count_of[future], future.result())
+        return [future.result() for future in futures]
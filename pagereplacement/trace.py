@@ -0,0 +1,419 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+from array import array
+from itertools import chain, islice
+
+# The header of a trace file:
+# magic, version, page width in bytes, provenance size, length, max page number, seed (-1 if none),
+# offset of the page numbers, offset of the packed dirty bits.
+# The header is followed by the provenance (JSON), the page numbers and the packed dirty bits,
+# each section aligned to 8 bytes. Numbers are little-endian.
+HEADER = struct.Struct("<8sHHIQQqQQ")
+MAGIC = b"PRTRACE\0"
+VERSION = 1
+
+
+def _align(offset):
+    return (offset + 7) // 8 * 8
+
+
+def write_trace_file(
+    f, page_width, length, max_page_num, seed, provenance, pages, packed_dirty_bits
+):
+    """Write a binary trace file.
+
+    Args:
+        f (file): The file, opened for binary writing.
+        page_width (int): The size of a page number in bytes, 2 or 4.
+        length (int): The length of the reference string.
+        max_page_num (int): The maximum page number.
+        seed (int): The random seed the trace was generated with, or None.
+        provenance (dict): How the trace was made (JSON serializable).
+        pages (iterable): Buffers holding the page numbers, in order.
+        packed_dirty_bits (iterable): Buffers holding the packed dirty bits, in order.
+    """
+    provenance = json.dumps(provenance).encode()
+    pages_offset = _align(HEADER.size + len(provenance))
+    dirty_offset = _align(pages_offset + length * page_width)
+    f.write(
+        HEADER.pack(
+            MAGIC,
+            VERSION,
+            page_width,
+            len(provenance),
+            length,
+            max_page_num,
+            -1 if seed is None else seed,
+            pages_offset,
+            dirty_offset,
+        )
+    )
+    f.write(provenance)
+    f.write(bytes(pages_offset - HEADER.size - len(provenance)))
+    for buffer in pages:
+        f.write(buffer)
+    f.write(bytes(dirty_offset - pages_offset - length * page_width))
+    for buffer in packed_dirty_bits:
+        f.write(buffer)
+
+
+def chunks(reference_str, dirty_bits, chunk_size=65536):
+    """Split a reference string and its dirty bits into chunks.
+
+    Args:
+        reference_str (iterable): The page numbers.
+        dirty_bits (iterable): The dirty bits.
+        chunk_size (int, optional): The number of references per chunk. Defaults to 65536.
+
+    Yields:
+        tuple: A list of page numbers and a list of dirty bits.
+    """
+    pages = iter(reference_str)
+    dirty = iter(dirty_bits)
+    while True:
+        pages_chunk = list(islice(pages, chunk_size))
+        if not pages_chunk:
+            return
+        yield pages_chunk, list(islice(dirty, len(pages_chunk)))
+
+
+# UNPACK[byte] is the 8 dirty bits packed in byte, one per byte, lowest bit first.
+UNPACK = [bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256)]
+
+
+class PackedBits:
+    """A read-only sequence of bits packed 8 per byte, lowest bit first."""
+
+    # Number of packed bytes unpacked at once while iterating.
+    CHUNK_SIZE = 8192
+
+    def __init__(self, packed, length):
+        """Constructor for PackedBits.
+
+        Args:
+            packed (memoryview): The packed bits.
+            length (int): The number of bits.
+        """
+        self.packed = packed
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step != 1:
+                return bytes(self[i] for i in range(start, stop, step))
+            if start >= stop:
+                return b""
+            first = start >> 3
+            bits = b"".join(map(UNPACK.__getitem__, self.packed[first : (stop + 7) >> 3]))
+            return bits[start - first * 8 : stop - first * 8]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("bit index out of range")
+        return (self.packed[index >> 3] >> (index & 7)) & 1
+
+    def __iter__(self):
+        return chain.from_iterable(self.chunks())
+
+    def chunks(self):
+        """Unpack the bits chunk by chunk.
+
+        Yields:
+            bytes: The next chunk of bits, one per byte.
+        """
+        remaining = self.length
+        for start in range(0, len(self.packed), self.CHUNK_SIZE):
+            chunk = b"".join(map(UNPACK.__getitem__, self.packed[start : start + self.CHUNK_SIZE]))
+            yield chunk[:remaining] if remaining < len(chunk) else chunk
+            remaining -= len(chunk)
+
+
+class Trace:
+    """A compact reference string.
+
+    The page numbers are stored as an array of uint16 (or uint32 if a page number does not fit),
+    and the dirty bits are packed 8 per byte. The algorithms read them through read-only views,
+    so a trace is never copied once it is built.
+    """
+
+    def __init__(self, reference_str, dirty_bits, max_page_num=None):
+        """Constructor for Trace.
+
+        Args:
+            reference_str (list): A list of page numbers.
+            dirty_bits (list): A list of dirty bits.
+            max_page_num (int, optional): The maximum page number. Defaults to the largest page number.
+
+        Raises:
+            ValueError: The reference string and dirty bits have different lengths.
+        """
+        if len(reference_str) != len(dirty_bits):
+            raise ValueError("The reference string and dirty bits have different lengths.")
+        if max_page_num is None:
+            max_page_num = max(reference_str, default=0)
+        pages = array("H" if max_page_num <= 0xFFFF else "I", reference_str)
+        self.pages = memoryview(pages)
+        self.packed_dirty_bits = memoryview(self.pack(dirty_bits))
+        self.length = len(pages)
+        self.max_page_num = max_page_num
+        self.seed = None
+        self.provenance = dict()
+        self.path = None
+        self._digest = None
+
+    @classmethod
+    def from_buffers(cls, pages, packed_dirty_bits, length, max_page_num):
+        """Wrap page numbers and packed dirty bits that are already in memory, without copying them.
+
+        Args:
+            pages (buffer): The page numbers, uint16 or uint32 (e.g. an array, a NumPy array or shared memory).
+            packed_dirty_bits (buffer): The dirty bits packed 8 per byte, lowest bit first.
+            length (int): The length of the reference string.
+            max_page_num (int): The maximum page number.
+
+        Returns:
+            Trace: The trace.
+        """
+        trace = cls.__new__(cls)
+        pages = memoryview(pages)
+        if pages.format not in ("H", "I"):
+            pages = pages.cast("B").cast("H" if max_page_num <= 0xFFFF else "I")
+        trace.pages = pages[:length]
+        trace.packed_dirty_bits = memoryview(packed_dirty_bits).cast("B")[: (length + 7) // 8]
+        trace.length = length
+        trace.max_page_num = max_page_num
+        trace.seed = None
+        trace.provenance = dict()
+        trace.path = None
+        trace._digest = None
+        return trace
+
+    def save(self, path, seed=None, provenance=None):
+        """Save the trace to a binary trace file.
+
+        Args:
+            path (str): The path of the trace file.
+            seed (int, optional): The random seed the trace was generated with. Defaults to the seed of the trace.
+            provenance (dict, optional): How the trace was made (JSON serializable). Defaults to the provenance of the trace.
+        """
+        with open(path, "wb") as f:
+            write_trace_file(
+                f,
+                self.pages.itemsize,
+                self.length,
+                self.max_page_num,
+                self.seed if seed is None else seed,
+                self.provenance if provenance is None else provenance,
+                [self.pages],
+                [self.packed_dirty_bits],
+            )
+
+    @classmethod
+    def load(cls, path):
+        """Load a binary trace file through mmap, so the trace is paged in from disk on demand.
+
+        Args:
+            path (str): The path of the trace file.
+
+        Raises:
+            ValueError: The file is not a trace file.
+
+        Returns:
+            Trace: The trace.
+        """
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a trace file.")
+        (
+            magic,
+            version,
+            page_width,
+            provenance_size,
+            length,
+            max_page_num,
+            seed,
+            pages_offset,
+            dirty_offset,
+        ) = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION or page_width not in (2, 4):
+            raise ValueError(f"{path} is not a trace file.")
+
+        view = memoryview(buffer)
+        trace = cls.from_buffers(
+            view[pages_offset : pages_offset + length * page_width].cast(
+                "H" if page_width == 2 else "I"
+            ),
+            view[dirty_offset : dirty_offset + (length + 7) // 8],
+            length=length,
+            max_page_num=max_page_num,
+        )
+        trace.seed = None if seed == -1 else seed
+        trace.provenance = json.loads(
+            bytes(view[HEADER.size : HEADER.size + provenance_size])
+        )
+        trace.path = str(path)
+        return trace
+
+    @staticmethod
+    def pack(dirty_bits):
+        """Pack dirty bits 8 per byte, lowest bit first.
+
+        Args:
+            dirty_bits (list): A list of dirty bits.
+
+        Returns:
+            bytearray: The packed dirty bits.
+        """
+        unpacked = bytes(dirty_bits)
+        unpacked += bytes(-len(unpacked) % 8)
+        packed = bytearray(len(unpacked) // 8)
+        for index in range(len(packed)):
+            # Gather the lowest bit of each of the 8 bytes into one byte.
+            word = int.from_bytes(unpacked[index * 8 : index * 8 + 8], "little")
+            packed[index] = ((word * 0x0102040810204080) >> 56) & 0xFF
+        return packed
+
+    def __len__(self):
+        return self.length
+
+    def digest(self):
+        """Hash the contents of the trace, the page numbers and the dirty bits.
+
+        Returns:
+            str: The SHA-256 hex digest, computed once per trace.
+        """
+        if self._digest is None:
+            digest = hashlib.sha256()
+            digest.update(f"{self.length}:{self.pages.itemsize}:".encode())
+            pages = self.pages.cast("B")
+            for start in range(0, len(pages), 1 << 24):
+                digest.update(pages[start : start + (1 << 24)])
+            packed = self.packed_dirty_bits
+            if self.length % 8:
+                # Ignore the padding bits of the last byte.
+                digest.update(packed[:-1])
+                digest.update(bytes([packed[-1] & ((1 << self.length % 8) - 1)]))
+            else:
+                digest.update(packed)
+            self._digest = digest.hexdigest()
+        return self._digest
+
+    def chunks(self, chunk_size=65536):
+        """Split the trace into chunks, e.g. to stream it through PageReplacementAlgorithm.feed.
+
+        Args:
+            chunk_size (int, optional): The number of references per chunk. Defaults to 65536.
+
+        Yields:
+            tuple: A list of page numbers and a list of dirty bits.
+        """
+        return chunks(self.reference_str, self.dirty_bits, chunk_size)
+
+    @property
+    def reference_str(self):
+        """A read-only view of the page numbers."""
+        return self.pages.toreadonly()
+
+    @property
+    def dirty_bits(self):
+        """A read-only view of the dirty bits."""
+        return PackedBits(self.packed_dirty_bits.toreadonly(), self.length)
+
+    @property
+    def nbytes(self):
+        """The memory used by the page numbers and dirty bits."""
+        return self.pages.nbytes + self.packed_dirty_bits.nbytes
+
+
+class TraceWriter:
+    """Write a binary trace file chunk by chunk, with bounded memory.
+
+    The page numbers and packed dirty bits are spooled to temporary files next to the trace file,
+    and assembled when the writer is closed, once the length and maximum page number are known.
+    """
+
+    def __init__(self, path, seed=None, provenance=None):
+        """Constructor for TraceWriter.
+
+        Args:
+            path (str): The path of the trace file.
+            seed (int, optional): The random seed the trace was generated with. Defaults to None.
+            provenance (dict, optional): How the trace was made (JSON serializable). Defaults to None.
+        """
+        self.path = str(path)
+        self.seed = seed
+        self.provenance = dict() if provenance is None else provenance
+        self.length = 0
+        self.max_page_num = 0
+        self.pages_file = open(f"{self.path}.pages", "wb")
+        self.dirty_file = open(f"{self.path}.dirty", "wb")
+        # Dirty bits not packed yet, fewer than 8.
+        self.dirty_tail = []
+
+    def write(self, reference_str, dirty_bits):
+        """Append references to the trace.
+
+        Args:
+            reference_str (list): The next page numbers.
+            dirty_bits (list): The next dirty bits.
+        """
+        if not reference_str:
+            return
+        self.pages_file.write(array("I", reference_str))
+        self.length += len(reference_str)
+        self.max_page_num = max(self.max_page_num, max(reference_str))
+        dirty_bits = self.dirty_tail + list(dirty_bits)
+        packed_length = len(dirty_bits) // 8 * 8
+        self.dirty_file.write(Trace.pack(dirty_bits[:packed_length]))
+        self.dirty_tail = dirty_bits[packed_length:]
+
+    def close(self):
+        """Assemble the trace file and remove the temporary files.
+
+        Returns:
+            Trace: The trace, memory-mapped from the file.
+        """
+        self.dirty_file.write(Trace.pack(self.dirty_tail))
+        self.pages_file.close()
+        self.dirty_file.close()
+        page_width = 2 if self.max_page_num <= 0xFFFF else 4
+        try:
+            with open(self.path, "wb") as f:
+                write_trace_file(
+                    f,
+                    page_width,
+                    self.length,
+                    self.max_page_num,
+                    self.seed,
+                    self.provenance,
+                    self._read_pages(page_width),
+                    self._read(f"{self.path}.dirty"),
+                )
+        finally:
+            os.remove(f"{self.path}.pages")
+            os.remove(f"{self.path}.dirty")
+        return Trace.load(self.path)
+
+    def _read_pages(self, page_width):
+        for buffer in self._read(f"{self.path}.pages"):
+            if page_width == 4:
+                yield buffer
+            else:
+                yield array("H", memoryview(buffer).cast("I"))
+
+    @staticmethod
+    def _read(path, chunk_size=1 << 22):
+        with open(path, "rb") as f:
+            while True:
+                buffer = f.read(chunk_size)
+                if not buffer:
+                    return
+                yield buffer
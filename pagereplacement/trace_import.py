@@ -0,0 +1,178 @@
+import re
+
+from .trace import Trace, TraceWriter
+
+# valgrind --tool=lackey --trace-mem=yes: "I  0400d7d4,8", " L 04222cac,4", " S 04222cac,4", " M 0421d7f0,4".
+LACKEY = re.compile(rb"^[ \t]*([ILSM])[ \t]+(?:0[xX])?([0-9a-fA-F]+),(\d+)", re.MULTILINE)
+# "0x7fff5fbff8a8 R" or "7fff5fbff8a8 w".
+ADDRESS_OPERATION = re.compile(rb"^[ \t]*(?:0[xX])?([0-9a-fA-F]+)[ \t]+([RWrw])\b", re.MULTILINE)
+# The dirty bit of each operation: stores and modifies write the page.
+DIRTY = {b"I": 0, b"L": 0, b"S": 1, b"M": 1, b"R": 0, b"r": 0, b"W": 1, b"w": 1}
+
+
+class TraceImporter:
+    """Import real-world memory traces.
+
+    Two text formats are supported:
+    1. valgrind lackey: `L/S/M addr,size` lines (and `I addr,size` instruction fetches).
+    2. `addr R/W` lines.
+
+    Addresses are mapped to page numbers with the page size, stores (S, M, W) make the reference dirty,
+    and the pages are renumbered densely from 1 in the order they are first referenced, so that
+    `max_page_num` is the number of distinct pages. An access that crosses a page boundary references
+    both pages. The file is read in fixed-size blocks, so memory only grows with the number of distinct pages.
+    """
+
+    def __init__(
+        self,
+        page_size=4096,
+        format="auto",
+        include_instructions=False,
+        block_size=1 << 22,
+    ):
+        """Constructor for TraceImporter.
+
+        Args:
+            page_size (int, optional): The page size in bytes, a power of 2. Defaults to 4096.
+            format (str, optional): "lackey", "address" or "auto". Defaults to "auto".
+            include_instructions (bool, optional): Also import the lackey instruction fetches as reads. Defaults to False.
+            block_size (int, optional): The number of bytes read at once. Defaults to 4 MiB.
+
+        Raises:
+            ValueError: The page size is not a power of 2, or the format is unknown.
+        """
+        if page_size <= 0 or page_size & (page_size - 1):
+            raise ValueError("The page size must be a power of 2.")
+        if format not in ("auto", "lackey", "address"):
+            raise ValueError(f"Unknown trace format: {format}")
+        self.page_size = page_size
+        self.page_shift = page_size.bit_length() - 1
+        self.format = format
+        self.include_instructions = include_instructions
+        self.block_size = block_size
+        # Page (address >> page_shift) -> dense page number.
+        self.page_numbers = dict()
+
+    def detect_format(self, block):
+        """Detect the format of a trace from its first block.
+
+        Args:
+            block (bytes): The beginning of the trace.
+
+        Returns:
+            str: "lackey" or "address".
+        """
+        lackey = LACKEY.search(block)
+        address = ADDRESS_OPERATION.search(block)
+        if lackey and (not address or lackey.start() <= address.start()):
+            return "lackey"
+        return "address"
+
+    def read(self, path):
+        """Read a trace file chunk by chunk.
+
+        Args:
+            path (str): The path of the trace file.
+
+        Yields:
+            tuple: A list of page numbers and a list of dirty bits for each block of the file.
+        """
+        format = self.format
+        with open(path, "rb") as f:
+            rest = b""
+            while True:
+                block = f.read(self.block_size)
+                if not block:
+                    if rest:
+                        yield self.parse(rest, format)
+                    return
+                block = rest + block
+                # Keep the last incomplete line for the next block.
+                end = block.rfind(b"\n") + 1
+                block, rest = block[:end], block[end:]
+                if format == "auto" and block:
+                    format = self.detect_format(block)
+                if block:
+                    yield self.parse(block, format)
+
+    def parse(self, block, format):
+        """Parse complete lines of a trace.
+
+        Args:
+            block (bytes): Complete lines.
+            format (str): "lackey" or "address".
+
+        Returns:
+            tuple: A list of page numbers and a list of dirty bits.
+        """
+        page_numbers = self.page_numbers
+        shift = self.page_shift
+        reference_str = []
+        dirty_bits = []
+        append_page = reference_str.append
+        append_dirty = dirty_bits.append
+
+        if format == "lackey":
+            skip = b"" if self.include_instructions else b"I"
+            for operation, address, size in LACKEY.findall(block):
+                if operation == skip:
+                    continue
+                dirty_bit = DIRTY[operation]
+                address = int(address, 16)
+                page = address >> shift
+                page_num = page_numbers.get(page)
+                if page_num is None:
+                    page_num = page_numbers[page] = len(page_numbers) + 1
+                append_page(page_num)
+                append_dirty(dirty_bit)
+                # The access crosses a page boundary.
+                last_page = (address + int(size) - 1) >> shift
+                while page < last_page:
+                    page += 1
+                    page_num = page_numbers.get(page)
+                    if page_num is None:
+                        page_num = page_numbers[page] = len(page_numbers) + 1
+                    append_page(page_num)
+                    append_dirty(dirty_bit)
+        else:
+            for address, operation in ADDRESS_OPERATION.findall(block):
+                page = int(address, 16) >> shift
+                page_num = page_numbers.get(page)
+                if page_num is None:
+                    page_num = page_numbers[page] = len(page_numbers) + 1
+                append_page(page_num)
+                append_dirty(DIRTY[operation])
+
+        return reference_str, dirty_bits
+
+    def to_trace(self, path, output=None):
+        """Import a trace file.
+
+        Args:
+            path (str): The path of the text trace file.
+            output (str, optional): The path of the binary trace file to write. If it is given, the references
+                are streamed to it and the result is memory-mapped, otherwise the trace is built in memory.
+
+        Returns:
+            Trace: The trace.
+        """
+        provenance = {
+            "source": str(path),
+            "format": self.format,
+            "page_size": self.page_size,
+            "include_instructions": self.include_instructions,
+        }
+        if output is not None:
+            writer = TraceWriter(output, provenance=provenance)
+            for reference_str, dirty_bits in self.read(path):
+                writer.write(reference_str, dirty_bits)
+            return writer.close()
+
+        reference_str = []
+        dirty_bits = []
+        for pages_chunk, dirty_chunk in self.read(path):
+            reference_str += pages_chunk
+            dirty_bits += dirty_chunk
+        trace = Trace(reference_str, dirty_bits, max_page_num=len(self.page_numbers))
+        trace.provenance = provenance
+        return trace